@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Local load-testing benchmark for the GCG Eyewear API
+
+Starts (or connects to) a local mongod, seeds a synthetic catalog (the same
+generator as seed_data.py --generate), launches the API with uvicorn and drives
+a weighted mix of storefront and admin requests at a fixed concurrency. Results (p50/p95/p99 latency and requests per second per
+scenario) are written as JSON so runs can be compared across commits:
+
+    python benchmarks/run_benchmark.py --mongod mongod --products 20000 \
+        --concurrency 32 --duration 60 --output bench_output.json
+
+    python benchmarks/run_benchmark.py ... --baseline bench_main.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import requests
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from models.product import GenderEnum  # noqa: E402
+from seed_data import SYNTHETIC_COLLECTIONS, SYNTHETIC_TAGS, seed_synthetic_catalog  # noqa: E402
+
+# Scenario weights per named mix
+MIXES = {
+    "storefront": {
+        "list": 30, "filter": 20, "search": 10, "detail": 25,
+        "featured": 8, "collections": 7
+    },
+    "mixed": {
+        "list": 25, "filter": 20, "search": 10, "detail": 25,
+        "featured": 5, "collections": 5, "admin_write": 10
+    },
+    "admin": {
+        "admin_list": 40, "admin_write": 40, "detail": 20
+    },
+}
+
+COLLECTION_NAMES = SYNTHETIC_COLLECTIONS
+SEARCH_TERMS = SYNTHETIC_TAGS
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_for(url: str, timeout: float = 30.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+def start_mongod(binary: str, port: int, dbpath: str) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [binary, "--port", str(port), "--dbpath", dbpath, "--bind_ip", "127.0.0.1", "--quiet"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    client = MongoClient(f"mongodb://127.0.0.1:{port}", serverSelectionTimeoutMS=500)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            client.admin.command("ping")
+            client.close()
+            return process
+        except Exception:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("mongod did not become ready")
+
+def seed_catalog(mongo_url: str, db_name: str, product_count: int, seed: int) -> None:
+    client = AsyncIOMotorClient(mongo_url)
+    asyncio.run(seed_synthetic_catalog(client[db_name], product_count, seed=seed))
+    client.close()
+
+def load_product_ids(mongo_url: str, db_name: str, sample: int = 5000) -> List[str]:
+    client = MongoClient(mongo_url)
+    ids = [doc["id"] for doc in client[db_name].products.aggregate([
+        {"$sample": {"size": sample}},
+        {"$project": {"_id": 0, "id": 1}}
+    ])]
+    client.close()
+    return ids
+
+class Workload:
+    def __init__(self, base_url: str, product_ids: List[str], token: Optional[str], rng: random.Random):
+        self.base_url = base_url
+        self.product_ids = product_ids
+        self.token = token
+        self.rng = rng
+
+    def request(self, scenario: str):
+        rng = self.rng
+        api = f"{self.base_url}/api"
+        if scenario == "list":
+            return "GET", f"{api}/products/", {"skip": rng.randrange(0, 200), "limit": 24}, None
+        if scenario == "filter":
+            params = {
+                "collection": rng.choice(COLLECTION_NAMES),
+                "gender": rng.choice([g.value for g in GenderEnum]),
+                "price_min": 300,
+                "price_max": rng.choice([800, 1200, 2000]),
+                "limit": 24
+            }
+            return "GET", f"{api}/products/", params, None
+        if scenario == "search":
+            return "GET", f"{api}/products/search", {"q": rng.choice(SEARCH_TERMS), "limit": 24}, None
+        if scenario == "detail":
+            return "GET", f"{api}/products/{rng.choice(self.product_ids)}", None, None
+        if scenario == "featured":
+            return "GET", f"{api}/products/featured", None, None
+        if scenario == "collections":
+            return "GET", f"{api}/collections/active", None, None
+        if scenario == "admin_list":
+            return "GET", f"{api}/admin/products", {"skip": rng.randrange(0, 200), "limit": 50}, None
+        if scenario == "admin_write":
+            body = {"price": round(rng.uniform(250, 2500), -1)}
+            return "PUT", f"{api}/products/{rng.choice(self.product_ids)}", None, body
+        raise ValueError(f"Unknown scenario: {scenario}")
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank percentile
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> dict:
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0
+    }
+
+def run_load(base_url: str, mix: Dict[str, int], product_ids: List[str], token: Optional[str],
+             concurrency: int, duration: float, warmup: float, seed: int) -> dict:
+    scenarios = list(mix.keys())
+    weights = [mix[name] for name in scenarios]
+    results: Dict[str, List[float]] = {name: [] for name in scenarios}
+    errors: Dict[str, int] = {name: 0 for name in scenarios}
+    lock = threading.Lock()
+    measure_from = time.perf_counter() + warmup
+    stop_at = measure_from + duration
+
+    def worker(worker_id: int) -> None:
+        rng = random.Random(seed + worker_id)
+        workload = Workload(base_url, product_ids, token, rng)
+        session = requests.Session()
+        if token:
+            session.headers["Authorization"] = f"Bearer {token}"
+        local_results: Dict[str, List[float]] = {name: [] for name in scenarios}
+        local_errors: Dict[str, int] = {name: 0 for name in scenarios}
+        while True:
+            scenario = rng.choices(scenarios, weights)[0]
+            method, url, params, body = workload.request(scenario)
+            start = time.perf_counter()
+            if start >= stop_at:
+                break
+            try:
+                response = session.request(method, url, params=params, json=body, timeout=30)
+                ok = response.status_code < 400
+            except requests.RequestException:
+                ok = False
+            end = time.perf_counter()
+            if start < measure_from:
+                continue
+            if ok:
+                local_results[scenario].append(end - start)
+            else:
+                local_errors[scenario] += 1
+        with lock:
+            for name in scenarios:
+                results[name].extend(local_results[name])
+                errors[name] += local_errors[name]
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    all_latencies = [value for name in scenarios for value in results[name]]
+    return {
+        "overall": summarize(all_latencies, sum(errors.values()), duration),
+        "scenarios": {name: summarize(results[name], errors[name], duration) for name in scenarios}
+    }
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+def compare(current: dict, baseline: dict) -> None:
+    print(f"\nComparison against baseline {baseline.get('commit') or 'unknown'}:")
+    for name, stats in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        deltas = []
+        for key in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+            if base[key]:
+                deltas.append(f"{key} {(stats[key] - base[key]) / base[key] * 100:+.1f}%")
+        print(f"  {name:12s} " + ", ".join(deltas))
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the GCG Eyewear API against a local MongoDB")
+    parser.add_argument("--mongod", help="Path to a mongod binary; starts a throwaway instance")
+    parser.add_argument("--mongo-url", default="mongodb://127.0.0.1:27017",
+                        help="MongoDB to use when --mongod is not given")
+    parser.add_argument("--db-name", default="gcg_benchmark")
+    parser.add_argument("--products", type=int, default=10000, help="Synthetic catalog size")
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse the existing catalog")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="storefront")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Unmeasured warm-up seconds")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--admin-user", default="admin")
+    parser.add_argument("--admin-password", default="admin123")
+    parser.add_argument("--output", help="Write JSON results to this file (default: stdout)")
+    parser.add_argument("--baseline", help="Previous JSON result to compare against")
+    args = parser.parse_args()
+
+    mongod_process = None
+    api_process = None
+    dbpath = None
+    try:
+        mongo_url = args.mongo_url
+        if args.mongod:
+            dbpath = tempfile.mkdtemp(prefix="gcg-bench-")
+            mongo_port = free_port()
+            mongod_process = start_mongod(args.mongod, mongo_port, dbpath)
+            mongo_url = f"mongodb://127.0.0.1:{mongo_port}"
+            print(f"Started mongod on port {mongo_port}", file=sys.stderr)
+
+        if not args.skip_seed:
+            started = time.time()
+            seed_catalog(mongo_url, args.db_name, args.products, args.seed)
+            print(f"Seeded {args.products} products in {time.time() - started:.1f}s", file=sys.stderr)
+
+        api_port = free_port()
+        env = dict(os.environ, MONGO_URL=mongo_url, DB_NAME=args.db_name)
+        api_process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1",
+             "--port", str(api_port), "--workers", str(args.workers), "--log-level", "warning"],
+            cwd=BACKEND_DIR,
+            env=env
+        )
+        base_url = f"http://127.0.0.1:{api_port}"
+        wait_for(f"{base_url}/api/health")
+
+        token = None
+        if "admin_write" in MIXES[args.mix] or "admin_list" in MIXES[args.mix]:
+            response = requests.post(f"{base_url}/api/admin/login", json={
+                "username": args.admin_user, "password": args.admin_password
+            })
+            response.raise_for_status()
+            token = response.json()["access_token"]
+
+        product_ids = load_product_ids(mongo_url, args.db_name)
+        if not product_ids:
+            raise RuntimeError("Catalog is empty; run without --skip-seed")
+
+        print(f"Running '{args.mix}' mix: {args.concurrency} clients for {args.duration:.0f}s", file=sys.stderr)
+        stats = run_load(base_url, MIXES[args.mix], product_ids, token,
+                         args.concurrency, args.duration, args.warmup, args.seed)
+
+        result = {
+            "run_id": str(uuid.uuid4()),
+            "commit": git_commit(),
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "config": {
+                "mix": args.mix,
+                "products": args.products,
+                "concurrency": args.concurrency,
+                "duration": args.duration,
+                "warmup": args.warmup,
+                "workers": args.workers,
+                "seed": args.seed
+            },
+            **stats
+        }
+
+        output = json.dumps(result, indent=2)
+        if args.output:
+            Path(args.output).write_text(output + "\n")
+            print(f"Results written to {args.output}", file=sys.stderr)
+        else:
+            print(output)
+
+        if args.baseline:
+            compare(result, json.loads(Path(args.baseline).read_text()))
+
+        return 0 if result["overall"]["errors"] == 0 else 1
+
+    finally:
+        if api_process:
+            api_process.terminate()
+            api_process.wait(timeout=10)
+        if mongod_process:
+            mongod_process.terminate()
+            mongod_process.wait(timeout=10)
+        if dbpath:
+            shutil.rmtree(dbpath, ignore_errors=True)
+
+if __name__ == "__main__":
+    sys.exit(main())
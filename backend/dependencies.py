@@ -1,10 +1,13 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
 from services.product_service import ProductService
 from services.collection_service import CollectionService
 from services.auth_service import AuthService
 from services.upload_service import UploadService
+from services.metrics_service import mongo_command_listener
+from services.health_service import pool_monitor
 from models.admin import Admin
 from dotenv import load_dotenv
 from pathlib import Path
@@ -17,26 +20,88 @@ load_dotenv(ROOT_DIR / '.env')
 # MongoDB connection
 mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
 db_name = os.environ.get('DB_NAME', 'test_database')
-client = AsyncIOMotorClient(mongo_url)
+# Fail fast when no server is reachable so the circuit breaker and
+# last-known-good fallback take over instead of requests hanging for 30s
+server_selection_timeout_ms = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000'))
+# Readiness reports saturation against this
+max_pool_size = int(os.environ.get('MONGO_MAX_POOL_SIZE', '100'))
+client = AsyncIOMotorClient(
+    mongo_url,
+    event_listeners=[mongo_command_listener, pool_monitor],
+    serverSelectionTimeoutMS=server_selection_timeout_ms,
+    maxPoolSize=max_pool_size
+)
 db = client[db_name]
 
+# Read preference per route group. Anonymous catalog reads may go to
+# secondaries (bounded staleness, >= 90s as required by MongoDB); admin reads
+# stay on the primary so admins read their own writes. Writes always go to
+# the primary regardless.
+READ_PREFERENCE_MODES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+def read_preference_from_env(mode_var: str, default_mode: str):
+    mode = os.environ.get(mode_var, default_mode)
+    if mode not in READ_PREFERENCE_MODES:
+        raise ValueError(f"{mode_var} must be one of {', '.join(READ_PREFERENCE_MODES)}")
+    if mode == "primary":
+        return Primary()
+    max_staleness = int(os.environ.get('MONGO_MAX_STALENESS_SECONDS', '90'))
+    return READ_PREFERENCE_MODES[mode](max_staleness=max_staleness)
+
+CATALOG_READ_PREFERENCE = read_preference_from_env('MONGO_CATALOG_READ_PREFERENCE', 'secondaryPreferred')
+ADMIN_READ_PREFERENCE = read_preference_from_env('MONGO_ADMIN_READ_PREFERENCE', 'primary')
+
 # Security
 security = HTTPBearer()
 
 def get_database() -> AsyncIOMotorDatabase:
     return db
 
-def get_product_service(db: AsyncIOMotorDatabase = Depends(get_database)) -> ProductService:
+# (id(db), id(read preference)) -> (db, db with that read preference)
+_routed_databases = {}
+
+def _with_read_preference(db: AsyncIOMotorDatabase, read_preference) -> AsyncIOMotorDatabase:
+    key = (id(db), id(read_preference))
+    cached = _routed_databases.get(key)
+    if cached is None or cached[0] is not db:
+        cached = _routed_databases[key] = (db, db.with_options(read_preference=read_preference))
+    return cached[1]
+
+def get_admin_database(db: AsyncIOMotorDatabase = Depends(get_database)) -> AsyncIOMotorDatabase:
+    return _with_read_preference(db, ADMIN_READ_PREFERENCE)
+
+def get_catalog_database(
+    request: Request,
+    db: AsyncIOMotorDatabase = Depends(get_database)
+) -> AsyncIOMotorDatabase:
+    # Logged-in admins browsing the storefront must see their own edits
+    if "authorization" in request.headers:
+        return _with_read_preference(db, ADMIN_READ_PREFERENCE)
+    return _with_read_preference(db, CATALOG_READ_PREFERENCE)
+
+def get_product_service(db: AsyncIOMotorDatabase = Depends(get_catalog_database)) -> ProductService:
+    return ProductService(db)
+
+def get_collection_service(db: AsyncIOMotorDatabase = Depends(get_catalog_database)) -> CollectionService:
+    return CollectionService(db)
+
+def get_admin_product_service(db: AsyncIOMotorDatabase = Depends(get_admin_database)) -> ProductService:
     return ProductService(db)
 
-def get_collection_service(db: AsyncIOMotorDatabase = Depends(get_database)) -> CollectionService:
+def get_admin_collection_service(db: AsyncIOMotorDatabase = Depends(get_admin_database)) -> CollectionService:
     return CollectionService(db)
 
 def get_auth_service(db: AsyncIOMotorDatabase = Depends(get_database)) -> AuthService:
     return AuthService(db)
 
-def get_upload_service() -> UploadService:
-    return UploadService()
+def get_upload_service(db: AsyncIOMotorDatabase = Depends(get_admin_database)) -> UploadService:
+    return UploadService(db)
 
 async def get_current_admin(
     credentials: HTTPAuthorizationCredentials = Depends(security),
@@ -0,0 +1,36 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from services.metrics_service import observe_request
+import time
+
+class MetricsMiddleware:
+    """Records request count and latency per route template and status code.
+
+    Implemented as a plain ASGI middleware so the hot path only pays for a
+    timer read and two dictionary updates.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router stores the matched route in the scope; using its path
+            # template keeps label cardinality bounded (no raw ids in labels)
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            observe_request(scope["method"], route_path, status_code, time.perf_counter() - start)
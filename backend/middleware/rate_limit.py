@@ -0,0 +1,156 @@
+from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from services.metrics_service import registry
+import math
+import os
+import time
+
+# Route groups, matched by path prefix in order (first match wins). Each
+# group's limit is "<requests per second>:<burst>" and can be overridden with
+# RATE_LIMIT_<GROUP>, e.g. RATE_LIMIT_SEARCH=2:5; "0" disables the group limit.
+ROUTE_GROUPS: List[Tuple[str, str, str]] = [
+    ("admin_login", "/api/admin/login", "0.2:5"),
+    ("admin", "/api/admin", "20:40"),
+    ("search", "/api/products/search", "5:10"),
+    # A product grid loads dozens of images at once; cached variants are cheap
+    ("images", "/api/img", "50:200"),
+    ("public", "/api", "20:60"),
+]
+
+# Never limited or shed: probes and scrapes must keep working under load
+EXEMPT_PATHS = ("/api/health", "/api/metrics")
+
+# Requests handled concurrently by this worker before new ones are shed with
+# 503; keep it near the Mongo connection pool size so requests fail fast
+# instead of queueing for a connection
+MAX_IN_FLIGHT = int(os.getenv("MAX_IN_FLIGHT_REQUESTS", "200"))
+MAX_TRACKED_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "100000"))
+# Number of proxies in front of the API that append to X-Forwarded-For; set
+# it to 1 behind the ingress. The client is the address the outermost of them
+# saw, i.e. this many entries from the right; entries further left are
+# whatever the client sent and are ignored. 0 (the default, for the API
+# reached directly) ignores the header, since any client could set it.
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+
+http_requests_rejected_total = registry.counter(
+    "http_requests_rejected_total",
+    "Requests rejected by admission control, by route group and reason.",
+    ("group", "reason")
+)
+
+def _parse_limit(value: str) -> Optional[Tuple[float, float]]:
+    rate, _, burst = value.partition(":")
+    rate = float(rate)
+    if rate <= 0:
+        return None
+    return rate, float(burst or max(rate, 1.0))
+
+def load_limits() -> Dict[str, Optional[Tuple[float, float]]]:
+    return {
+        group: _parse_limit(os.getenv(f"RATE_LIMIT_{group.upper()}", default))
+        for group, _, default in ROUTE_GROUPS
+    }
+
+class TokenBucketLimiter:
+    """Token buckets keyed by (route group, client), refilled lazily on access"""
+
+    def __init__(self, max_clients: int = MAX_TRACKED_CLIENTS):
+        self.max_clients = max_clients
+        # key -> (tokens, last refill time); least recently seen first
+        self._buckets: "OrderedDict[Tuple[str, str], Tuple[float, float]]" = OrderedDict()
+
+    def acquire(self, key: Tuple[str, str], rate: float, burst: float) -> float:
+        """Take a token; returns 0 on success, otherwise seconds until one is available"""
+        now = time.monotonic()
+        tokens, last = self._buckets.pop(key, (burst, now))
+        tokens = min(burst, tokens + (now - last) * rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        # Evicting an idle client only forgives its debt, so a plain LRU is safe
+        while len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return wait
+
+class AdmissionControlMiddleware:
+    """Per-client rate limiting plus a per-worker in-flight cap.
+
+    Rate-limited requests get 429 and shed requests get 503, both with a
+    Retry-After header and without touching the database.
+    """
+
+    def __init__(self, app: ASGIApp, max_in_flight: int = MAX_IN_FLIGHT):
+        self.app = app
+        self.max_in_flight = max_in_flight
+        self.limits = load_limits()
+        self.limiter = TokenBucketLimiter()
+        self.in_flight = 0
+
+    @staticmethod
+    def _route_group(path: str) -> Optional[str]:
+        if path.startswith(EXEMPT_PATHS):
+            return None
+        for group, prefix, _ in ROUTE_GROUPS:
+            if path.startswith(prefix):
+                return group
+        return None
+
+    @staticmethod
+    def _client_ip(scope: Scope) -> str:
+        if TRUSTED_PROXY_HOPS > 0:
+            # Repeated headers are one comma-separated list, in order
+            forwarded = [
+                address.strip()
+                for name, value in scope.get("headers", [])
+                if name == b"x-forwarded-for"
+                for address in value.decode("latin-1").split(",")
+                if address.strip()
+            ]
+            if forwarded:
+                return forwarded[-min(TRUSTED_PROXY_HOPS, len(forwarded))]
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send, group: str,
+                      reason: str, status_code: int, retry_after: float) -> None:
+        http_requests_rejected_total.inc((group, reason))
+        detail = "Too many requests" if status_code == 429 else "Server busy, please retry"
+        response = JSONResponse(
+            {"detail": detail},
+            status_code=status_code,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+        await response(scope, receive, send)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        group = self._route_group(scope["path"])
+        if group is None:
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.limits.get(group)
+        if limit is not None:
+            rate, burst = limit
+            wait = self.limiter.acquire((group, self._client_ip(scope)), rate, burst)
+            if wait > 0:
+                await self._reject(scope, receive, send, group, "rate_limited", 429, wait)
+                return
+
+        if self.in_flight >= self.max_in_flight:
+            await self._reject(scope, receive, send, group, "overloaded", 503, 1)
+            return
+
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
@@ -0,0 +1,59 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from services.logging_service import request_id_var
+import logging
+import re
+import time
+import uuid
+
+access_logger = logging.getLogger("access")
+
+# Accept ids from a trusted proxy or client only if they look sane
+_REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+class RequestContextMiddleware:
+    """Assigns each request an id (X-Request-ID, reused when the caller sent
+    a valid one), exposes it to log records and writes one access log line
+    with the status and duration.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                candidate = value.decode("latin-1")
+                if _REQUEST_ID_RE.match(candidate):
+                    request_id = candidate
+                break
+        request_id = request_id or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", request_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            access_logger.info(
+                "%s %s %s %.1fms", scope["method"], scope["path"], status_code, duration_ms,
+                extra={
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status_code,
+                    "duration_ms": round(duration_ms, 1),
+                }
+            )
+            request_id_var.reset(token)
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
+from models.product import ProductCard
 import uuid
 
 class Collection(BaseModel):
@@ -11,6 +12,11 @@ class Collection(BaseModel):
     image: Optional[str] = None
     is_active: bool = True
     sort_order: int = 0
+    # Denormalized from products referencing this collection by name;
+    # maintained incrementally by ProductService
+    product_count: int = 0
+    active_product_count: int = 0
+    on_sale_product_count: int = 0
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -28,4 +34,11 @@ class CollectionUpdate(BaseModel):
     description: Optional[str] = None
     image: Optional[str] = None
     is_active: Optional[bool] = None
-    sort_order: Optional[int] = None
\ No newline at end of file
+    sort_order: Optional[int] = None
+
+class CollectionPage(BaseModel):
+    collection: Collection
+    products: List[ProductCard] = []
+    skip: int = 0
+    limit: int = 24
+    has_more: bool = False
@@ -0,0 +1,15 @@
+from pydantic import BaseModel, Field
+from typing import List
+from datetime import datetime
+from models.collection import Collection
+from models.product import ProductCard
+
+class CollectionBanner(BaseModel):
+    collection: Collection
+    products: List[ProductCard] = []
+
+class HomeSnapshot(BaseModel):
+    collections: List[Collection] = []
+    featured_products: List[ProductCard] = []
+    banners: List[CollectionBanner] = []
+    generated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,63 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+from enum import Enum
+from models.product import StatusEnum
+import uuid
+
+class JobStatusEnum(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+class JobExecutorEnum(str, Enum):
+    ASYNC = "async"  # on the event loop; for I/O bound work
+    THREAD = "thread"  # blocking calls run in a thread pool
+    PROCESS = "process"  # CPU bound calls run in a process pool
+
+class Job(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    type: str
+    params: Dict[str, Any] = {}
+    status: JobStatusEnum = JobStatusEnum.QUEUED
+    # 0..1, with an optional human readable note
+    progress: float = 0.0
+    message: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    max_attempts: int = 3
+    cancel_requested: bool = False
+    run_after: datetime = Field(default_factory=datetime.utcnow)
+    # Set while running; another worker may take the job over once it passes
+    lease_expires_at: Optional[datetime] = None
+    worker_id: Optional[str] = None
+    created_by: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+class JobCreate(BaseModel):
+    type: str
+    params: Dict[str, Any] = {}
+
+class JobList(BaseModel):
+    jobs: List[Job]
+    types: List[str]
+
+class BulkStatusJobParams(BaseModel):
+    product_ids: List[str]
+    status: StatusEnum
+
+class ProductExportJobParams(BaseModel):
+    status: Optional[StatusEnum] = None
+    collection: Optional[str] = None
+
+class ImagePlaceholderJobParams(BaseModel):
+    key: str
+
+class PlaceholderBackfillJobParams(BaseModel):
+    # Regenerate existing placeholders too
+    force: bool = False
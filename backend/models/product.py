@@ -1,7 +1,8 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import List, Optional, Union
 from datetime import datetime
 from enum import Enum
+from models.upload import ImageMeta
 import uuid
 
 class GenderEnum(str, Enum):
@@ -36,6 +37,8 @@ class Product(BaseModel):
     is_on_sale: bool = False
     status: StatusEnum = StatusEnum.ACTIVE
     main_image: str
+    # Filled in from the uploaded image asset; None for external image URLs
+    main_image_meta: Optional[ImageMeta] = None
     gallery_images: List[str] = []
     short_description: str
     full_description: Optional[str] = None
@@ -87,6 +90,41 @@ class ProductUpdate(BaseModel):
     tags: Optional[List[str]] = None
     scheduled_at: Optional[datetime] = None
 
+class ProductViewEnum(str, Enum):
+    FULL = "full"
+    CARD = "card"
+
+class SearchModeEnum(str, Enum):
+    EXACT = "exact"
+    FUZZY = "fuzzy"
+    AUTO = "auto"  # exact first, fuzzy when nothing matches
+
+class ProductCard(BaseModel):
+    """Subset of product fields needed to render a product card"""
+    id: str
+    name: str
+    collection: str
+    price: float
+    original_price: Optional[float] = None
+    gender: GenderEnum
+    type: ProductTypeEnum
+    frame_color: str
+    is_limited_edition: bool = False
+    is_featured: bool = False
+    is_on_sale: bool = False
+    status: StatusEnum = StatusEnum.ACTIVE
+    main_image: str
+    main_image_meta: Optional[ImageMeta] = None
+    short_description: str
+
+class ProductBatchRequest(BaseModel):
+    ids: List[str]
+    view: ProductViewEnum = ProductViewEnum.FULL
+
+class ProductBatchResponse(BaseModel):
+    products: List[Union[Product, ProductCard]]
+    missing: List[str] = []
+
 class ProductFilter(BaseModel):
     collection: Optional[str] = None
     gender: Optional[GenderEnum] = None
@@ -96,4 +134,16 @@ class ProductFilter(BaseModel):
     status: Optional[StatusEnum] = None
     price_min: Optional[float] = None
     price_max: Optional[float] = None
-    search: Optional[str] = None
\ No newline at end of file
+    search: Optional[str] = None
+
+class PriceBucket(BaseModel):
+    min: float
+    max: Optional[float] = None  # None for the open-ended top bucket
+    count: int = 0
+
+class PriceHistogram(BaseModel):
+    buckets: List[PriceBucket] = []
+    below_range: int = 0
+    total: int = 0
+    price_min: Optional[float] = None
+    price_max: Optional[float] = None
@@ -0,0 +1,24 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+from enum import Enum
+from models.collection import Collection
+from models.product import Product
+
+class SyncEntityEnum(str, Enum):
+    PRODUCT = "product"
+    COLLECTION = "collection"
+
+class Tombstone(BaseModel):
+    entity: SyncEntityEnum
+    id: str
+    deleted_at: datetime
+
+class SyncChanges(BaseModel):
+    products: List[Product] = []
+    collections: List[Collection] = []
+    deleted: List[Tombstone] = []
+    since: Optional[str] = None
+    next_since: Optional[str] = None
+    has_more: bool = False
+    full_resync_required: bool = False
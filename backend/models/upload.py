@@ -0,0 +1,64 @@
+from pydantic import BaseModel, Field
+from typing import Dict, Optional
+from datetime import datetime
+from enum import Enum
+import uuid
+
+class UploadSessionStatusEnum(str, Enum):
+    PENDING = "pending"
+    COMPLETED = "completed"
+
+class UploadRequest(BaseModel):
+    filename: str
+    content_type: str
+    size: Optional[int] = Field(None, gt=0, description="Expected size in bytes, checked up front when given")
+    category: str = "products"
+
+class UploadSession(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    key: str
+    content_type: str
+    category: str
+    max_size: int
+    status: UploadSessionStatusEnum = UploadSessionStatusEnum.PENDING
+    created_by: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: datetime
+
+class PresignedUpload(BaseModel):
+    upload_id: str
+    method: str
+    url: str
+    # Form fields to send before the file (POST) or headers to send (PUT)
+    fields: Dict[str, str] = {}
+    headers: Dict[str, str] = {}
+    max_size: int
+    expires_at: datetime
+
+class UploadComplete(BaseModel):
+    upload_id: str
+
+class ImageMeta(BaseModel):
+    """What a client needs to reserve space and paint something before the image loads"""
+    width: int
+    height: int
+    # Tiny blurred preview as a data: URI; None until the background worker has made it
+    placeholder: Optional[str] = None
+
+class ImageAsset(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    url: str
+    key: str
+    category: str
+    content_type: str
+    size: int
+    width: int
+    height: int
+    placeholder: Optional[str] = None
+    created_by: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class ImageFormatEnum(str, Enum):
+    JPEG = "jpeg"
+    WEBP = "webp"
+    PNG = "png"
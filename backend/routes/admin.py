@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, UploadFile, File
 from typing import List
 from models.admin import AdminCreate, AdminLogin, AdminToken, Admin
 from models.product import Product
+from models.upload import UploadRequest, PresignedUpload, UploadComplete, ImageAsset
 from services.auth_service import AuthService
 from services.product_service import ProductService
 from services.upload_service import UploadService
-from dependencies import get_auth_service, get_product_service, get_upload_service, get_current_admin
+from dependencies import get_auth_service, get_admin_product_service, get_upload_service, get_current_admin
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,13 +21,13 @@ async def register_admin(
     """Register a new admin user"""
     try:
         admin = await auth_service.create_admin(admin_data)
-        logger.info(f"New admin registered: {admin.username}")
+        logger.info("New admin registered: %s", admin.username)
         return admin
     
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logger.error(f"Error registering admin: {str(e)}")
+        logger.error("Error registering admin: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.post("/login", response_model=AdminToken)
@@ -37,13 +38,13 @@ async def login_admin(
     """Admin login"""
     try:
         token = await auth_service.login(login_data)
-        logger.info(f"Admin logged in: {login_data.username}")
+        logger.info("Admin logged in: %s", login_data.username)
         return token
     
     except ValueError as e:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     except Exception as e:
-        logger.error(f"Error during admin login: {str(e)}")
+        logger.error("Error during admin login: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/me", response_model=Admin)
@@ -55,10 +56,12 @@ async def get_current_admin_info(
 
 @router.get("/products", response_model=List[Product])
 async def get_admin_products(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=200),
+    include_total: bool = Query(False, description="Return the total product count in X-Total-Count"),
     current_admin: Admin = Depends(get_current_admin),
-    product_service: ProductService = Depends(get_product_service)
+    product_service: ProductService = Depends(get_admin_product_service)
 ):
     """Get all products for admin (including inactive)"""
     try:
@@ -70,10 +73,14 @@ async def get_admin_products(
             sort_by="updated_at",
             sort_order=-1
         )
+        if include_total:
+            response.headers["X-Total-Count"] = str(await product_service.count_products())
         return products
     
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error getting admin products: {str(e)}")
+        logger.error("Error getting admin products: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.put("/products/{product_id}/status")
@@ -81,7 +88,7 @@ async def update_product_status(
     product_id: str,
     status: str,
     current_admin: Admin = Depends(get_current_admin),
-    product_service: ProductService = Depends(get_product_service)
+    product_service: ProductService = Depends(get_admin_product_service)
 ):
     """Update product status"""
     try:
@@ -97,13 +104,13 @@ async def update_product_status(
         if not product:
             raise HTTPException(status_code=404, detail="Product not found")
         
-        logger.info(f"Product status updated: {product_id} to {status} by {current_admin.username}")
+        logger.info("Product status updated: %s to %s by %s", product_id, status, current_admin.username)
         return {"message": "Product status updated successfully"}
     
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error updating product status: {str(e)}")
+        logger.error("Error updating product status: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.put("/products/bulk/status")
@@ -111,7 +118,7 @@ async def bulk_update_product_status(
     product_ids: List[str],
     status: str,
     current_admin: Admin = Depends(get_current_admin),
-    product_service: ProductService = Depends(get_product_service)
+    product_service: ProductService = Depends(get_admin_product_service)
 ):
     """Bulk update product status"""
     try:
@@ -123,7 +130,7 @@ async def bulk_update_product_status(
         
         updated_count = await product_service.bulk_update_status(product_ids, status)
         
-        logger.info(f"Bulk status update: {updated_count} products to {status} by {current_admin.username}")
+        logger.info("Bulk status update: %s products to %s by %s", updated_count, status, current_admin.username)
         return {
             "message": f"Updated {updated_count} products successfully",
             "updated_count": updated_count
@@ -132,13 +139,13 @@ async def bulk_update_product_status(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error bulk updating product status: {str(e)}")
+        logger.error("Error bulk updating product status: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/stats")
 async def get_admin_stats(
     current_admin: Admin = Depends(get_current_admin),
-    product_service: ProductService = Depends(get_product_service)
+    product_service: ProductService = Depends(get_admin_product_service)
 ):
     """Get admin dashboard statistics"""
     try:
@@ -146,7 +153,7 @@ async def get_admin_stats(
         return stats
     
     except Exception as e:
-        logger.error(f"Error getting admin stats: {str(e)}")
+        logger.error("Error getting admin stats: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.post("/upload")
@@ -158,12 +165,14 @@ async def upload_image(
 ):
     """Upload an image"""
     try:
-        image_url = await upload_service.upload_image(file, category)
-        logger.info(f"Image uploaded: {image_url} by {current_admin.username}")
+        image_url = await upload_service.upload_image(file, category, current_admin.id)
+        logger.info("Image uploaded: %s by %s", image_url, current_admin.username)
         return {"image_url": image_url}
     
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error uploading image: {str(e)}")
+        logger.error("Error uploading image: %s", e)
         raise HTTPException(status_code=500, detail="Upload failed")
 
 @router.post("/upload/multiple")
@@ -175,10 +184,66 @@ async def upload_multiple_images(
 ):
     """Upload multiple images"""
     try:
-        image_urls = await upload_service.upload_multiple_images(files, category)
-        logger.info(f"Multiple images uploaded: {len(image_urls)} files by {current_admin.username}")
+        image_urls = await upload_service.upload_multiple_images(files, category, current_admin.id)
+        logger.info("Multiple images uploaded: %s files by %s", len(image_urls), current_admin.username)
         return {"image_urls": image_urls}
     
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error uploading multiple images: {str(e)}")
-        raise HTTPException(status_code=500, detail="Upload failed")
\ No newline at end of file
+        logger.error("Error uploading multiple images: %s", e)
+        raise HTTPException(status_code=500, detail="Upload failed")
+
+@router.post("/upload/presign", response_model=PresignedUpload)
+async def presign_upload(
+    upload: UploadRequest,
+    current_admin: Admin = Depends(get_current_admin),
+    upload_service: UploadService = Depends(get_upload_service)
+):
+    """Get a target to upload an image to directly, bypassing the API"""
+    try:
+        return await upload_service.create_upload(upload, current_admin)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error creating upload: %s", e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.put("/upload/direct/{upload_id}", status_code=204)
+async def direct_upload(
+    upload_id: str,
+    request: Request,
+    upload_service: UploadService = Depends(get_upload_service)
+):
+    """Upload target for storage backends that cannot presign (local disk).
+
+    Like a presigned URL, the unguessable upload id is the credential.
+    """
+    try:
+        await upload_service.receive_direct_upload(upload_id, request.headers.get("content-type"), request.stream())
+        return Response(status_code=204)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error receiving upload %s: %s", upload_id, e)
+        raise HTTPException(status_code=500, detail="Upload failed")
+
+@router.post("/upload/complete", response_model=ImageAsset)
+async def complete_upload(
+    upload: UploadComplete,
+    current_admin: Admin = Depends(get_current_admin),
+    upload_service: UploadService = Depends(get_upload_service)
+):
+    """Validate a direct upload and register the image"""
+    try:
+        asset = await upload_service.complete_upload(upload.upload_id)
+        logger.info("Image uploaded: %s by %s", asset.url, current_admin.username)
+        return asset
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error completing upload: %s", e)
+        raise HTTPException(status_code=500, detail="Upload failed")
@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import List, Optional
-from models.collection import Collection, CollectionCreate, CollectionUpdate
+from models.collection import Collection, CollectionCreate, CollectionUpdate, CollectionPage
 from services.collection_service import CollectionService
-from dependencies import get_collection_service, get_current_admin
+from dependencies import get_collection_service, get_admin_collection_service, get_current_admin
 import logging
 
 logger = logging.getLogger(__name__)
@@ -25,8 +25,10 @@ async def get_collections(
         )
         return collections
     
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error getting collections: {str(e)}")
+        logger.error("Error getting collections: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/active", response_model=List[Collection])
@@ -38,8 +40,10 @@ async def get_active_collections(
         collections = await collection_service.get_active_collections()
         return collections
     
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error getting active collections: {str(e)}")
+        logger.error("Error getting active collections: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/{collection_id}", response_model=Collection)
@@ -57,7 +61,7 @@ async def get_collection(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error getting collection {collection_id}: {str(e)}")
+        logger.error("Error getting collection %s: %s", collection_id, e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/slug/{slug}", response_model=Collection)
@@ -75,32 +79,52 @@ async def get_collection_by_slug(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error getting collection by slug {slug}: {str(e)}")
+        logger.error("Error getting collection by slug %s: %s", slug, e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.get("/slug/{slug}/page", response_model=CollectionPage)
+async def get_collection_page(
+    slug: str,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(24, ge=1, le=100),
+    collection_service: CollectionService = Depends(get_collection_service)
+):
+    """Get a collection with its first page of active product cards in one request"""
+    try:
+        page = await collection_service.get_collection_page(slug, skip=skip, limit=limit)
+        if not page:
+            raise HTTPException(status_code=404, detail="Collection not found")
+        return page
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error getting collection page %s: %s", slug, e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.post("/", response_model=Collection)
 async def create_collection(
     collection_data: CollectionCreate,
-    collection_service: CollectionService = Depends(get_collection_service),
+    collection_service: CollectionService = Depends(get_admin_collection_service),
     current_admin = Depends(get_current_admin)
 ):
     """Create a new collection (Admin only)"""
     try:
         collection = await collection_service.create_collection(collection_data)
-        logger.info(f"Collection created: {collection.id} by admin {current_admin.username}")
+        logger.info("Collection created: %s by admin %s", collection.id, current_admin.username)
         return collection
     
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logger.error(f"Error creating collection: {str(e)}")
+        logger.error("Error creating collection: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.put("/{collection_id}", response_model=Collection)
 async def update_collection(
     collection_id: str,
     update_data: CollectionUpdate,
-    collection_service: CollectionService = Depends(get_collection_service),
+    collection_service: CollectionService = Depends(get_admin_collection_service),
     current_admin = Depends(get_current_admin)
 ):
     """Update a collection (Admin only)"""
@@ -109,19 +133,19 @@ async def update_collection(
         if not collection:
             raise HTTPException(status_code=404, detail="Collection not found")
         
-        logger.info(f"Collection updated: {collection_id} by admin {current_admin.username}")
+        logger.info("Collection updated: %s by admin %s", collection_id, current_admin.username)
         return collection
     
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error updating collection {collection_id}: {str(e)}")
+        logger.error("Error updating collection %s: %s", collection_id, e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.delete("/{collection_id}")
 async def delete_collection(
     collection_id: str,
-    collection_service: CollectionService = Depends(get_collection_service),
+    collection_service: CollectionService = Depends(get_admin_collection_service),
     current_admin = Depends(get_current_admin)
 ):
     """Delete a collection (Admin only)"""
@@ -130,11 +154,11 @@ async def delete_collection(
         if not success:
             raise HTTPException(status_code=404, detail="Collection not found")
         
-        logger.info(f"Collection deleted: {collection_id} by admin {current_admin.username}")
+        logger.info("Collection deleted: %s by admin %s", collection_id, current_admin.username)
         return {"message": "Collection deleted successfully"}
     
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error deleting collection {collection_id}: {str(e)}")
+        logger.error("Error deleting collection %s: %s", collection_id, e)
         raise HTTPException(status_code=500, detail="Internal server error")
\ No newline at end of file
@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from services.feed_service import FeedCache, sitemap_cache, product_feed_cache
+from dependencies import get_admin_database
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api", tags=["feeds"])
+
+XML_CACHE_CONTROL = "public, max-age=3600"
+
+# Feeds read from the primary: the watermark deciding whether to rebuild
+# would otherwise flip between secondaries with different lag, and every
+# flip is a full rebuild. Requests between rebuilds are served from disk.
+
+async def _serve(cache: FeedCache, name: str, db: AsyncIOMotorDatabase) -> FileResponse:
+    try:
+        path = await cache.get_file(db, name)
+    except Exception as e:
+        logger.error("Error generating %s file %s: %s", cache.name, name, e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+    if path is None:
+        raise HTTPException(status_code=404, detail="Sitemap not found")
+    return FileResponse(path, media_type="application/xml", headers={"Cache-Control": XML_CACHE_CONTROL})
+
+@router.get("/sitemap.xml")
+async def get_sitemap_index(db: AsyncIOMotorDatabase = Depends(get_admin_database)):
+    """Sitemap index pointing at the page and product sitemaps"""
+    return await _serve(sitemap_cache, "sitemap.xml", db)
+
+@router.get("/sitemaps/{name}")
+async def get_sitemap(name: str, db: AsyncIOMotorDatabase = Depends(get_admin_database)):
+    """One sitemap file (pages.xml or products-N.xml, at most 50,000 URLs each)"""
+    # Only names listed in the current build are served, so no path traversal
+    if name == "sitemap.xml":
+        raise HTTPException(status_code=404, detail="Sitemap not found")
+    return await _serve(sitemap_cache, name, db)
+
+@router.get("/feeds/products.xml")
+async def get_product_feed(db: AsyncIOMotorDatabase = Depends(get_admin_database)):
+    """Google Shopping product feed (RSS 2.0) of all active products"""
+    return await _serve(product_feed_cache, "products.xml", db)
@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from services.health_service import check_readiness
+from dependencies import client, get_database
+
+router = APIRouter(prefix="/api/health", tags=["health"])
+
+@router.get("/ready")
+async def readiness_check(db: AsyncIOMotorDatabase = Depends(get_database)):
+    """Readiness probe: 503 while MongoDB is unreachable or slow, the connection
+    pool is saturated or the event loop is lagging. Liveness stays at /api/health."""
+    readiness = await check_readiness(client, db)
+    return JSONResponse(readiness, status_code=200 if readiness["status"] == "ready" else 503)
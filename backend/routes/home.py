@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, HTTPException, Response
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from models.home import HomeSnapshot
+from services.home_service import home_snapshot_store
+from dependencies import get_admin_database
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api", tags=["home"])
+
+@router.get("/home", response_model=HomeSnapshot)
+async def get_home(
+    response: Response,
+    # The snapshot is rebuilt right after catalog writes and then served
+    # until the next one, so it must not be built from a lagging secondary
+    db: AsyncIOMotorDatabase = Depends(get_admin_database)
+):
+    """Get the homepage (active collections, featured products, collection banners) in one call"""
+    try:
+        snapshot = await home_snapshot_store.get(db)
+        response.headers["Cache-Control"] = "public, max-age=30"
+        return snapshot
+    
+    except Exception as e:
+        logger.error("Error getting home snapshot: %s", e)
+        raise HTTPException(status_code=500, detail="Internal server error")
@@ -0,0 +1,31 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse
+from typing import Optional
+from models.upload import ImageFormatEnum
+from services.image_probe import FORMAT_CONTENT_TYPES
+from services.image_service import image_service, VARIANT_CACHE_CONTROL
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/img", tags=["images"])
+
+@router.get("/{path:path}")
+async def get_image(
+    path: str,
+    w: Optional[int] = Query(None, ge=1, le=4096, description="Target width; rounded up to a standard size, never upscaled"),
+    fmt: Optional[ImageFormatEnum] = Query(None, description="Output format; defaults to the source format")
+):
+    """An uploaded image (storage key, e.g. products/<id>.jpg) resized and transcoded"""
+    try:
+        image_path = await image_service.get_variant(path, w, fmt.value if fmt else None)
+    except Exception as e:
+        logger.error("Error resizing image %s: %s", path, e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+    if image_path is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    return FileResponse(
+        image_path,
+        media_type=FORMAT_CONTENT_TYPES[image_path.suffix[1:]],
+        headers={"Cache-Control": VARIANT_CACHE_CONTROL}
+    )
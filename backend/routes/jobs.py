@@ -0,0 +1,121 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse, RedirectResponse
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import ValidationError
+from typing import Optional
+from pathlib import Path
+from models.admin import Admin
+from models.job import Job, JobCreate, JobList, JobStatusEnum
+from services.jobs import job_queue, PRODUCT_EXPORT_JOB
+from services.storage import LocalStorage, PRIVATE_CACHE_CONTROL, get_export_storage
+from dependencies import get_admin_database, get_current_admin
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Lifetime of the presigned URL an export download redirects to
+EXPORT_DOWNLOAD_EXPIRES_SECONDS = int(os.getenv("EXPORT_DOWNLOAD_EXPIRES_SECONDS", "300"))
+
+router = APIRouter(prefix="/api/admin/jobs", tags=["jobs"])
+
+@router.post("", response_model=Job, status_code=202)
+async def create_job(
+    job_data: JobCreate,
+    current_admin: Admin = Depends(get_current_admin),
+    db: AsyncIOMotorDatabase = Depends(get_admin_database)
+):
+    """Queue a background job; poll GET /api/admin/jobs/{id} for progress and result"""
+    if job_data.type not in job_queue.types:
+        raise HTTPException(status_code=400, detail=f"Unknown job type: {job_data.type}")
+    try:
+        job = await job_queue.enqueue(db, job_data.type, job_data.params, current_admin.id)
+        logger.info("Job queued: %s %s by %s", job.type, job.id, current_admin.username)
+        return job
+    
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+    except Exception as e:
+        logger.error("Error queueing job: %s", e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.get("", response_model=JobList)
+async def list_jobs(
+    status: Optional[JobStatusEnum] = Query(None),
+    type: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=200),
+    current_admin: Admin = Depends(get_current_admin),
+    db: AsyncIOMotorDatabase = Depends(get_admin_database)
+):
+    """Most recent jobs first, plus the job types that can be queued"""
+    try:
+        jobs = await job_queue.list(db, status=status, job_type=type, limit=limit)
+        return JobList(jobs=jobs, types=sorted(job_queue.types))
+    
+    except Exception as e:
+        logger.error("Error listing jobs: %s", e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.get("/{job_id}", response_model=Job)
+async def get_job(
+    job_id: str,
+    current_admin: Admin = Depends(get_current_admin),
+    db: AsyncIOMotorDatabase = Depends(get_admin_database)
+):
+    """Status, progress and result of a job"""
+    try:
+        job = await job_queue.get(db, job_id)
+    except Exception as e:
+        logger.error("Error getting job %s: %s", job_id, e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/{job_id}/download")
+async def download_job_file(
+    job_id: str,
+    current_admin: Admin = Depends(get_current_admin),
+    db: AsyncIOMotorDatabase = Depends(get_admin_database)
+):
+    """The file a finished export job wrote; on S3 a redirect to a short-lived URL"""
+    try:
+        job = await job_queue.get(db, job_id)
+    except Exception as e:
+        logger.error("Error getting job %s: %s", job_id, e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+    key = (job.result or {}).get("key") if job else None
+    if job is None or job.type != PRODUCT_EXPORT_JOB or job.status != JobStatusEnum.SUCCEEDED or not key:
+        raise HTTPException(status_code=404, detail="Export not found")
+    
+    storage = get_export_storage()
+    filename = Path(key).name
+    url = await storage.presign_download(key, EXPORT_DOWNLOAD_EXPIRES_SECONDS, filename)
+    if url:
+        response = RedirectResponse(url, status_code=307, headers={"Cache-Control": PRIVATE_CACHE_CONTROL})
+    elif isinstance(storage, LocalStorage) and storage.path_for(key).is_file():
+        response = FileResponse(
+            storage.path_for(key), media_type="text/csv", filename=filename,
+            headers={"Cache-Control": PRIVATE_CACHE_CONTROL}
+        )
+    else:
+        raise HTTPException(status_code=404, detail="Export not found")
+    logger.info("Export downloaded: %s by %s", job_id, current_admin.username)
+    return response
+
+@router.post("/{job_id}/cancel", response_model=Job)
+async def cancel_job(
+    job_id: str,
+    current_admin: Admin = Depends(get_current_admin),
+    db: AsyncIOMotorDatabase = Depends(get_admin_database)
+):
+    """Cancel a queued or running job; finished jobs are returned unchanged"""
+    try:
+        job = await job_queue.cancel(db, job_id)
+    except Exception as e:
+        logger.error("Error cancelling job %s: %s", job_id, e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    logger.info("Job cancel requested: %s by %s", job_id, current_admin.username)
+    return job
@@ -1,17 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from typing import List, Optional
-from models.product import Product, ProductCreate, ProductUpdate, ProductFilter
+from models.product import (
+    Product, ProductCreate, ProductUpdate, ProductFilter,
+    ProductBatchRequest, ProductBatchResponse, ProductViewEnum, ProductCard, PriceHistogram,
+    SearchModeEnum
+)
 from services.product_service import ProductService
+from services.recommendation_service import recommendation_service
 from services.auth_service import AuthService
-from dependencies import get_product_service, get_auth_service, get_current_admin
+from dependencies import get_product_service, get_admin_product_service, get_auth_service, get_current_admin
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/products", tags=["products"])
 
+MAX_BATCH_IDS = 100
+
+async def _get_products_batch(product_ids: List[str], view: ProductViewEnum,
+                              product_service: ProductService) -> ProductBatchResponse:
+    if not product_ids:
+        raise HTTPException(status_code=400, detail="At least one product id is required")
+    if len(product_ids) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_IDS} product ids per request")
+
+    products, missing = await product_service.get_products_by_ids(
+        product_ids, card=view == ProductViewEnum.CARD
+    )
+    return ProductBatchResponse(products=products, missing=missing)
+
 @router.get("/", response_model=List[Product])
 async def get_products(
+    response: Response,
     collection: Optional[str] = Query(None),
     gender: Optional[str] = Query(None),
     type: Optional[str] = Query(None),
@@ -25,6 +46,7 @@ async def get_products(
     limit: int = Query(50, ge=1, le=100),
     sort_by: str = Query("created_at"),
     sort_order: int = Query(-1, ge=-1, le=1),
+    include_total: bool = Query(False, description="Return the total match count in X-Total-Count"),
     product_service: ProductService = Depends(get_product_service)
 ):
     """Get products with optional filtering and pagination"""
@@ -41,7 +63,7 @@ async def get_products(
             search=search
         )
         
-        products = await product_service.get_products(
+        page = product_service.get_products(
             filters=filters,
             skip=skip,
             limit=limit,
@@ -49,10 +71,18 @@ async def get_products(
             sort_order=sort_order
         )
         
+        if include_total:
+            products, total = await asyncio.gather(page, product_service.count_products(filters))
+            response.headers["X-Total-Count"] = str(total)
+        else:
+            products = await page
+        
         return products
     
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error getting products: {str(e)}")
+        logger.error("Error getting products: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/featured", response_model=List[Product])
@@ -65,23 +95,104 @@ async def get_featured_products(
         products = await product_service.get_featured_products(limit=limit)
         return products
     
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error getting featured products: {str(e)}")
+        logger.error("Error getting featured products: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/search", response_model=List[Product])
 async def search_products(
     q: str = Query(..., min_length=1),
     limit: int = Query(50, ge=1, le=100),
+    mode: SearchModeEnum = Query(SearchModeEnum.AUTO),
     product_service: ProductService = Depends(get_product_service)
 ):
-    """Search products by name, description, or tags"""
+    """Search products by name, description, or tags; `fuzzy` tolerates typos"""
     try:
-        products = await product_service.search_products(q, limit=limit)
+        products = await product_service.search_products(q, limit=limit, mode=mode)
         return products
     
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error searching products: {str(e)}")
+        logger.error("Error searching products: %s", e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.get("/price-histogram", response_model=PriceHistogram)
+async def get_price_histogram(
+    collection: Optional[str] = Query(None),
+    gender: Optional[str] = Query(None),
+    type: Optional[str] = Query(None),
+    is_featured: Optional[bool] = Query(None),
+    is_on_sale: Optional[bool] = Query(None),
+    status: Optional[str] = Query("active"),
+    search: Optional[str] = Query(None),
+    edges: Optional[str] = Query(None, description="Comma-separated ascending bucket lower edges"),
+    product_service: ProductService = Depends(get_product_service)
+):
+    """Get product counts per price bucket for the price-range slider.
+
+    Uses the same filters as the product listing, except the price range
+    itself, so the slider always shows the full distribution.
+    """
+    try:
+        bucket_edges = None
+        if edges:
+            try:
+                bucket_edges = [float(edge) for edge in edges.split(",") if edge.strip()]
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Bucket edges must be numbers")
+            if not 1 <= len(bucket_edges) <= 50:
+                raise HTTPException(status_code=400, detail="Between 1 and 50 bucket edges are allowed")
+        
+        filters = ProductFilter(
+            collection=collection,
+            gender=gender,
+            type=type,
+            is_featured=is_featured,
+            is_on_sale=is_on_sale,
+            status=status,
+            search=search
+        )
+        return await product_service.get_price_histogram(filters, bucket_edges)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error getting price histogram: %s", e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.get("/batch", response_model=ProductBatchResponse)
+async def get_products_batch(
+    ids: List[str] = Query([], description="Product ids, repeated or comma-separated"),
+    view: ProductViewEnum = Query(ProductViewEnum.FULL),
+    product_service: ProductService = Depends(get_product_service)
+):
+    """Get several products by id in one request (carts, wishlists, recently viewed)"""
+    try:
+        product_ids = [product_id for value in ids for product_id in value.split(",") if product_id]
+        return await _get_products_batch(product_ids, view, product_service)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error getting product batch: %s", e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.post("/batch", response_model=ProductBatchResponse)
+async def post_products_batch(
+    batch: ProductBatchRequest,
+    product_service: ProductService = Depends(get_product_service)
+):
+    """Get several products by id in one request, with the ids in the request body"""
+    try:
+        return await _get_products_batch(batch.ids, batch.view, product_service)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error getting product batch: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/{product_id}", response_model=Product)
@@ -99,32 +210,57 @@ async def get_product(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error getting product {product_id}: {str(e)}")
+        logger.error("Error getting product %s: %s", product_id, e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.get("/{product_id}/related", response_model=List[ProductCard])
+async def get_related_products(
+    product_id: str,
+    limit: int = Query(8, ge=1, le=24),
+    product_service: ProductService = Depends(get_product_service)
+):
+    """Get "you may also like" products for a product"""
+    try:
+        related = recommendation_service.related(product_id, limit)
+        if related is not None:
+            return related
+        
+        # Index still warming up (or product not indexed): same-collection fallback
+        product = await product_service.get_product(product_id)
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found")
+        products = await product_service.get_products_by_collection(product.collection, limit=limit + 1, card=True)
+        return [p for p in products if p.id != product_id][:limit]
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error getting related products for %s: %s", product_id, e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.post("/", response_model=Product)
 async def create_product(
     product_data: ProductCreate,
-    product_service: ProductService = Depends(get_product_service),
+    product_service: ProductService = Depends(get_admin_product_service),
     current_admin = Depends(get_current_admin)
 ):
     """Create a new product (Admin only)"""
     try:
         product = await product_service.create_product(product_data)
-        logger.info(f"Product created: {product.id} by admin {current_admin.username}")
+        logger.info("Product created: %s by admin %s", product.id, current_admin.username)
         return product
     
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logger.error(f"Error creating product: {str(e)}")
+        logger.error("Error creating product: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.put("/{product_id}", response_model=Product)
 async def update_product(
     product_id: str,
     update_data: ProductUpdate,
-    product_service: ProductService = Depends(get_product_service),
+    product_service: ProductService = Depends(get_admin_product_service),
     current_admin = Depends(get_current_admin)
 ):
     """Update a product (Admin only)"""
@@ -133,19 +269,19 @@ async def update_product(
         if not product:
             raise HTTPException(status_code=404, detail="Product not found")
         
-        logger.info(f"Product updated: {product_id} by admin {current_admin.username}")
+        logger.info("Product updated: %s by admin %s", product_id, current_admin.username)
         return product
     
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error updating product {product_id}: {str(e)}")
+        logger.error("Error updating product %s: %s", product_id, e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.delete("/{product_id}")
 async def delete_product(
     product_id: str,
-    product_service: ProductService = Depends(get_product_service),
+    product_service: ProductService = Depends(get_admin_product_service),
     current_admin = Depends(get_current_admin)
 ):
     """Delete a product (Admin only)"""
@@ -154,13 +290,13 @@ async def delete_product(
         if not success:
             raise HTTPException(status_code=404, detail="Product not found")
         
-        logger.info(f"Product deleted: {product_id} by admin {current_admin.username}")
+        logger.info("Product deleted: %s by admin %s", product_id, current_admin.username)
         return {"message": "Product deleted successfully"}
     
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error deleting product {product_id}: {str(e)}")
+        logger.error("Error deleting product %s: %s", product_id, e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/collection/{collection_name}", response_model=List[Product])
@@ -174,6 +310,8 @@ async def get_products_by_collection(
         products = await product_service.get_products_by_collection(collection_name, limit=limit)
         return products
     
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error getting products for collection {collection_name}: {str(e)}")
+        logger.error("Error getting products for collection %s: %s", collection_name, e)
         raise HTTPException(status_code=500, detail="Internal server error")
\ No newline at end of file
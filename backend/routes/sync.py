@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import Optional
+from models.sync import SyncChanges
+from services.sync_service import SyncService, decode_watermark
+from dependencies import get_admin_database
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/sync", tags=["sync"])
+
+@router.get("/changes", response_model=SyncChanges)
+async def get_changes(
+    since: Optional[str] = Query(None, description="next_since from the previous call; omit for a full sync"),
+    limit: int = Query(500, ge=1, le=1000),
+    # Primary reads: on a lagging secondary, changes older than the settle
+    # window could be missing and the watermark would skip past them
+    db: AsyncIOMotorDatabase = Depends(get_admin_database)
+):
+    """Products and collections created, updated or deleted after a watermark.
+
+    Unauthenticated, so products that are not active and inactive
+    collections are only reported as removed.
+    """
+    if since:
+        try:
+            decode_watermark(since)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid since watermark")
+    try:
+        return await SyncService(db).get_public_changes(since=since, limit=limit)
+    
+    except Exception as e:
+        logger.error("Error getting sync changes: %s", e)
+        raise HTTPException(status_code=500, detail="Internal server error")
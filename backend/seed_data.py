@@ -1,10 +1,18 @@
 #!/usr/bin/env python3
 """
 Seed script to populate the database with sample luxury eyewear products
+
+    python seed_data.py                       # hand-written sample catalog
+    python seed_data.py --generate 100000     # synthetic production-sized catalog
+    python seed_data.py --generate 1000000 --batch-size 10000 --writers 8 --seed 7
 """
 
+import argparse
 import asyncio
 import os
+import random
+import time
+import uuid
 from pathlib import Path
 from dotenv import load_dotenv
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -12,7 +20,8 @@ from models.product import Product, GenderEnum, ProductTypeEnum, StatusEnum
 from models.collection import Collection
 from models.admin import Admin, AdminRoleEnum
 from services.auth_service import AuthService
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import Iterator, List
 
 # Load environment variables
 ROOT_DIR = Path(__file__).parent
@@ -144,14 +153,176 @@ sample_collections = [
     }
 ]
 
+# Vocabulary for the synthetic catalog generator
+SYNTHETIC_COLLECTIONS = [
+    "Signature", "Heritage", "Contemporary", "Riviera", "Atelier", "Noir", "Capri",
+    "Amalfi", "Portofino", "Dolomiti", "Murano", "Toscana", "Sartoria", "Milano Moda",
+    "Limited Editions", "Archive", "Sport Luxe", "Titanium Line", "Couture", "Essentials"
+]
+SYNTHETIC_CITIES = ["Milano", "Roma", "Venetian", "Florence", "Capri", "Siena", "Verona",
+                    "Como", "Napoli", "Torino", "Bologna", "Genova", "Lucca", "Positano"]
+SYNTHETIC_SHAPES = ["Aviator", "Classic", "Square", "Round", "Cat-Eye", "Oval", "Pilot",
+                    "Wayfarer", "Butterfly", "Geometric", "Oversized", "Rimless", "Browline"]
+SYNTHETIC_FRAME_COLORS = ["Gold", "Black", "Tortoiseshell", "Silver", "Havana", "Crystal",
+                          "Rose Gold", "Blue Tortoise", "Gunmetal", "Ivory", "Burgundy", "Olive"]
+SYNTHETIC_LENS_COLORS = ["Clear", "Brown Gradient", "Gradient Grey", "Green", "Blue Mirror",
+                         "Rose", "Smoke", "Amber", "Polarized Grey", "Photochromic"]
+SYNTHETIC_MATERIALS = ["Italian Acetate", "Titanium", "18k Gold Plated", "Stainless Steel",
+                       "Bio-Acetate", "Buffalo Horn", "Carbon Fibre", "Palladium Plated"]
+SYNTHETIC_TAGS = ["aviator", "gold", "classic", "square", "vintage", "round", "acetate",
+                  "titanium", "limited", "handcrafted", "italian", "lightweight", "polarized",
+                  "bold", "minimal", "heritage", "contemporary", "oversized", "unisex", "iconic"]
+SYNTHETIC_IMAGES = [product["main_image"] for product in sample_products]
+
+def generate_collections() -> List[dict]:
+    """Collections for every name the generator assigns to products, plus the sample ones"""
+    collections = [Collection(**data).dict() for data in sample_collections]
+    existing_slugs = {collection["slug"] for collection in collections}
+    for index, name in enumerate(SYNTHETIC_COLLECTIONS):
+        slug = name.lower().replace(" ", "-")
+        if slug in existing_slugs:
+            continue
+        collections.append(Collection(
+            name=name,
+            slug=slug,
+            description=f"The {name} collection",
+            image=SYNTHETIC_IMAGES[index % len(SYNTHETIC_IMAGES)],
+            is_active=index % 7 != 6,
+            sort_order=len(collections) + 1
+        ).dict())
+    return collections
+
+def generate_products(count: int, batch_size: int, seed: int = 42) -> Iterator[List[dict]]:
+    """Yield batches of realistic synthetic products; deterministic for a given seed"""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    # Skew collection popularity so a few collections hold most of the catalog
+    collection_weights = [1 / (rank + 1) for rank in range(len(SYNTHETIC_COLLECTIONS))]
+
+    batch = []
+    for index in range(count):
+        shape = rng.choice(SYNTHETIC_SHAPES)
+        frame_color = rng.choice(SYNTHETIC_FRAME_COLORS)
+        product_type = ProductTypeEnum.SUNGLASSES if rng.random() < 0.6 else ProductTypeEnum.EYEGLASSES
+        materials = rng.sample(SYNTHETIC_MATERIALS, rng.randint(1, 2))
+
+        # Log-normal prices between roughly 250 and 5000, rounded to tens
+        price = round(min(max(rng.lognormvariate(6.8, 0.45), 250), 5000), -1)
+        is_on_sale = rng.random() < 0.15
+        original_price = round(price * rng.uniform(1.15, 1.5), -1) if is_on_sale else None
+
+        roll = rng.random()
+        if roll < 0.85:
+            status, scheduled_at = StatusEnum.ACTIVE, None
+        elif roll < 0.95:
+            status, scheduled_at = StatusEnum.INACTIVE, None
+        else:
+            status, scheduled_at = StatusEnum.SCHEDULED, now + timedelta(days=rng.randint(1, 90))
+
+        created_at = now - timedelta(minutes=rng.randint(0, 3 * 365 * 24 * 60))
+        updated_at = created_at + timedelta(minutes=rng.randint(0, int((now - created_at).total_seconds() // 60)))
+        tags = {shape.lower(), frame_color.split()[-1].lower()}
+        tags.update(rng.sample(SYNTHETIC_TAGS, rng.randint(1, 4)))
+
+        product = Product(
+            id=str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            name=f"{rng.choice(SYNTHETIC_CITIES)} {shape} {index:06d}",
+            collection=rng.choices(SYNTHETIC_COLLECTIONS, collection_weights)[0],
+            price=price,
+            original_price=original_price,
+            sku=f"GCG-SYN-{index:07d}",
+            gender=rng.choice(list(GenderEnum)),
+            type=product_type,
+            frame_color=frame_color,
+            lens_color="Clear" if product_type == ProductTypeEnum.EYEGLASSES else rng.choice(SYNTHETIC_LENS_COLORS),
+            materials=", ".join(materials),
+            is_limited_edition=rng.random() < 0.05,
+            is_featured=rng.random() < 0.02,
+            is_on_sale=is_on_sale,
+            status=status,
+            main_image=rng.choice(SYNTHETIC_IMAGES),
+            gallery_images=rng.sample(SYNTHETIC_IMAGES, rng.randint(0, 3)),
+            short_description=f"{shape} frames in {frame_color.lower()} {materials[0].lower()}",
+            full_description=f"Handcrafted {shape.lower()} {product_type.value.lower()} finished in "
+                             f"{frame_color.lower()} with {', '.join(m.lower() for m in materials)}.",
+            tags=sorted(tags),
+            created_at=created_at,
+            updated_at=updated_at,
+            scheduled_at=scheduled_at
+        )
+        batch.append(product.dict())
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+async def seed_synthetic_catalog(db, product_count: int, batch_size: int = 5000,
+                                 writers: int = 4, seed: int = 42) -> None:
+    """Replace the catalog with a generated one using batched, concurrent insert_many calls"""
+    await db.products.delete_many({})
+    await db.collections.delete_many({})
+
+    collections = generate_collections()
+    await db.collections.insert_many(collections)
+    print(f"Created {len(collections)} collections")
+
+    started = time.time()
+    inserted = 0
+    semaphore = asyncio.Semaphore(max(1, writers))
+    pending = set()
+
+    async def write(batch: List[dict]) -> int:
+        try:
+            result = await db.products.insert_many(batch, ordered=False)
+            return len(result.inserted_ids)
+        finally:
+            semaphore.release()
+
+    for batch in generate_products(product_count, batch_size, seed):
+        # Bound the number of batches in flight (and therefore held in memory)
+        await semaphore.acquire()
+        pending.add(asyncio.ensure_future(write(batch)))
+        done = {task for task in pending if task.done()}
+        for task in done:
+            inserted += task.result()
+        pending -= done
+        if done:
+            print(f"  {inserted}/{product_count} products ({inserted / (time.time() - started):.0f}/s)")
+
+    for result in await asyncio.gather(*pending):
+        inserted += result
+
+    print(f"Inserted {inserted} products in {time.time() - started:.1f}s")
+
+async def ensure_admin(db) -> None:
+    auth_service = AuthService(db)
+    existing_admin = await db.admin_users.find_one({"username": "admin"})
+
+    if not existing_admin:
+        from models.admin import AdminCreate
+        admin_data = AdminCreate(
+            username="admin",
+            email="admin@gcgeyewear.com",
+            password="admin123",
+            role=AdminRoleEnum.ADMIN
+        )
+        await auth_service.create_admin(admin_data)
+        print("Created admin user: admin / admin123")
+    else:
+        print("Admin user already exists")
+
+def get_database():
+    mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+    db_name = os.environ.get('DB_NAME', 'test_database')
+    client = AsyncIOMotorClient(mongo_url)
+    return client, client[db_name]
+
 async def seed_database():
     """Seed the database with sample data"""
     try:
         # Connect to database
-        mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
-        db_name = os.environ.get('DB_NAME', 'test_database')
-        client = AsyncIOMotorClient(mongo_url)
-        db = client[db_name]
+        client, db = get_database()
         
         print("Connected to database...")
         
@@ -174,21 +345,7 @@ async def seed_database():
             print(f"Created product: {product.name}")
         
         # Create admin user if it doesn't exist
-        auth_service = AuthService(db)
-        existing_admin = await db.admin_users.find_one({"username": "admin"})
-        
-        if not existing_admin:
-            from models.admin import AdminCreate
-            admin_data = AdminCreate(
-                username="admin",
-                email="admin@gcgeyewear.com",
-                password="admin123",
-                role=AdminRoleEnum.ADMIN
-            )
-            await auth_service.create_admin(admin_data)
-            print("Created admin user: admin / admin123")
-        else:
-            print("Admin user already exists")
+        await ensure_admin(db)
         
         print(f"\n✅ Database seeded successfully!")
         print(f"📊 Collections: {len(sample_collections)}")
@@ -200,5 +357,31 @@ async def seed_database():
     except Exception as e:
         print(f"❌ Error seeding database: {str(e)}")
 
+async def seed_generated(product_count: int, batch_size: int, writers: int, seed: int):
+    """Seed the database with a synthetic catalog of the requested size"""
+    try:
+        client, db = get_database()
+        print(f"Generating {product_count} products (batch size {batch_size}, {writers} writers)...")
+
+        await seed_synthetic_catalog(db, product_count, batch_size, writers, seed)
+        await ensure_admin(db)
+
+        print("\n✅ Synthetic catalog seeded successfully!")
+        client.close()
+
+    except Exception as e:
+        print(f"❌ Error seeding database: {str(e)}")
+
 if __name__ == "__main__":
-    asyncio.run(seed_database())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Seed the GCG Eyewear database")
+    parser.add_argument("--generate", type=int, metavar="N",
+                        help="Generate N synthetic products instead of the sample catalog")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Products per insert_many call")
+    parser.add_argument("--writers", type=int, default=4, help="Concurrent insert_many batches")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for reproducible catalogs")
+    args = parser.parse_args()
+
+    if args.generate:
+        asyncio.run(seed_generated(args.generate, args.batch_size, args.writers, args.seed))
+    else:
+        asyncio.run(seed_database())
\ No newline at end of file
@@ -4,6 +4,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import asyncio
 import logging
 from pathlib import Path
 
@@ -11,6 +12,19 @@ from pathlib import Path
 from routes.products import router as products_router
 from routes.collections import router as collections_router
 from routes.admin import router as admin_router
+from routes.metrics import router as metrics_router
+from routes.home import router as home_router
+from routes.feeds import router as feeds_router
+from routes.sync import router as sync_router
+from routes.images import router as images_router
+from routes.jobs import router as jobs_router
+from routes.health import router as health_router
+from middleware.metrics import MetricsMiddleware
+from middleware.rate_limit import AdmissionControlMiddleware
+from middleware.request_context import RequestContextMiddleware
+from services.logging_service import configure_logging
+from services.metrics_service import mongo_command_listener
+from services.storage import STORAGE_BACKEND, UPLOAD_DIR
 
 # Load environment variables
 ROOT_DIR = Path(__file__).parent
@@ -18,7 +32,7 @@ load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[mongo_command_listener])
 db = client[os.environ['DB_NAME']]
 
 # Create the main app
@@ -37,6 +51,7 @@ async def root():
 
 @api_router.get("/health")
 async def health_check():
+    """Liveness probe: no I/O, so a busy database never gets the process restarted"""
     return {
         "status": "healthy",
         "service": "GCG Eyewear API",
@@ -48,12 +63,21 @@ app.include_router(api_router)
 app.include_router(products_router)
 app.include_router(collections_router)
 app.include_router(admin_router)
+app.include_router(metrics_router)
+app.include_router(home_router)
+app.include_router(feeds_router)
+app.include_router(sync_router)
+app.include_router(images_router)
+app.include_router(jobs_router)
+app.include_router(health_router)
 
-# Static files for uploads
-uploads_dir = Path("/app/backend/uploads")
-uploads_dir.mkdir(exist_ok=True)
+# Static files for uploads (only when they are stored on local disk)
+if STORAGE_BACKEND == "local":
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    app.mount("/uploads", StaticFiles(directory=str(UPLOAD_DIR)), name="uploads")
 
-app.mount("/uploads", StaticFiles(directory="/app/backend/uploads"), name="uploads")
+# Rate limiting and load shedding (inside CORS so rejections carry CORS headers)
+app.add_middleware(AdmissionControlMiddleware)
 
 # CORS middleware
 app.add_middleware(
@@ -62,34 +86,78 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let browsers read pagination totals and request ids on cross-origin responses
+    expose_headers=["X-Total-Count", "X-Request-ID"],
 )
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Request metrics (the timing covers the whole middleware stack)
+app.add_middleware(MetricsMiddleware)
+
+# Request ids and access log (outermost so every log line of a request carries its id)
+app.add_middleware(RequestContextMiddleware)
+
+# Logs are written by a background thread, never on the event loop
+configure_logging()
 logger = logging.getLogger(__name__)
 
 @app.on_event("startup")
 async def startup_db_client():
     """Initialize database collections and indexes"""
+    # Sample event loop lag for the readiness probe
+    from services.health_service import loop_lag_monitor
+    loop_lag_monitor.start()
+    
+    # Started before the setup below, which they do not need, so that a
+    # failure there cannot leave them stopped.
+    # Background jobs (queued ones survive restarts and resume here)
+    from services.jobs import job_queue
+    job_queue.start(db)
+    # Periodically flush buffered admin last_login timestamps
+    from services.activity_service import login_activity
+    login_activity.start()
+    
     try:
         # Create indexes for better performance
         await db.products.create_index("sku", unique=True)
+        await db.products.create_index("id", unique=True)
         await db.products.create_index("status")
         await db.products.create_index("is_featured")
         await db.products.create_index("collection")
         await db.products.create_index("created_at")
+        # (updated_at, id) serves both the delta sync keyset and the feed watermark
+        await db.products.create_index([("updated_at", 1), ("id", 1)])
         
         await db.collections.create_index("slug", unique=True)
         await db.collections.create_index("is_active")
+        await db.collections.create_index([("updated_at", 1), ("id", 1)])
+        
+        from services.sync_service import TOMBSTONE_TTL_SECONDS
+        await db.tombstones.create_index([("deleted_at", 1), ("id", 1)])
+        await db.tombstones.create_index("deleted_at", expireAfterSeconds=TOMBSTONE_TTL_SECONDS)
+        
+        from services.upload_service import UPLOAD_SESSION_TTL_SECONDS
+        await db.upload_sessions.create_index("id", unique=True)
+        await db.upload_sessions.create_index("created_at", expireAfterSeconds=UPLOAD_SESSION_TTL_SECONDS)
+        await db.image_assets.create_index("key", unique=True)
+        await db.image_assets.create_index("url")
+        
+        from services.job_queue import JOB_RETENTION_SECONDS
+        await db.jobs.create_index("id", unique=True)
+        # Claim query: due queued jobs and expired leases, oldest first
+        await db.jobs.create_index([("status", 1), ("run_after", 1)])
+        await db.jobs.create_index([("created_at", -1)])
+        await db.jobs.create_index("finished_at", expireAfterSeconds=JOB_RETENTION_SECONDS)
         
         await db.admin_users.create_index("username", unique=True)
         await db.admin_users.create_index("email", unique=True)
         
         logger.info("Database indexes created successfully")
         
+        # Placeholders for images uploaded while no job worker was running
+        # (deduplicated through the unique jobs.id index created above)
+        from services.jobs import PLACEHOLDER_BACKFILL_JOB, STARTUP_BACKFILL_JOB_ID
+        await job_queue.enqueue(db, PLACEHOLDER_BACKFILL_JOB, job_id=STARTUP_BACKFILL_JOB_ID)
+        
         # Create default admin user if none exists
         from services.auth_service import AuthService
         from models.admin import AdminCreate, AdminRoleEnum
@@ -110,11 +178,43 @@ async def startup_db_client():
             await auth_service.create_admin(default_admin)
             logger.info("Default admin user created: username=admin, password=admin123")
         
+        # Repair any drift in the denormalized per-collection product counts
+        from services.collection_service import CollectionService
+        await CollectionService(db).recount_product_counts()
+        
+        # Warm the homepage snapshot so the first visitor does not pay for it
+        from services.home_service import home_snapshot_store
+        await home_snapshot_store.refresh(db)
+        
+        # Build the recommendation index in the background; related-product
+        # requests fall back to a collection query until it is ready
+        from services.recommendation_service import recommendation_service
+        asyncio.create_task(recommendation_service.build_in_background(db))
+        
+        # Fuzzy search falls back to exact matching until its index is built
+        from services.search_service import search_service
+        asyncio.create_task(search_service.rebuild(db))
+        
+        # Optional in-memory filter engine; product listings use Mongo until it is built
+        from services.catalog_engine import catalog_engine, ENABLED as CATALOG_ENGINE_ENABLED
+        if CATALOG_ENGINE_ENABLED:
+            asyncio.create_task(catalog_engine.rebuild(db))
+        
     except Exception as e:
-        logger.error(f"Error during startup: {str(e)}")
+        logger.error("Error during startup: %s", e)
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    # Write buffered activity timestamps before the connection goes away
+    from services.activity_service import login_activity
+    await login_activity.stop()
+    from services.health_service import loop_lag_monitor
+    loop_lag_monitor.stop()
+    # Hand running jobs back to the queue for another worker
+    from services.jobs import job_queue
+    await job_queue.stop()
+    from services.image_service import image_service
+    image_service.shutdown()
     client.close()
     logger.info("Database connection closed")
 
@@ -0,0 +1,78 @@
+from typing import Dict, Optional
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from datetime import datetime
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_SECONDS = float(os.getenv("ACTIVITY_FLUSH_INTERVAL_SECONDS", "5"))
+# Flush early once this many documents are waiting
+MAX_PENDING = int(os.getenv("ACTIVITY_MAX_PENDING", "1000"))
+
+class ActivityBuffer:
+    """Coalesces "last seen" timestamp writes and flushes them in bulk.
+
+    Only the newest timestamp per document is kept, and flushes use $max so
+    an out-of-order flush can never move a timestamp backwards.
+    """
+
+    def __init__(self, collection_name: str, field: str):
+        self.collection_name = collection_name
+        self.field = field
+        self.db: Optional[AsyncIOMotorDatabase] = None
+        self._pending: Dict[str, datetime] = {}
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, db: AsyncIOMotorDatabase, document_id: str, when: Optional[datetime] = None) -> None:
+        self.db = db
+        when = when or datetime.utcnow()
+        current = self._pending.get(document_id)
+        if current is None or when > current:
+            self._pending[document_id] = when
+        if len(self._pending) >= MAX_PENDING:
+            asyncio.ensure_future(self.flush())
+
+    async def flush(self) -> int:
+        """Write every pending timestamp; on failure they are kept for the next flush"""
+        async with self._flush_lock:
+            if not self._pending or self.db is None:
+                return 0
+            pending, self._pending = self._pending, {}
+            requests = [
+                UpdateOne({"id": document_id}, {"$max": {self.field: when}})
+                for document_id, when in pending.items()
+            ]
+            try:
+                await self.db[self.collection_name].bulk_write(requests, ordered=False)
+            except Exception as e:
+                logger.error("Error flushing %s.%s: %s", self.collection_name, self.field, e)
+                for document_id, when in pending.items():
+                    self.record(self.db, document_id, when)
+                return 0
+            return len(requests)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL_SECONDS)
+            await self.flush()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the periodic flush and write whatever is still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+login_activity = ActivityBuffer("admin_users", "last_login")
@@ -1,6 +1,7 @@
 from typing import Optional
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from models.admin import Admin, AdminCreate, AdminLogin, AdminToken
+from services.activity_service import login_activity
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
@@ -70,11 +71,8 @@ class AuthService:
         if not self.verify_password(password, admin.password_hash):
             return None
         
-        # Update last login
-        await self.collection.update_one(
-            {"id": admin.id},
-            {"$set": {"last_login": datetime.utcnow()}}
-        )
+        # Update last login (buffered and written in bulk off the request path)
+        login_activity.record(self.db, admin.id)
         
         return admin
 
@@ -0,0 +1,375 @@
+from typing import Dict, List, Optional, Set, Tuple
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from models.product import ProductFilter
+from services import catalog_events
+from services.sync_service import SyncService, SETTLE_SECONDS
+from datetime import datetime, timedelta
+from enum import Enum
+import numpy as np
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("CATALOG_ENGINE_ENABLED", "false").lower() in ("1", "true", "yes")
+# How often to pick up writes made by other workers (via the delta sync feed)
+SYNC_INTERVAL_SECONDS = float(os.getenv("CATALOG_ENGINE_SYNC_SECONDS", "5"))
+
+FACET_FIELDS = ("collection", "gender", "type", "status")
+FLAG_FIELDS = ("is_featured", "is_on_sale")
+SORT_FIELDS = ("created_at", "updated_at", "price", "name")
+ENGINE_PROJECTION = {"_id": 0, "id": 1, **{field: 1 for field in FACET_FIELDS + FLAG_FIELDS + SORT_FIELDS}}
+
+def _facet_value(value) -> str:
+    # Documents from Mongo hold plain strings; models hold enum members
+    return str(value.value if isinstance(value, Enum) else value)
+
+def _words_for(rows: int) -> int:
+    return (rows + 63) // 64
+
+class Bitset:
+    """Fixed-capacity bitset packed into uint64 words"""
+
+    __slots__ = ("words",)
+
+    def __init__(self, words: np.ndarray):
+        self.words = words
+
+    @classmethod
+    def empty(cls, capacity_words: int) -> "Bitset":
+        return cls(np.zeros(capacity_words, dtype=np.uint64))
+
+    @classmethod
+    def from_rows(cls, rows: np.ndarray, capacity_words: int) -> "Bitset":
+        bools = np.zeros(capacity_words * 64, dtype=bool)
+        bools[rows] = True
+        return cls(np.packbits(bools, bitorder="little").view(np.uint64))
+
+    def grow(self, capacity_words: int) -> None:
+        if capacity_words > len(self.words):
+            self.words = np.concatenate([self.words, np.zeros(capacity_words - len(self.words), dtype=np.uint64)])
+
+    def set(self, row: int) -> None:
+        self.words[row >> 6] |= np.uint64(1 << (row & 63))
+
+    def clear(self, row: int) -> None:
+        self.words[row >> 6] &= ~np.uint64(1 << (row & 63))
+
+    def to_bools(self, size: int) -> np.ndarray:
+        return np.unpackbits(self.words.view(np.uint8), bitorder="little")[:size].astype(bool)
+
+class CatalogIndex:
+    """Per-facet-value bitsets plus per-field sort orders over the catalog.
+
+    Rows are never reused: a deleted product just leaves the `alive` set.
+    Sort orders are built with the index and afterwards repaired in place for
+    the rows written since (ties break by row, as the stable build sort does);
+    the sorted price array is rebuilt lazily after writes.
+    Not thread-safe; callers serialise mutations.
+    """
+
+    def __init__(self):
+        self.row_of: Dict[str, int] = {}
+        self.ids: List[Optional[str]] = []
+        self.capacity_words = 0
+        self.alive = Bitset.empty(0)
+        self.facets: Dict[str, Dict[str, Bitset]] = {field: {} for field in FACET_FIELDS}
+        self.flags: Dict[str, Bitset] = {field: Bitset.empty(0) for field in FLAG_FIELDS}
+        self.values: Dict[str, list] = {field: [] for field in FACET_FIELDS}
+        self.sort_keys: Dict[str, list] = {field: [] for field in SORT_FIELDS}
+        self._orders: Dict[str, np.ndarray] = {}
+        # Rows whose sort keys changed since each order was last repaired
+        self._moved: Dict[str, Set[int]] = {field: set() for field in SORT_FIELDS}
+        self._prices: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    @property
+    def size(self) -> int:
+        return len(self.ids)
+
+    def _ensure_capacity(self, rows: int) -> None:
+        needed = _words_for(rows)
+        if needed <= self.capacity_words:
+            return
+        self.capacity_words = max(needed, int(self.capacity_words * 1.5) + 16)
+        for bitset in [self.alive, *self.flags.values()] + [b for values in self.facets.values() for b in values.values()]:
+            bitset.grow(self.capacity_words)
+
+    def _facet(self, field: str, value: str) -> Bitset:
+        bitset = self.facets[field].get(value)
+        if bitset is None:
+            bitset = self.facets[field][value] = Bitset.empty(self.capacity_words)
+        return bitset
+
+    @staticmethod
+    def _sort_key(field: str, product: dict):
+        value = product.get(field)
+        if field == "name":
+            return value or ""
+        if isinstance(value, datetime):
+            return value.timestamp()
+        return float(value) if value is not None else float("-inf")
+
+    def build(self, products: List[dict]) -> None:
+        self.__init__()
+        self._ensure_capacity(len(products))
+        for field in SORT_FIELDS:
+            self.sort_keys[field] = [self._sort_key(field, product) for product in products]
+        self.ids = [product["id"] for product in products]
+        self.row_of = {product_id: row for row, product_id in enumerate(self.ids)}
+        all_rows = np.arange(len(products))
+        self.alive = Bitset.from_rows(all_rows, self.capacity_words)
+        for field in FACET_FIELDS:
+            column = [_facet_value(product.get(field)) for product in products]
+            self.values[field] = column
+            grouped: Dict[str, List[int]] = {}
+            for row, value in enumerate(column):
+                grouped.setdefault(value, []).append(row)
+            self.facets[field] = {
+                value: Bitset.from_rows(np.array(rows), self.capacity_words) for value, rows in grouped.items()
+            }
+        for field in FLAG_FIELDS:
+            rows = [row for row, product in enumerate(products) if product.get(field)]
+            self.flags[field] = Bitset.from_rows(np.array(rows, dtype=np.int64), self.capacity_words)
+        # Sorting is the expensive part, so do it here (off the event loop)
+        # rather than on the first listing
+        for field in SORT_FIELDS:
+            self._order(field)
+
+    def upsert(self, product: dict) -> None:
+        row = self.row_of.get(product["id"])
+        if row is None:
+            row = self.size
+            self._ensure_capacity(row + 1)
+            self.ids.append(product["id"])
+            self.row_of[product["id"]] = row
+            for field in FACET_FIELDS:
+                self.values[field].append(None)
+            for field in SORT_FIELDS:
+                self.sort_keys[field].append(None)
+        self.alive.set(row)
+        for field in FACET_FIELDS:
+            value = _facet_value(product.get(field))
+            old = self.values[field][row]
+            if old != value:
+                if old is not None:
+                    self.facets[field][old].clear(row)
+                self._facet(field, value).set(row)
+                self.values[field][row] = value
+        for field in FLAG_FIELDS:
+            if product.get(field):
+                self.flags[field].set(row)
+            else:
+                self.flags[field].clear(row)
+        for field in SORT_FIELDS:
+            self.sort_keys[field][row] = self._sort_key(field, product)
+            if field in self._orders:
+                self._moved[field].add(row)
+        self._prices = None
+
+    def remove(self, product_id: str) -> None:
+        row = self.row_of.pop(product_id, None)
+        if row is None:
+            return
+        # The row stays in the sort orders; leaving `alive` filters it out
+        self.ids[row] = None
+        self.alive.clear(row)
+
+    def _order(self, field: str) -> np.ndarray:
+        order = self._orders.get(field)
+        if order is None:
+            keys = self.sort_keys[field]
+            if field == "name":
+                order = np.array(sorted(range(self.size), key=keys.__getitem__), dtype=np.int64)
+            else:
+                order = np.argsort(np.array(keys, dtype=np.float64), kind="stable")
+            self._orders[field] = order
+            self._moved[field].clear()
+        elif self._moved[field]:
+            order = self._orders[field] = self._repair(field, order)
+        return order
+
+    def _repair(self, field: str, order: np.ndarray) -> np.ndarray:
+        """Move the rows written since the last repair to their new positions.
+
+        O(size) array work plus a binary search per moved row, instead of a
+        full re-sort (which for names is a pure-Python sort) on every write.
+        """
+        keys = self.sort_keys[field]
+        moved = sorted(self._moved[field], key=lambda row: (keys[row], row))
+        self._moved[field].clear()
+        keep = np.ones(self.size, dtype=bool)
+        keep[moved] = False
+        order = order[keep[order]]
+        positions = [self._position(order, keys, row) for row in moved]
+        return np.insert(order, positions, moved)
+
+    @staticmethod
+    def _position(order: np.ndarray, keys: list, row: int) -> int:
+        """Index in `order` (sorted by key, then row) before which `row` belongs"""
+        target = (keys[row], row)
+        low, high = 0, len(order)
+        while low < high:
+            middle = (low + high) // 2
+            other = int(order[middle])
+            if (keys[other], other) < target:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _price_rows(self, price_min: Optional[float], price_max: Optional[float]) -> np.ndarray:
+        if self._prices is None:
+            order = self._order("price")
+            self._prices = (np.array(self.sort_keys["price"], dtype=np.float64)[order], order)
+        sorted_prices, order = self._prices
+        start = 0 if price_min is None else np.searchsorted(sorted_prices, price_min, side="left")
+        end = len(sorted_prices) if price_max is None else np.searchsorted(sorted_prices, price_max, side="right")
+        return order[start:end]
+
+    def match(self, filters: Optional[ProductFilter]) -> np.ndarray:
+        """Boolean mask over rows for the filter combination"""
+        words = self.alive.words.copy()
+        if filters is not None:
+            for field in FACET_FIELDS:
+                value = getattr(filters, field)
+                if value:
+                    bitset = self.facets[field].get(_facet_value(value))
+                    if bitset is None:
+                        return np.zeros(self.size, dtype=bool)
+                    words &= bitset.words
+            for field in FLAG_FIELDS:
+                value = getattr(filters, field)
+                if value is True:
+                    words &= self.flags[field].words
+                elif value is False:
+                    words &= ~self.flags[field].words
+            if filters.price_min is not None or filters.price_max is not None:
+                in_range = Bitset.from_rows(self._price_rows(filters.price_min, filters.price_max), self.capacity_words)
+                words &= in_range.words
+        return Bitset(words).to_bools(self.size)
+
+    def query(self, filters: Optional[ProductFilter], skip: int, limit: int,
+              sort_by: str, sort_order: int) -> Tuple[List[str], int]:
+        """One page of matching product ids in sort order, plus the total match count"""
+        mask = self.match(filters)
+        order = self._order(sort_by)
+        if sort_order < 0:
+            order = order[::-1]
+        ranked = order[mask[order]]
+        return [self.ids[row] for row in ranked[skip:skip + limit]], len(ranked)
+
+    def count(self, filters: Optional[ProductFilter]) -> int:
+        return int(self.match(filters).sum())
+
+class CatalogEngine:
+    """Optional in-process filter engine (CATALOG_ENGINE_ENABLED).
+
+    Kept current from this worker's catalog events and, for writes made by
+    other workers, by polling the delta sync feed. Answers only while no
+    local write is still being applied, so callers read their own writes.
+    """
+
+    def __init__(self):
+        self.index: Optional[CatalogIndex] = None
+        self.db: Optional[AsyncIOMotorDatabase] = None
+        self._lock = asyncio.Lock()
+        self._pending_ids: set = set()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._sync_task: Optional[asyncio.Task] = None
+        self._since: Optional[str] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.index is not None and not self._pending_ids and not self._refreshing
+
+    @property
+    def _refreshing(self) -> bool:
+        return self._refresh_task is not None and not self._refresh_task.done()
+
+    @staticmethod
+    def supports(filters: Optional[ProductFilter], sort_by: str) -> bool:
+        return sort_by in SORT_FIELDS and (filters is None or not filters.search)
+
+    def query(self, filters: Optional[ProductFilter], skip: int, limit: int,
+              sort_by: str, sort_order: int) -> Tuple[List[str], int]:
+        return self.index.query(filters, skip, limit, sort_by, sort_order)
+
+    def count(self, filters: Optional[ProductFilter]) -> int:
+        return self.index.count(filters)
+
+    async def rebuild(self, db: AsyncIOMotorDatabase) -> None:
+        self.db = db
+        started = datetime.utcnow()
+        products = await db.products.find({}, ENGINE_PROJECTION).to_list(length=None)
+        index = CatalogIndex()
+        await asyncio.to_thread(index.build, products)
+        async with self._lock:
+            self.index = index
+            # Replay anything written during the load; re-applying is harmless
+            self._since = (started - timedelta(seconds=2 * SETTLE_SECONDS)).isoformat()
+        logger.info("Catalog engine built for %s products", len(products))
+        self._schedule_refresh()
+        if self._sync_task is None or self._sync_task.done():
+            self._sync_task = asyncio.get_running_loop().create_task(self._sync_loop())
+
+    async def _sync_loop(self) -> None:
+        while True:
+            await asyncio.sleep(SYNC_INTERVAL_SECONDS)
+            try:
+                await self._sync_once()
+            except Exception as e:
+                logger.error("Error syncing catalog engine: %s", e)
+
+    async def _sync_once(self) -> None:
+        sync_service = SyncService(self.db)
+        while True:
+            changes = await sync_service.get_changes(since=self._since, limit=1000)
+            if changes.full_resync_required:
+                await self.rebuild(self.db)
+                return
+            async with self._lock:
+                for product in changes.products:
+                    self.index.upsert(product.dict())
+                for tombstone in changes.deleted:
+                    if tombstone.entity == "product":
+                        self.index.remove(tombstone.id)
+                self._since = changes.next_since or self._since
+            if not changes.has_more:
+                return
+
+    def on_catalog_change(self, entity: str, action: str, ids: List[str]) -> None:
+        if entity != "product" or self.db is None:
+            return
+        self._pending_ids.update(ids)
+        self._schedule_refresh()
+
+    def _schedule_refresh(self) -> None:
+        if self.index is None or not self._pending_ids:
+            return
+        if not self._refreshing:
+            try:
+                self._refresh_task = asyncio.get_running_loop().create_task(self._apply_pending())
+            except RuntimeError:
+                pass
+
+    async def _apply_pending(self) -> None:
+        while self._pending_ids:
+            ids = list(self._pending_ids)
+            try:
+                products = await self.db.products.find({"id": {"$in": ids}}, ENGINE_PROJECTION).to_list(length=None)
+                async with self._lock:
+                    found = {product["id"] for product in products}
+                    for product in products:
+                        self.index.upsert(product)
+                    for product_id in ids:
+                        if product_id not in found:
+                            self.index.remove(product_id)
+                self._pending_ids.difference_update(ids)
+            except Exception as e:
+                # Leave the ids pending (engine stays bypassed) and retry later
+                logger.error("Error refreshing catalog engine: %s", e)
+                await asyncio.sleep(1)
+
+catalog_engine = CatalogEngine()
+catalog_events.subscribe(catalog_engine.on_catalog_change)
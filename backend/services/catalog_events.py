@@ -0,0 +1,28 @@
+from typing import Callable, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+# In-process hooks notified after catalog writes so derived data (snapshots,
+# caches, indexes) can refresh itself. Listeners are called synchronously and
+# must not block; anything slow should be scheduled in the background.
+CatalogListener = Callable[[str, str, List[str]], None]
+
+_listeners: List[CatalogListener] = []
+
+def subscribe(listener: CatalogListener) -> CatalogListener:
+    if listener not in _listeners:
+        _listeners.append(listener)
+    return listener
+
+def unsubscribe(listener: CatalogListener) -> None:
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+def publish(entity: str, action: str, ids: List[str]) -> None:
+    """Notify listeners that `entity` ("product" or "collection") records were created/updated/deleted"""
+    for listener in list(_listeners):
+        try:
+            listener(entity, action, ids)
+        except Exception as e:
+            logger.error("Catalog listener %s failed: %s", getattr(listener, '__name__', listener), e)
@@ -1,11 +1,33 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from models.collection import Collection, CollectionCreate, CollectionUpdate
+from models.collection import Collection, CollectionCreate, CollectionUpdate, CollectionPage
+from services import catalog_events
+from services.resilience import CatalogReadCache, READ_MAX_TIME_MS, read_scope
+from services.sync_service import write_tombstone
 from datetime import datetime
+import asyncio
+
+# Collection reads share in-flight queries and can be served stale; product
+# writes change the denormalized counts, so they invalidate too
+_collection_reads = CatalogReadCache("collections")
+catalog_events.subscribe(_collection_reads.invalidate)
+
+COUNT_FIELDS = ("product_count", "active_product_count", "on_sale_product_count")
+
+# slug -> collection name, so a collection page can query its products
+# concurrently with the collection lookup itself
+_slug_names: Dict[str, str] = {}
+
+def _forget_slugs(entity: str, action: str, ids: List[str]) -> None:
+    if entity == "collection" and action != "created":
+        _slug_names.clear()
+
+catalog_events.subscribe(_forget_slugs)
 
 class CollectionService:
     def __init__(self, db: AsyncIOMotorDatabase):
         self.db = db
+        self.read_scope = read_scope(db)
         self.collection = db.collections
 
     async def create_collection(self, collection_data: CollectionCreate) -> Collection:
@@ -15,27 +37,82 @@ class CollectionService:
             raise ValueError(f"Collection with slug {collection_data.slug} already exists")
         
         collection = Collection(**collection_data.dict())
+        # Products may already reference this collection by name
+        counts = await self.count_products([collection.name])
+        for field, value in counts.get(collection.name, {}).items():
+            setattr(collection, field, value)
         await self.collection.insert_one(collection.dict())
+        catalog_events.publish("collection", "created", [collection.id])
         return collection
 
     async def get_collection(self, collection_id: str) -> Optional[Collection]:
-        collection_data = await self.collection.find_one({"id": collection_id})
+        return await _collection_reads.get(
+            ("get_collection", *self.read_scope, collection_id),
+            lambda: self._find_collection({"id": collection_id})
+        )
+
+    async def _find_collection(self, query: dict) -> Optional[Collection]:
+        collection_data = await self.collection.find_one(query, max_time_ms=READ_MAX_TIME_MS)
         return Collection(**collection_data) if collection_data else None
 
     async def get_collection_by_slug(self, slug: str) -> Optional[Collection]:
-        collection_data = await self.collection.find_one({"slug": slug})
-        return Collection(**collection_data) if collection_data else None
+        collection = await _collection_reads.get(
+            ("get_collection_by_slug", *self.read_scope, slug),
+            lambda: self._find_collection({"slug": slug})
+        )
+        if not collection:
+            return None
+        _slug_names[slug] = collection.name
+        return collection
+
+    async def get_collection_page(self, slug: str, skip: int = 0, limit: int = 24) -> Optional[CollectionPage]:
+        from services.product_service import ProductService
+        product_service = ProductService(self.db)
+
+        async def load_products(name: str):
+            # One extra row tells us whether another page exists
+            return await product_service.get_products_by_collection(
+                name, skip=skip, limit=limit + 1, card=True
+            )
+
+        cached_name = _slug_names.get(slug)
+        if cached_name is not None:
+            collection, products = await asyncio.gather(
+                self.get_collection_by_slug(slug),
+                load_products(cached_name)
+            )
+            if collection is not None and collection.name != cached_name:
+                products = await load_products(collection.name)
+        else:
+            collection = await self.get_collection_by_slug(slug)
+            products = await load_products(collection.name) if collection else []
+
+        if collection is None:
+            return None
+
+        return CollectionPage(
+            collection=collection,
+            products=products[:limit],
+            skip=skip,
+            limit=limit,
+            has_more=len(products) > limit
+        )
 
     async def get_collections(self, 
                              is_active: Optional[bool] = None,
                              skip: int = 0,
                              limit: int = 50) -> List[Collection]:
-        
+        return await _collection_reads.get(
+            ("get_collections", *self.read_scope, is_active, skip, limit),
+            lambda: self._find_collections(is_active, skip, limit)
+        )
+
+    async def _find_collections(self, is_active: Optional[bool], skip: int, limit: int) -> List[Collection]:
         query = {}
         if is_active is not None:
             query["is_active"] = is_active
         
-        cursor = self.collection.find(query).sort("sort_order", 1).skip(skip).limit(limit)
+        cursor = self.collection.find(query).sort("sort_order", 1).skip(skip).limit(limit).max_time_ms(READ_MAX_TIME_MS)
         collections = await cursor.to_list(length=None)
         return [Collection(**collection) for collection in collections]
 
@@ -54,12 +131,60 @@ class CollectionService:
         )
         
         if result.modified_count:
-            return await self.get_collection(collection_id)
+            if "name" in update_dict:
+                # Products are linked by name, so a rename changes which products count
+                await self.recount_product_counts([update_dict["name"]])
+            catalog_events.publish("collection", "updated", [collection_id])
+            # Read our own write directly rather than joining an older in-flight read
+            return await self._find_collection({"id": collection_id})
         return None
 
     async def delete_collection(self, collection_id: str) -> bool:
         result = await self.collection.delete_one({"id": collection_id})
+        if result.deleted_count:
+            await write_tombstone(self.db, "collection", collection_id)
+            catalog_events.publish("collection", "deleted", [collection_id])
         return result.deleted_count > 0
 
     async def get_active_collections(self) -> List[Collection]:
-        return await self.get_collections(is_active=True)
\ No newline at end of file
+        return await self.get_collections(is_active=True)
+
+    async def count_products(self, names: Optional[List[str]] = None) -> Dict[str, Dict[str, int]]:
+        pipeline = []
+        if names is not None:
+            pipeline.append({"$match": {"collection": {"$in": names}}})
+        pipeline.append({
+            "$group": {
+                "_id": "$collection",
+                "product_count": {"$sum": 1},
+                "active_product_count": {
+                    "$sum": {"$cond": [{"$eq": ["$status", "active"]}, 1, 0]}
+                },
+                "on_sale_product_count": {
+                    "$sum": {"$cond": [{"$and": [{"$eq": ["$status", "active"]}, "$is_on_sale"]}, 1, 0]}
+                }
+            }
+        })
+        results = await self.db.products.aggregate(pipeline).to_list(length=None)
+        return {result["_id"]: {field: result[field] for field in COUNT_FIELDS} for result in results}
+
+    async def recount_product_counts(self, names: Optional[List[str]] = None) -> None:
+        """Recompute product counts from scratch (all collections, or only `names`)"""
+        counts = await self.count_products(names)
+        if names is None:
+            names = await self.collection.distinct("name")
+        for name in set(names):
+            values = counts.get(name, {field: 0 for field in COUNT_FIELDS})
+            # Only touch (and bump updated_at on) collections whose counts drifted
+            drifted = {"name": name, "$or": [{field: {"$ne": value}} for field, value in values.items()]}
+            await self.collection.update_many(drifted, {"$set": {**values, "updated_at": datetime.utcnow()}})
+
+    async def apply_product_count_deltas(self, deltas: Dict[str, Dict[str, int]]) -> None:
+        for name, delta in deltas.items():
+            increments = {field: value for field, value in delta.items() if value}
+            if increments:
+                # Counts are part of the synced document, so they bump updated_at
+                await self.collection.update_many(
+                    {"name": name},
+                    {"$inc": increments, "$set": {"updated_at": datetime.utcnow()}}
+                )
@@ -0,0 +1,286 @@
+from typing import Awaitable, Callable, Dict, List, Optional
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+from motor.motor_asyncio import AsyncIOMotorDatabase
+import asyncio
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+SITE_URL = os.getenv("SITE_URL", "http://localhost:3000").rstrip("/")
+# Storefront paths; the product page path is configurable until the frontend has one
+COLLECTION_PATH = os.getenv("SITEMAP_COLLECTION_PATH", "/collections/{slug}")
+PRODUCT_PATH = os.getenv("SITEMAP_PRODUCT_PATH", "/products/{id}")
+STATIC_PAGES = ["/", "/collections", "/about"]
+
+# Sitemap protocol limit per file
+MAX_URLS_PER_SITEMAP = 50000
+FEED_CACHE_DIR = Path(os.getenv("FEED_CACHE_DIR", str(Path(__file__).parent.parent / "feed_cache")))
+FEED_BRAND = os.getenv("FEED_BRAND", "GCG Eyewear")
+FEED_CURRENCY = os.getenv("FEED_CURRENCY", "USD")
+CURSOR_BATCH_SIZE = 2000
+# Lines buffered before a write is handed to a worker thread
+WRITE_BATCH_LINES = 2000
+# Unfinished builds this old were abandoned by a worker that died mid-build
+ABANDONED_BUILD_SECONDS = 3600
+
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+
+def absolute_url(path: str) -> str:
+    if path.startswith(("http://", "https://")):
+        return path
+    return f"{SITE_URL}/{path.lstrip('/')}"
+
+def _lastmod(value) -> Optional[str]:
+    return value.strftime("%Y-%m-%d") if isinstance(value, datetime) else None
+
+def _url_entry(loc: str, lastmod: Optional[str] = None) -> str:
+    entry = f"<url><loc>{escape(loc)}</loc>"
+    if lastmod:
+        entry += f"<lastmod>{lastmod}</lastmod>"
+    return entry + "</url>\n"
+
+class _BufferedFile:
+    """Text file written from the event loop; opening, writes and closing run in a thread"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._file = None
+        self._pending: List[str] = []
+
+    async def open(self) -> "_BufferedFile":
+        self._file = await asyncio.to_thread(open, self.path, "w", encoding="utf-8")
+        return self
+
+    async def write(self, text: str) -> None:
+        self._pending.append(text)
+        if len(self._pending) >= WRITE_BATCH_LINES:
+            await self.flush()
+
+    async def flush(self) -> None:
+        if self._pending:
+            lines, self._pending = self._pending, []
+            await asyncio.to_thread(self._file.writelines, lines)
+
+    async def close(self) -> None:
+        try:
+            await self.flush()
+        finally:
+            await asyncio.to_thread(self._file.close)
+
+    async def __aenter__(self) -> "_BufferedFile":
+        return await self.open()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+async def catalog_watermark(db: AsyncIOMotorDatabase) -> Dict:
+    """Cheap fingerprint of the catalog: counts plus the newest updated_at.
+
+    Any create, update or delete changes at least one of these, so cached
+    files are rebuilt only when the catalog actually changed.
+    """
+    async def latest(collection) -> Optional[str]:
+        doc = await collection.find_one({}, {"updated_at": 1}, sort=[("updated_at", -1)])
+        return doc["updated_at"].isoformat() if doc and doc.get("updated_at") else None
+
+    products_count, collections_count, products_updated, collections_updated = await asyncio.gather(
+        db.products.estimated_document_count(),
+        db.collections.estimated_document_count(),
+        latest(db.products),
+        latest(db.collections)
+    )
+    return {
+        "products": products_count,
+        "collections": collections_count,
+        "products_updated_at": products_updated,
+        "collections_updated_at": collections_updated,
+        "site_url": SITE_URL,
+    }
+
+async def build_sitemaps(db: AsyncIOMotorDatabase, out_dir: Path) -> List[str]:
+    """Write pages.xml, products-N.xml chunks and the sitemap index; returns the file names"""
+    header = f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{SITEMAP_NS}">\n'
+    footer = "</urlset>\n"
+    files = ["pages.xml"]
+
+    async with _BufferedFile(out_dir / "pages.xml") as f:
+        await f.write(header)
+        for path in STATIC_PAGES:
+            await f.write(_url_entry(absolute_url(path)))
+        cursor = db.collections.find({"is_active": True}, {"slug": 1, "updated_at": 1}).sort("sort_order", 1)
+        async for collection in cursor:
+            path = COLLECTION_PATH.format(slug=quote(collection["slug"]))
+            await f.write(_url_entry(absolute_url(path), _lastmod(collection.get("updated_at"))))
+        await f.write(footer)
+
+    # One pass over the cursor, rotating to a new file every MAX_URLS_PER_SITEMAP
+    out: Optional[_BufferedFile] = None
+    written = 0
+    cursor = db.products.find({"status": "active"}, {"id": 1, "updated_at": 1}).sort("_id", 1)
+    try:
+        async for product in cursor.batch_size(CURSOR_BATCH_SIZE):
+            if written % MAX_URLS_PER_SITEMAP == 0:
+                if out:
+                    await out.write(footer)
+                    await out.close()
+                files.append(f"products-{len(files)}.xml")
+                out = await _BufferedFile(out_dir / files[-1]).open()
+                await out.write(header)
+            path = PRODUCT_PATH.format(id=quote(product["id"]))
+            await out.write(_url_entry(absolute_url(path), _lastmod(product.get("updated_at"))))
+            written += 1
+    finally:
+        if out:
+            await out.write(footer)
+            await out.close()
+
+    now = datetime.utcnow().strftime("%Y-%m-%d")
+    async with _BufferedFile(out_dir / "sitemap.xml") as f:
+        await f.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{SITEMAP_NS}">\n')
+        for name in files:
+            loc = absolute_url(f"/api/sitemaps/{name}")
+            await f.write(f"<sitemap><loc>{escape(loc)}</loc><lastmod>{now}</lastmod></sitemap>\n")
+        await f.write("</sitemapindex>\n")
+    return files + ["sitemap.xml"]
+
+def _feed_item(product: dict) -> str:
+    link = absolute_url(PRODUCT_PATH.format(id=quote(product["id"])))
+    price = product.get("original_price") if product.get("is_on_sale") and product.get("original_price") else product["price"]
+    fields = [
+        ("g:id", product["id"]),
+        ("g:title", product["name"]),
+        ("g:description", product.get("full_description") or product.get("short_description") or product["name"]),
+        ("g:link", link),
+        ("g:image_link", absolute_url(product["main_image"])),
+        ("g:availability", "in_stock"),
+        ("g:condition", "new"),
+        ("g:brand", FEED_BRAND),
+        ("g:mpn", product.get("sku")),
+        ("g:price", f"{price:.2f} {FEED_CURRENCY}"),
+        ("g:product_type", f"{product.get('type')} > {product.get('collection')}"),
+        ("g:gender", {"Men": "male", "Women": "female", "Unisex": "unisex"}.get(product.get("gender"))),
+        ("g:color", product.get("frame_color")),
+        ("g:material", product.get("materials")),
+    ]
+    if product.get("is_on_sale") and product.get("original_price"):
+        fields.append(("g:sale_price", f"{product['price']:.2f} {FEED_CURRENCY}"))
+    for image in (product.get("gallery_images") or [])[:10]:
+        fields.append(("g:additional_image_link", absolute_url(image)))
+    body = "".join(f"<{tag}>{escape(str(value))}</{tag}>" for tag, value in fields if value)
+    return f"<item>{body}</item>\n"
+
+async def build_product_feed(db: AsyncIOMotorDatabase, out_dir: Path) -> List[str]:
+    """Google Shopping (RSS 2.0) feed of every active product"""
+    projection = {
+        "id": 1, "name": 1, "price": 1, "original_price": 1, "is_on_sale": 1, "sku": 1,
+        "short_description": 1, "full_description": 1, "main_image": 1, "gallery_images": 1,
+        "type": 1, "collection": 1, "gender": 1, "frame_color": 1, "materials": 1
+    }
+    async with _BufferedFile(out_dir / "products.xml") as f:
+        await f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<rss version="2.0" xmlns:g="http://base.google.com/ns/1.0">\n<channel>\n'
+                f"<title>{escape(FEED_BRAND)}</title><link>{escape(SITE_URL)}</link>"
+                f"<description>{escape(FEED_BRAND)} product feed</description>\n")
+        cursor = db.products.find({"status": "active"}, projection).sort("_id", 1)
+        async for product in cursor.batch_size(CURSOR_BATCH_SIZE):
+            await f.write(_feed_item(product))
+        await f.write("</channel>\n</rss>\n")
+    return ["products.xml"]
+
+class FeedCache:
+    """Generated XML files on disk, rebuilt only when the catalog watermark moves.
+
+    Each build is written to its own `.partial` directory, renamed once
+    complete, and manifest.json is swapped in atomically, so readers (and other
+    workers sharing the directory) never see a half-written file. Pruning only
+    removes completed builds older than the one the manifest points to, so it
+    never deletes another worker's in-progress or newer build.
+    """
+
+    KEEP_BUILDS = 2
+    PARTIAL_SUFFIX = ".partial"
+
+    def __init__(self, name: str, builder: Callable[[AsyncIOMotorDatabase, Path], Awaitable[List[str]]]):
+        self.name = name
+        self.builder = builder
+        self.root = FEED_CACHE_DIR / name
+        self._lock = asyncio.Lock()
+
+    def _read_manifest(self) -> Optional[Dict]:
+        try:
+            with open(self.root / "manifest.json", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    async def _build(self, db: AsyncIOMotorDatabase, watermark: Dict) -> Dict:
+        build_id = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+        partial_dir = self.root / f"{build_id}{self.PARTIAL_SUFFIX}"
+        await asyncio.to_thread(partial_dir.mkdir, parents=True)
+        try:
+            files = await self.builder(db, partial_dir)
+        except Exception:
+            await asyncio.to_thread(shutil.rmtree, partial_dir, True)
+            raise
+        manifest = {"build": build_id, "watermark": watermark, "files": files,
+                    "generated_at": datetime.utcnow().isoformat()}
+        await asyncio.to_thread(self._publish, partial_dir, manifest)
+        logger.info("Built %s feed %s: %s files", self.name, build_id, len(files))
+        return manifest
+
+    def _publish(self, partial_dir: Path, manifest: Dict) -> None:
+        build_id = manifest["build"]
+        os.rename(partial_dir, self.root / build_id)
+        tmp = self.root / f"manifest.{build_id}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, self.root / "manifest.json")
+        self._prune()
+
+    def _prune(self) -> None:
+        # Another worker may have swapped in a newer build since ours
+        current = (self._read_manifest() or {}).get("build")
+        if current is None:
+            return
+        older = []
+        for path in self.root.iterdir():
+            if not path.is_dir():
+                continue
+            if path.name.endswith(self.PARTIAL_SUFFIX):
+                try:
+                    abandoned = time.time() - path.stat().st_mtime > ABANDONED_BUILD_SECONDS
+                except OSError:
+                    continue
+                if abandoned:
+                    shutil.rmtree(path, ignore_errors=True)
+            elif path.name < current:
+                older.append(path)
+        # Keep the previous build for requests that resolved its path just before the swap
+        older.sort()
+        for old in older[:max(0, len(older) - (self.KEEP_BUILDS - 1))]:
+            shutil.rmtree(old, ignore_errors=True)
+
+    async def get_file(self, db: AsyncIOMotorDatabase, name: str) -> Optional[Path]:
+        """Path of a generated file, rebuilding first if the catalog changed"""
+        watermark = await catalog_watermark(db)
+        manifest = self._read_manifest()
+        if manifest is None or manifest["watermark"] != watermark:
+            async with self._lock:
+                # Another request may have finished the rebuild while we waited
+                manifest = self._read_manifest()
+                if manifest is None or manifest["watermark"] != watermark:
+                    manifest = await self._build(db, watermark)
+        if name not in manifest["files"]:
+            return None
+        return self.root / manifest["build"] / name
+
+sitemap_cache = FeedCache("sitemap", build_sitemaps)
+product_feed_cache = FeedCache("product_feed", build_product_feed)
@@ -0,0 +1,153 @@
+from typing import Dict, List, Optional, Tuple
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import monitoring
+from services.single_flight import SingleFlight
+import asyncio
+import os
+import threading
+import time
+
+# Readiness thresholds; crossing any of them makes /api/health/ready return 503
+MONGO_PING_TIMEOUT_SECONDS = int(os.getenv("HEALTH_MONGO_PING_TIMEOUT_MS", "500")) / 1000
+MAX_POOL_SATURATION = float(os.getenv("HEALTH_MAX_POOL_SATURATION", "0.9"))
+MAX_POOL_WAITERS = int(os.getenv("HEALTH_MAX_POOL_WAITERS", "10"))
+MAX_LOOP_LAG_SECONDS = int(os.getenv("HEALTH_MAX_LOOP_LAG_MS", "250")) / 1000
+LOOP_LAG_INTERVAL_SECONDS = 0.5
+# Lag is judged on the worst sample of this many recent ones, so one long
+# pause does not flap readiness but a sustained stall is caught
+LOOP_LAG_WINDOW = 10
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Tracks checked-out and waiting connections per server pool.
+
+    maxPoolSize applies to each server separately, so counts are kept per
+    address and readiness reports the worst pool. pymongo calls these
+    from its own threads, hence the lock.
+    """
+
+    def __init__(self):
+        # address -> [checked out, waiting]
+        self._pools: Dict[Tuple[str, int], List[int]] = {}
+        self._lock = threading.Lock()
+
+    def _add(self, address, checked_out: int = 0, waiting: int = 0) -> None:
+        with self._lock:
+            counts = self._pools.setdefault(address, [0, 0])
+            counts[0] = max(0, counts[0] + checked_out)
+            counts[1] = max(0, counts[1] + waiting)
+
+    def snapshot(self) -> Dict[Tuple[str, int], Tuple[int, int]]:
+        """address -> (checked_out, waiting)"""
+        with self._lock:
+            return {address: (counts[0], counts[1]) for address, counts in self._pools.items()}
+
+    def connection_check_out_started(self, event) -> None:
+        self._add(event.address, waiting=1)
+
+    def connection_checked_out(self, event) -> None:
+        self._add(event.address, checked_out=1, waiting=-1)
+
+    def connection_check_out_failed(self, event) -> None:
+        self._add(event.address, waiting=-1)
+
+    def connection_checked_in(self, event) -> None:
+        self._add(event.address, checked_out=-1)
+
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        pass
+
+    def pool_closed(self, event) -> None:
+        # The server left the topology
+        with self._lock:
+            self._pools.pop(event.address, None)
+
+    def connection_created(self, event) -> None:
+        pass
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def connection_closed(self, event) -> None:
+        pass
+
+class LoopLagMonitor:
+    """Measures event loop lag as how late a periodic sleep wakes up"""
+
+    def __init__(self):
+        self._samples = []
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def lag(self) -> float:
+        return max(self._samples, default=0.0)
+
+    async def _run(self) -> None:
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(LOOP_LAG_INTERVAL_SECONDS)
+            self._samples.append(max(0.0, time.monotonic() - started - LOOP_LAG_INTERVAL_SECONDS))
+            del self._samples[:-LOOP_LAG_WINDOW]
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+pool_monitor = PoolMonitor()
+loop_lag_monitor = LoopLagMonitor()
+# Probes from several load balancers share one check
+_readiness_checks = SingleFlight("readiness")
+
+async def _ping_mongo(db: AsyncIOMotorDatabase) -> Dict:
+    started = time.monotonic()
+    try:
+        await asyncio.wait_for(db.command("ping"), MONGO_PING_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        return {"ok": False, "error": f"ping timed out after {MONGO_PING_TIMEOUT_SECONDS * 1000:.0f}ms"}
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
+    return {"ok": True, "latency_ms": round((time.monotonic() - started) * 1000, 1)}
+
+async def _check_readiness(client: AsyncIOMotorClient, db: AsyncIOMotorDatabase) -> Dict:
+    mongo = await _ping_mongo(db)
+
+    max_pool_size = client.options.pool_options.max_pool_size
+
+    def pool_check(address, checked_out: int = 0, waiting: int = 0) -> Dict:
+        saturation = checked_out / max_pool_size if max_pool_size else 0.0
+        return {
+            "ok": saturation < MAX_POOL_SATURATION and waiting <= MAX_POOL_WAITERS,
+            "server": f"{address[0]}:{address[1]}" if address else None,
+            "checked_out": checked_out,
+            "waiting": waiting,
+            "max_size": max_pool_size,
+            "saturation": round(saturation, 3),
+        }
+
+    # Report the worst pool: a failing one first, then the busiest
+    pools = [pool_check(address, *counts) for address, counts in pool_monitor.snapshot().items()]
+    pool = max(pools, key=lambda check: (not check["ok"], check["saturation"], check["waiting"]),
+               default=pool_check(None))
+
+    lag = loop_lag_monitor.lag
+    event_loop = {"ok": lag < MAX_LOOP_LAG_SECONDS, "lag_ms": round(lag * 1000, 1)}
+
+    checks = {"mongo": mongo, "connection_pool": pool, "event_loop": event_loop}
+    return {
+        "status": "ready" if all(check["ok"] for check in checks.values()) else "not_ready",
+        "checks": checks,
+    }
+
+async def check_readiness(client: AsyncIOMotorClient, db: AsyncIOMotorDatabase) -> Dict:
+    """Whether this worker should receive traffic, with the numbers behind it"""
+    return await _readiness_checks.do("ready", lambda: _check_readiness(client, db))
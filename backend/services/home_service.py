@@ -0,0 +1,111 @@
+from typing import Optional
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from models.home import HomeSnapshot, CollectionBanner
+from services.product_service import ProductService
+from services.collection_service import CollectionService
+from services import catalog_events
+from datetime import datetime
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+FEATURED_LIMIT = 8
+BANNER_PRODUCTS_LIMIT = 4
+# Rebuild at least this often so workers that did not see a write converge
+SNAPSHOT_MAX_AGE_SECONDS = float(os.getenv("HOME_SNAPSHOT_MAX_AGE_SECONDS", "60"))
+# Coalesce bursts of admin writes into a single rebuild
+REBUILD_DEBOUNCE_SECONDS = float(os.getenv("HOME_SNAPSHOT_DEBOUNCE_SECONDS", "0.5"))
+
+class HomeService:
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.product_service = ProductService(db)
+        self.collection_service = CollectionService(db)
+
+    async def build_snapshot(self) -> HomeSnapshot:
+        collections, featured = await asyncio.gather(
+            self.collection_service.get_active_collections(),
+            self.product_service.get_featured_products(limit=FEATURED_LIMIT, card=True)
+        )
+        banner_products = await asyncio.gather(*[
+            self.product_service.get_products_by_collection(
+                collection.name, limit=BANNER_PRODUCTS_LIMIT, card=True
+            )
+            for collection in collections
+        ])
+        return HomeSnapshot(
+            collections=collections,
+            featured_products=featured,
+            banners=[
+                CollectionBanner(collection=collection, products=products)
+                for collection, products in zip(collections, banner_products)
+            ]
+        )
+
+class HomeSnapshotStore:
+    """Process-wide materialized homepage, rebuilt in the background after catalog writes"""
+
+    def __init__(self):
+        self.snapshot: Optional[HomeSnapshot] = None
+        self.db: Optional[AsyncIOMotorDatabase] = None
+        self._dirty = False
+        self._rebuild_task: Optional[asyncio.Task] = None
+
+    async def get(self, db: AsyncIOMotorDatabase) -> HomeSnapshot:
+        self.db = db
+        if self.snapshot is None:
+            # Cold start: every concurrent caller waits on the same build
+            self._dirty = True
+            await self._ensure_rebuild(debounce=0)
+            if self.snapshot is None:
+                raise RuntimeError("Home snapshot is not available")
+        elif self._dirty or self._age() > SNAPSHOT_MAX_AGE_SECONDS:
+            self._dirty = True
+            self._schedule_rebuild(debounce=0)
+        return self.snapshot
+
+    async def refresh(self, db: AsyncIOMotorDatabase) -> None:
+        self.db = db
+        self._dirty = True
+        await self._ensure_rebuild(debounce=0)
+
+    def invalidate(self, entity: str, action: str, ids) -> None:
+        self._dirty = True
+        self._schedule_rebuild(debounce=REBUILD_DEBOUNCE_SECONDS)
+
+    def _age(self) -> float:
+        return (datetime.utcnow() - self.snapshot.generated_at).total_seconds()
+
+    def _schedule_rebuild(self, debounce: float) -> Optional[asyncio.Task]:
+        if self.db is None:
+            return None
+        if self._rebuild_task is None or self._rebuild_task.done():
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return None
+            self._rebuild_task = loop.create_task(self._rebuild(debounce))
+        return self._rebuild_task
+
+    async def _ensure_rebuild(self, debounce: float) -> None:
+        task = self._schedule_rebuild(debounce)
+        if task is not None:
+            await asyncio.shield(task)
+
+    async def _rebuild(self, debounce: float) -> None:
+        if debounce:
+            await asyncio.sleep(debounce)
+        # Writes that land while building mark the store dirty again and loop
+        while self._dirty:
+            self._dirty = False
+            try:
+                self.snapshot = await HomeService(self.db).build_snapshot()
+            except Exception as e:
+                logger.error("Error rebuilding home snapshot: %s", e)
+                self._dirty = self.snapshot is None
+                return
+
+home_snapshot_store = HomeSnapshotStore()
+catalog_events.subscribe(home_snapshot_store.invalidate)
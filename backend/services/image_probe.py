@@ -0,0 +1,133 @@
+from typing import Optional, Tuple
+import struct
+
+# Enough for any JPEG whose SOF marker follows a full 64KB EXIF segment
+PROBE_BYTES = 128 * 1024
+
+# Extension -> format reported by probe_image
+EXTENSION_FORMATS = {
+    ".jpg": "jpeg",
+    ".jpeg": "jpeg",
+    ".png": "png",
+    ".webp": "webp",
+}
+FORMAT_CONTENT_TYPES = {
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+    "webp": "image/webp",
+}
+
+# JPEG start-of-frame markers (excluding DHT 0xC4, JPG 0xC8 and DAC 0xCC)
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+def _probe_png(head: bytes) -> Optional[Tuple[int, int]]:
+    if len(head) < 24 or head[12:16] != b"IHDR":
+        return None
+    return struct.unpack(">II", head[16:24])
+
+# EXIF orientations that turn the image by 90 degrees, swapping width and height
+_TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+def _exif_orientation(segment: bytes) -> int:
+    """Orientation tag (0x0112) of an APP1 Exif segment's first IFD; 1 if absent"""
+    if not segment.startswith(b"Exif\x00\x00"):
+        return 1
+    tiff = segment[6:]
+    if tiff[:2] == b"II":
+        order = "<"
+    elif tiff[:2] == b"MM":
+        order = ">"
+    else:
+        return 1
+    try:
+        (ifd_offset,) = struct.unpack(order + "I", tiff[4:8])
+        (count,) = struct.unpack(order + "H", tiff[ifd_offset:ifd_offset + 2])
+        for index in range(count):
+            entry = ifd_offset + 2 + index * 12
+            tag, value_type = struct.unpack(order + "HH", tiff[entry:entry + 4])
+            if tag == 0x0112 and value_type == 3:
+                # A single SHORT is stored inline in the value field
+                (orientation,) = struct.unpack(order + "H", tiff[entry + 8:entry + 10])
+                return orientation
+    except struct.error:
+        # A malformed EXIF block does not make the image itself invalid
+        pass
+    return 1
+
+def _probe_jpeg(head: bytes) -> Optional[Tuple[int, int]]:
+    orientation = 1
+    pos = 2
+    while pos + 4 <= len(head):
+        if head[pos] != 0xFF:
+            return None
+        marker = head[pos + 1]
+        if marker == 0xFF:
+            # Fill byte
+            pos += 1
+            continue
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:
+            # Standalone markers carry no length
+            pos += 2
+            continue
+        (length,) = struct.unpack(">H", head[pos + 2:pos + 4])
+        if marker == 0xE1 and orientation == 1:
+            orientation = _exif_orientation(head[pos + 4:pos + 2 + length])
+        if marker in _JPEG_SOF_MARKERS:
+            if pos + 9 > len(head):
+                return None
+            height, width = struct.unpack(">HH", head[pos + 5:pos + 9])
+            # Browsers display the image rotated, so report it that way
+            if orientation in _TRANSPOSED_ORIENTATIONS:
+                return height, width
+            return width, height
+        if marker in (0xD9, 0xDA):
+            # End of image / start of scan before any frame header
+            return None
+        pos += 2 + length
+    return None
+
+def _probe_webp(head: bytes) -> Optional[Tuple[int, int]]:
+    if len(head) < 30:
+        return None
+    chunk = head[12:16]
+    if chunk == b"VP8 ":
+        # Lossy: 3-byte frame tag, then start code 9d 01 2a
+        if head[23:26] != b"\x9d\x01\x2a":
+            return None
+        width, height = struct.unpack("<HH", head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L":
+        # Lossless: signature 0x2f, then 14-bit width-1 and height-1
+        if head[20] != 0x2F:
+            return None
+        bits = int.from_bytes(head[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        # Extended: 24-bit canvas width-1 and height-1
+        width = int.from_bytes(head[24:27], "little") + 1
+        height = int.from_bytes(head[27:30], "little") + 1
+        return width, height
+    return None
+
+def probe_image(head: bytes) -> Optional[Tuple[str, int, int]]:
+    """(format, width, height) read from the first bytes of an image file.
+
+    Width and height are as displayed, i.e. after any EXIF rotation of a
+    JPEG. Only the headers are parsed, so this is cheap enough to run on
+    upload without decoding anything. Returns None for anything that is not
+    a well-formed JPEG, PNG or WebP header.
+    """
+    try:
+        if head.startswith(b"\x89PNG\r\n\x1a\n"):
+            size, image_format = _probe_png(head), "png"
+        elif head.startswith(b"\xff\xd8"):
+            size, image_format = _probe_jpeg(head), "jpeg"
+        elif head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            size, image_format = _probe_webp(head), "webp"
+        else:
+            return None
+    except struct.error:
+        return None
+    if size is None or size[0] <= 0 or size[1] <= 0:
+        return None
+    return image_format, size[0], size[1]
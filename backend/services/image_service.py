@@ -0,0 +1,227 @@
+from typing import Optional
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from services.image_probe import EXTENSION_FORMATS
+from services.metrics_service import registry
+from services.single_flight import SingleFlight
+from services.storage import get_storage
+import asyncio
+import hashlib
+import io
+import logging
+import math
+import multiprocessing
+import os
+import shutil
+import threading
+
+logger = logging.getLogger(__name__)
+
+IMAGE_CACHE_DIR = Path(os.getenv("IMAGE_CACHE_DIR", "/tmp/gcg-image-cache"))
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_MB", "1024")) * 1024 * 1024
+IMAGE_RESIZE_WORKERS = int(os.getenv("IMAGE_RESIZE_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Requested widths are rounded up to one of these so arbitrary ?w= values
+# cannot fill the cache with near-identical variants
+VARIANT_WIDTHS = (80, 160, 240, 320, 400, 480, 640, 800, 960, 1280, 1600, 2048)
+VARIANT_QUALITY = 80
+# Variant names never change meaning (source keys are unique), so clients and
+# CDNs can keep them forever
+VARIANT_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+image_variant_requests_total = registry.counter(
+    "image_variant_requests_total",
+    "Resized image requests, by whether the variant was already on disk.",
+    ("outcome",)
+)
+
+def variant_width(requested: Optional[int]) -> Optional[int]:
+    if requested is None:
+        return None
+    for width in VARIANT_WIDTHS:
+        if width >= requested:
+            return width
+    return VARIANT_WIDTHS[-1]
+
+def resize_image(data: bytes, width: Optional[int], image_format: str) -> bytes:
+    """Scale an image down to `width` (never up) and encode it as `image_format`.
+
+    Runs in a worker process; Pillow is imported there.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as image:
+        if width is not None:
+            # Let the JPEG decoder downscale while decoding. `width` is in
+            # display orientation, the decoder works in stored orientation.
+            displayed_width = image.width
+            if image.getexif().get(0x0112, 1) in (5, 6, 7, 8):
+                displayed_width = image.height
+            scale = width / max(displayed_width, 1)
+            image.draft("RGB", (math.ceil(image.width * scale), math.ceil(image.height * scale)))
+        image = ImageOps.exif_transpose(image)
+        if width is not None and image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.LANCZOS)
+        buffer = io.BytesIO()
+        if image_format == "jpeg":
+            image.convert("RGB").save(buffer, "JPEG", quality=VARIANT_QUALITY, optimize=True, progressive=True)
+        elif image_format == "webp":
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+            image.save(buffer, "WEBP", quality=VARIANT_QUALITY, method=4)
+        else:
+            image.save(buffer, "PNG", optimize=True)
+        return buffer.getvalue()
+
+class VariantCache:
+    """Size-bounded LRU cache of image variants on local disk.
+
+    Recency is tracked in memory (seeded from file mtimes at startup) and
+    mirrored to mtime on every hit, so it survives restarts. Each worker
+    process enforces the bound on its own view; files another worker
+    added are counted once this worker scans or writes them.
+
+    All variants of one source image share a directory, so deleting the
+    image removes them in one go.
+    """
+
+    def __init__(self, root: Path = IMAGE_CACHE_DIR, max_bytes: int = IMAGE_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        # relative path -> size, least recently used first
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _load(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        files = []
+        for path in self.root.glob("*/*/*"):
+            if path.suffix == ".tmp":
+                path.unlink(missing_ok=True)
+                continue
+            stat = path.stat()
+            files.append((stat.st_mtime, str(path.relative_to(self.root)), stat.st_size))
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self.total_bytes += size
+        self._loaded = True
+
+    @staticmethod
+    def directory_for(key: str) -> str:
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return f"{digest[:2]}/{digest}"
+
+    @classmethod
+    def name_for(cls, key: str, width: Optional[int], image_format: str) -> str:
+        return f"{cls.directory_for(key)}/{width or 'full'}.{image_format}"
+
+    def get(self, name: str) -> Optional[Path]:
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            if name not in self._entries:
+                return None
+            self._entries.move_to_end(name)
+        path = self.root / name
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted by another worker
+            with self._lock:
+                self.total_bytes -= self._entries.pop(name, 0)
+            return None
+        return path
+
+    def put(self, name: str, data: bytes) -> Path:
+        path = self.root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            self.total_bytes += len(data) - self._entries.pop(name, 0)
+            self._entries[name] = len(data)
+            while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+                oldest, size = self._entries.popitem(last=False)
+                self.total_bytes -= size
+                (self.root / oldest).unlink(missing_ok=True)
+        return path
+
+    def purge(self, key: str) -> int:
+        """Delete every variant of the source image `key`; returns how many were cached"""
+        directory = self.directory_for(key)
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            names = [name for name in self._entries if name.startswith(directory + "/")]
+            for name in names:
+                self.total_bytes -= self._entries.pop(name)
+        # Other workers notice the files are gone on their next hit
+        shutil.rmtree(self.root / directory, ignore_errors=True)
+        return len(names)
+
+class ImageService:
+    """Resized and transcoded variants of uploaded images, made on first request"""
+
+    def __init__(self, cache: Optional[VariantCache] = None):
+        self.cache = cache or VariantCache()
+        self._flights = SingleFlight("image_variants")
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Forking a process that runs an event loop, Motor's threads and
+            # the log listener copies their locks mid-use; forkserver starts
+            # workers from a clean single-threaded process instead
+            self._pool = ProcessPoolExecutor(
+                max_workers=IMAGE_RESIZE_WORKERS,
+                mp_context=multiprocessing.get_context("forkserver")
+            )
+        return self._pool
+
+    async def get_variant(self, key: str, width: Optional[int], image_format: Optional[str]) -> Optional[Path]:
+        """Path of the cached variant, generating it if needed; None if the source does not exist"""
+        source_format = EXTENSION_FORMATS.get(Path(key).suffix.lower())
+        if source_format is None:
+            return None
+        width = variant_width(width)
+        image_format = image_format or source_format
+        name = self.cache.name_for(key, width, image_format)
+
+        path = await asyncio.to_thread(self.cache.get, name)
+        if path is not None:
+            image_variant_requests_total.inc(("hit",))
+            return path
+        image_variant_requests_total.inc(("miss",))
+        # Concurrent requests for the same variant share one resize
+        return await self._flights.do(name, lambda: self._render(key, width, image_format, name))
+
+    async def _render(self, key: str, width: Optional[int], image_format: str, name: str) -> Optional[Path]:
+        storage = get_storage()
+        try:
+            info = await storage.info(key)
+        except ValueError:
+            # Not a valid storage key (e.g. path traversal)
+            return None
+        if info is None:
+            return None
+        data = await storage.read_head(key, info["size"])
+        loop = asyncio.get_running_loop()
+        variant = await loop.run_in_executor(self._executor(), resize_image, data, width, image_format)
+        return await asyncio.to_thread(self.cache.put, name, variant)
+
+    async def purge(self, key: str) -> None:
+        """Forget the variants of a deleted source image"""
+        await asyncio.to_thread(self.cache.purge, key)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+image_service = ImageService()
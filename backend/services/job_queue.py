@@ -0,0 +1,319 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Type
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from pydantic import BaseModel
+from datetime import datetime, timedelta
+from models.job import Job, JobExecutorEnum, JobStatusEnum
+from services.metrics_service import registry
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+import socket
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Jobs run concurrently by one API process
+WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", "2"))
+POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "2"))
+# A running job whose lease is not renewed within this time (worker crashed
+# or was killed) is picked up again by another worker
+LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "60"))
+RETRY_BACKOFF_SECONDS = int(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "10"))
+THREAD_WORKERS = int(os.getenv("JOB_THREAD_WORKERS", "4"))
+PROCESS_WORKERS = int(os.getenv("JOB_PROCESS_WORKERS", str(min(2, os.cpu_count() or 1))))
+# Finished jobs are removed after this (TTL index on finished_at)
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_DAYS", "7")) * 24 * 3600
+# Progress writes closer together than this are skipped
+PROGRESS_MIN_INTERVAL_SECONDS = 0.5
+
+jobs_finished_total = registry.counter(
+    "jobs_finished_total",
+    "Background job attempts, by job type and outcome.",
+    ("type", "outcome")
+)
+
+class JobType:
+    def __init__(self, name: str, handler: Callable[["JobContext"], Awaitable[Optional[dict]]],
+                 executor: JobExecutorEnum, max_attempts: int, params_model: Optional[Type[BaseModel]]):
+        self.name = name
+        self.handler = handler
+        self.executor = executor
+        self.max_attempts = max_attempts
+        self.params_model = params_model
+
+class JobContext:
+    """What a running job handler gets: its parameters, the database, progress
+    reporting and the executor configured for its job type."""
+
+    def __init__(self, queue: "JobQueue", db: AsyncIOMotorDatabase, job: Job, job_type: JobType):
+        self.queue = queue
+        self.db = db
+        self.job = job
+        self.params = job.params
+        self._executor = queue._executor_for(job_type.executor)
+        self._last_progress = 0.0
+
+    async def progress(self, fraction: float, message: Optional[str] = None) -> None:
+        now = time.monotonic()
+        if fraction < 1.0 and now - self._last_progress < PROGRESS_MIN_INTERVAL_SECONDS:
+            return
+        self._last_progress = now
+        update = {"progress": max(0.0, min(1.0, fraction))}
+        if message is not None:
+            update["message"] = message
+        await self.db.jobs.update_one({"id": self.job.id, "worker_id": self.queue.worker_id}, {"$set": update})
+
+    async def run_blocking(self, fn: Callable[..., Any], *args) -> Any:
+        """Run a blocking or CPU bound call in this job type's thread or process pool"""
+        if self._executor is None:
+            return fn(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args))
+
+class JobQueue:
+    """Durable job queue stored in the `jobs` collection.
+
+    Every API process runs a few worker loops that claim due jobs with
+    find_one_and_update, hold them under a renewable lease and record the
+    outcome. Failed attempts are retried with exponential backoff; a job
+    whose worker dies is taken over once its lease expires, so queued and
+    interrupted work survives restarts.
+    """
+
+    def __init__(self):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.types: Dict[str, JobType] = {}
+        self.db: Optional[AsyncIOMotorDatabase] = None
+        self._loops: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+
+    def job(self, name: str, executor: JobExecutorEnum = JobExecutorEnum.ASYNC,
+            max_attempts: int = 3, params_model: Optional[Type[BaseModel]] = None):
+        """Decorator registering an async handler for a job type"""
+        def register(handler):
+            self.types[name] = JobType(name, handler, executor, max_attempts, params_model)
+            return handler
+        return register
+
+    def _executor_for(self, executor: JobExecutorEnum) -> Optional[Executor]:
+        if executor == JobExecutorEnum.THREAD:
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPoolExecutor(max_workers=THREAD_WORKERS, thread_name_prefix="job")
+            return self._thread_pool
+        if executor == JobExecutorEnum.PROCESS:
+            if self._process_pool is None:
+                # Not fork: the API process has an event loop and Motor's
+                # threads whose locks a forked child would inherit mid-use
+                self._process_pool = ProcessPoolExecutor(
+                    max_workers=PROCESS_WORKERS,
+                    mp_context=multiprocessing.get_context("forkserver")
+                )
+            return self._process_pool
+        return None
+
+    async def enqueue(self, db: AsyncIOMotorDatabase, job_type: str, params: Optional[dict] = None,
+                      created_by: Optional[str] = None, job_id: Optional[str] = None) -> Job:
+        """Queue a job.
+
+        With a fixed `job_id` at most one such job is queued or running at a
+        time: while one is, that job is returned instead of a new one, and a
+        finished one is replaced. The unique index on id makes this atomic
+        across workers.
+        """
+        registered = self.types.get(job_type)
+        if registered is None:
+            raise ValueError(f"Unknown job type: {job_type}")
+        if registered.params_model is not None:
+            params = registered.params_model(**(params or {})).dict()
+        job = Job(type=job_type, params=params or {}, max_attempts=registered.max_attempts, created_by=created_by)
+        if job_id is None:
+            await db.jobs.insert_one(job.dict())
+        else:
+            job.id = job_id
+            try:
+                await db.jobs.update_one(
+                    {"id": job_id, "status": {"$nin": [JobStatusEnum.QUEUED, JobStatusEnum.RUNNING]}},
+                    {"$set": job.dict()},
+                    upsert=True
+                )
+            except DuplicateKeyError:
+                # Already queued or running
+                return await self.get(db, job_id) or job
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    async def get(self, db: AsyncIOMotorDatabase, job_id: str) -> Optional[Job]:
+        job = await db.jobs.find_one({"id": job_id})
+        return Job(**job) if job else None
+
+    async def list(self, db: AsyncIOMotorDatabase, status: Optional[JobStatusEnum] = None,
+                   job_type: Optional[str] = None, limit: int = 50) -> List[Job]:
+        query = {}
+        if status:
+            query["status"] = status
+        if job_type:
+            query["type"] = job_type
+        jobs = await db.jobs.find(query).sort("created_at", -1).limit(limit).to_list(length=None)
+        return [Job(**job) for job in jobs]
+
+    async def cancel(self, db: AsyncIOMotorDatabase, job_id: str) -> Optional[Job]:
+        """Cancel a queued job now; a running one stops at its next lease renewal"""
+        now = datetime.utcnow()
+        job = await db.jobs.find_one_and_update(
+            {"id": job_id, "status": JobStatusEnum.QUEUED},
+            {"$set": {"status": JobStatusEnum.CANCELLED, "finished_at": now}},
+            return_document=ReturnDocument.AFTER
+        )
+        if job is None:
+            job = await db.jobs.find_one_and_update(
+                {"id": job_id, "status": JobStatusEnum.RUNNING},
+                {"$set": {"cancel_requested": True}},
+                return_document=ReturnDocument.AFTER
+            )
+            task = self._running.get(job_id)
+            if job is not None and task is not None:
+                task.cancel()
+        if job is None:
+            return await self.get(db, job_id)
+        return Job(**job)
+
+    async def _claim(self) -> Optional[Job]:
+        now = datetime.utcnow()
+        job = await self.db.jobs.find_one_and_update(
+            {
+                "type": {"$in": list(self.types)},
+                "$or": [
+                    {"status": JobStatusEnum.QUEUED, "run_after": {"$lte": now}},
+                    # Abandoned by a worker that stopped renewing its lease
+                    {"status": JobStatusEnum.RUNNING, "lease_expires_at": {"$lt": now}},
+                ]
+            },
+            {
+                "$set": {
+                    "status": JobStatusEnum.RUNNING,
+                    "worker_id": self.worker_id,
+                    "lease_expires_at": now + timedelta(seconds=LEASE_SECONDS),
+                    "started_at": now
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("run_after", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+        return Job(**job) if job else None
+
+    async def _finish(self, job: Job, update: dict) -> None:
+        await self.db.jobs.update_one(
+            {"id": job.id, "worker_id": self.worker_id},
+            {"$set": {**update, "worker_id": None, "lease_expires_at": None}}
+        )
+
+    async def _renew_lease(self, job: Job, task: asyncio.Task) -> None:
+        while not task.done():
+            await asyncio.sleep(LEASE_SECONDS / 3)
+            owned = await self.db.jobs.find_one_and_update(
+                {"id": job.id, "worker_id": self.worker_id, "status": JobStatusEnum.RUNNING},
+                {"$set": {"lease_expires_at": datetime.utcnow() + timedelta(seconds=LEASE_SECONDS)}},
+                projection={"cancel_requested": 1}
+            )
+            if owned is None or owned.get("cancel_requested"):
+                # Cancelled, or the lease was lost and another worker took over
+                task.cancel()
+
+    async def _execute(self, job: Job) -> None:
+        job_type = self.types[job.type]
+        now = datetime.utcnow()
+        if job.cancel_requested:
+            await self._finish(job, {"status": JobStatusEnum.CANCELLED, "finished_at": now})
+            return
+        if job.attempts > job.max_attempts:
+            # Lease expired on every attempt (e.g. the job kills its worker)
+            await self._finish(job, {"status": JobStatusEnum.FAILED, "finished_at": now, "error": "Lease expired"})
+            jobs_finished_total.inc((job.type, "failed"))
+            return
+
+        task = asyncio.ensure_future(job_type.handler(JobContext(self, self.db, job, job_type)))
+        self._running[job.id] = task
+        heartbeat = asyncio.ensure_future(self._renew_lease(job, task))
+        try:
+            result = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._stopping:
+                # Shutting down: hand the job back without using up an attempt
+                await self._finish(job, {
+                    "status": JobStatusEnum.QUEUED, "attempts": job.attempts - 1, "run_after": datetime.utcnow()
+                })
+                return
+            await self._finish(job, {"status": JobStatusEnum.CANCELLED, "finished_at": datetime.utcnow()})
+            jobs_finished_total.inc((job.type, "cancelled"))
+        except Exception as e:
+            logger.error("Job %s (%s) attempt %s failed: %s", job.id, job.type, job.attempts, e)
+            if job.attempts < job.max_attempts:
+                retry_at = datetime.utcnow() + timedelta(seconds=RETRY_BACKOFF_SECONDS * 2 ** (job.attempts - 1))
+                await self._finish(job, {"status": JobStatusEnum.QUEUED, "run_after": retry_at, "error": str(e)})
+                jobs_finished_total.inc((job.type, "retried"))
+            else:
+                await self._finish(job, {"status": JobStatusEnum.FAILED, "finished_at": datetime.utcnow(), "error": str(e)})
+                jobs_finished_total.inc((job.type, "failed"))
+        else:
+            await self._finish(job, {
+                "status": JobStatusEnum.SUCCEEDED, "finished_at": datetime.utcnow(),
+                "progress": 1.0, "result": result, "error": None
+            })
+            jobs_finished_total.inc((job.type, "succeeded"))
+        finally:
+            heartbeat.cancel()
+            self._running.pop(job.id, None)
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                job = await self._claim()
+            except Exception as e:
+                logger.error("Error claiming job: %s", e)
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), POLL_INTERVAL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._execute(job)
+            except Exception as e:
+                logger.error("Error running job %s: %s", job.id, e)
+
+    def start(self, db: AsyncIOMotorDatabase) -> None:
+        self.db = db
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        self._loops = [loop.create_task(self._run()) for _ in range(WORKER_CONCURRENCY)]
+
+    async def stop(self) -> None:
+        """Stop claiming jobs and hand running ones back to the queue"""
+        self._stopping = True
+        for task in self._running.values():
+            task.cancel()
+        if self._wakeup is not None:
+            self._wakeup.set()
+        await asyncio.gather(*self._loops, return_exceptions=True)
+        self._loops = []
+        for pool in (self._thread_pool, self._process_pool):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._thread_pool = self._process_pool = None
+
+job_queue = JobQueue()
@@ -0,0 +1,112 @@
+from typing import List
+from datetime import datetime
+from tempfile import SpooledTemporaryFile
+from models.job import (
+    JobExecutorEnum, BulkStatusJobParams, ProductExportJobParams,
+    ImagePlaceholderJobParams, PlaceholderBackfillJobParams
+)
+from models.product import Product
+from services.job_queue import JobContext, job_queue
+from services.placeholder_service import generate_placeholder
+from services.product_service import ProductService
+from services.storage import get_export_storage
+import csv
+import io
+
+# Job types handled by this module; importing it registers them
+BULK_STATUS_JOB = "products.bulk_status"
+PRODUCT_EXPORT_JOB = "products.export_csv"
+IMAGE_PLACEHOLDER_JOB = "images.placeholder"
+PLACEHOLDER_BACKFILL_JOB = "images.backfill_placeholders"
+# Fixed id of the backfill every worker requests at startup, so a fleet
+# restart queues one sweep rather than one per worker
+STARTUP_BACKFILL_JOB_ID = "startup:images.backfill_placeholders"
+
+# Export files are private; admins download them here
+EXPORT_DOWNLOAD_PATH = "/api/admin/jobs/{job_id}/download"
+
+BULK_STATUS_CHUNK_SIZE = 500
+EXPORT_BATCH_SIZE = 1000
+# The placeholder data URI is of no use in a spreadsheet
+EXPORT_FIELDS = [field for field in Product.model_fields if field != "main_image_meta"]
+
+@job_queue.job(BULK_STATUS_JOB, params_model=BulkStatusJobParams)
+async def bulk_update_status(ctx: JobContext) -> dict:
+    """Change the status of many products, in chunks so progress is visible"""
+    params = BulkStatusJobParams(**ctx.params)
+    product_service = ProductService(ctx.db)
+    updated_count = 0
+    ids = params.product_ids
+    for start in range(0, len(ids), BULK_STATUS_CHUNK_SIZE):
+        updated_count += await product_service.bulk_update_status(
+            ids[start:start + BULK_STATUS_CHUNK_SIZE], params.status.value
+        )
+        done = min(start + BULK_STATUS_CHUNK_SIZE, len(ids))
+        await ctx.progress(done / len(ids), f"{done}/{len(ids)} products")
+    return {"updated_count": updated_count}
+
+def encode_csv_rows(rows: List[dict], header: bool) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+    if header:
+        writer.writeheader()
+    for row in rows:
+        writer.writerow({
+            field: "|".join(value) if isinstance(value, list) else value
+            for field, value in row.items()
+        })
+    return buffer.getvalue().encode("utf-8")
+
+@job_queue.job(PRODUCT_EXPORT_JOB, executor=JobExecutorEnum.THREAD, params_model=ProductExportJobParams)
+async def export_products(ctx: JobContext) -> dict:
+    """Write the matching products to a CSV file in private storage.
+
+    The result carries the file's key and its admin-only download URL.
+    """
+    params = ProductExportJobParams(**ctx.params)
+    query = {}
+    if params.status:
+        query["status"] = params.status.value
+    if params.collection:
+        query["collection"] = params.collection
+    total = await ctx.db.products.count_documents(query)
+
+    exported = 0
+    with SpooledTemporaryFile(max_size=8 * 1024 * 1024) as output:
+        cursor = ctx.db.products.find(query, {"_id": 0}).sort("created_at", 1).batch_size(EXPORT_BATCH_SIZE)
+        batch: List[dict] = []
+        async for product in cursor:
+            batch.append(product)
+            if len(batch) == EXPORT_BATCH_SIZE:
+                output.write(await ctx.run_blocking(encode_csv_rows, batch, exported == 0))
+                exported += len(batch)
+                batch = []
+                await ctx.progress(exported / max(total, 1), f"{exported}/{total} products")
+        if batch or exported == 0:
+            output.write(await ctx.run_blocking(encode_csv_rows, batch, exported == 0))
+            exported += len(batch)
+        output.seek(0)
+        key = f"products-{datetime.utcnow():%Y%m%d-%H%M%S}-{ctx.job.id}.csv"
+        await get_export_storage().save(key, output, "text/csv")
+    return {"key": key, "url": EXPORT_DOWNLOAD_PATH.format(job_id=ctx.job.id), "exported_count": exported}
+
+@job_queue.job(IMAGE_PLACEHOLDER_JOB, executor=JobExecutorEnum.PROCESS, params_model=ImagePlaceholderJobParams)
+async def image_placeholder(ctx: JobContext) -> dict:
+    """Generate the low-quality placeholder of one uploaded image"""
+    generated = await generate_placeholder(ctx.db, ctx.params["key"], ctx.run_blocking)
+    return {"generated": generated}
+
+@job_queue.job(PLACEHOLDER_BACKFILL_JOB, executor=JobExecutorEnum.PROCESS, params_model=PlaceholderBackfillJobParams)
+async def backfill_placeholders(ctx: JobContext) -> dict:
+    """Generate placeholders for every image asset that lacks one (or all, with force)"""
+    params = PlaceholderBackfillJobParams(**ctx.params)
+    query = {} if params.force else {"placeholder": None}
+    total = await ctx.db.image_assets.count_documents(query)
+    generated = 0
+    processed = 0
+    async for asset in ctx.db.image_assets.find(query, {"_id": 0, "key": 1}):
+        if await generate_placeholder(ctx.db, asset["key"], ctx.run_blocking, force=params.force):
+            generated += 1
+        processed += 1
+        await ctx.progress(processed / max(total, 1), f"{processed}/{total} images")
+    return {"generated_count": generated}
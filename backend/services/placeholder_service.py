@@ -0,0 +1,64 @@
+from typing import Tuple
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from datetime import datetime
+from services import catalog_events
+from services.storage import get_storage
+import asyncio
+import base64
+import io
+import os
+
+# Longest edge of the preview; the browser scales it up behind a blur
+PLACEHOLDER_SIZE = int(os.getenv("IMAGE_PLACEHOLDER_SIZE", "20"))
+PLACEHOLDER_QUALITY = 40
+
+def render_placeholder(data: bytes) -> Tuple[int, int, str]:
+    """Intrinsic (width, height) and a tiny JPEG preview as a data: URI.
+
+    CPU bound; run it off the event loop. Pillow is imported here so the
+    API starts without it and only the job workers need it.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as image:
+        # Honour the EXIF orientation, as browsers do
+        width, height = image.size
+        if image.getexif().get(0x0112, 1) in (5, 6, 7, 8):
+            width, height = height, width
+        # Let the JPEG decoder downscale while decoding instead of decoding
+        # the full image and shrinking it afterwards
+        image.draft("RGB", (PLACEHOLDER_SIZE * 4, PLACEHOLDER_SIZE * 4))
+        preview = ImageOps.exif_transpose(image).convert("RGB")
+        preview.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+        buffer = io.BytesIO()
+        preview.save(buffer, "JPEG", quality=PLACEHOLDER_QUALITY, optimize=True)
+    encoded = base64.b64encode(buffer.getvalue()).decode("ascii")
+    return width, height, f"data:image/jpeg;base64,{encoded}"
+
+async def generate_placeholder(db: AsyncIOMotorDatabase, key: str, run_blocking=asyncio.to_thread,
+                               force: bool = False) -> bool:
+    """Fill in the placeholder of one image asset and of the products that show it.
+
+    `run_blocking(fn, *args)` decides where the decoding runs (a thread by
+    default; the job queue passes its process pool).
+    """
+    asset = await db.image_assets.find_one({"key": key})
+    if not asset or (asset.get("placeholder") and not force):
+        return False
+    data = await get_storage().read_head(key, asset["size"])
+    if data is None:
+        return False
+    width, height, placeholder = await run_blocking(render_placeholder, data)
+    meta = {"width": width, "height": height, "placeholder": placeholder}
+    await db.image_assets.update_one({"key": key}, {"$set": meta})
+
+    # Products already pointing at the image get the meta denormalized
+    products = await db.products.find({"main_image": asset["url"]}, {"_id": 0, "id": 1}).to_list(length=None)
+    product_ids = [product["id"] for product in products]
+    if product_ids:
+        await db.products.update_many(
+            {"id": {"$in": product_ids}, "main_image": asset["url"]},
+            {"$set": {"main_image_meta": meta, "updated_at": datetime.utcnow()}}
+        )
+        catalog_events.publish("product", "updated", product_ids)
+    return True
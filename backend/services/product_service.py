@@ -1,14 +1,69 @@
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple, Union
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from models.product import Product, ProductCreate, ProductUpdate, ProductFilter
+from models.product import (
+    Product, ProductCard, ProductCreate, ProductUpdate, ProductFilter, PriceBucket, PriceHistogram,
+    SearchModeEnum
+)
+from pymongo import ReturnDocument
+from services import catalog_events
+from services.cache import TTLCache
+from services.resilience import CatalogReadCache, READ_MAX_TIME_MS, read_scope
+from services.sync_service import write_tombstone
+from services.search_service import search_service
+from services.catalog_engine import catalog_engine
+from services.collection_service import CollectionService, COUNT_FIELDS
 from datetime import datetime
+from collections import defaultdict
+import json
+import os
 import re
 
+DEFAULT_PRICE_EDGES = [0, 250, 500, 750, 1000, 1250, 1500, 2000, 3000, 5000]
+
+# Price histograms per (filter set, edges); dropped on any product write
+_histogram_cache = TTLCache(ttl=float(os.getenv("PRICE_HISTOGRAM_CACHE_SECONDS", "300")))
+catalog_events.subscribe(_histogram_cache.clear)
+
+# Catalog reads: concurrent identical queries share one database call, and
+# results are served stale (or as last-known-good) when Mongo is slow or down
+_product_reads = CatalogReadCache("products")
+catalog_events.subscribe(_product_reads.invalidate)
+
+def filter_cache_key(filters: Optional[ProductFilter], *extra) -> str:
+    values = filters.dict(exclude_none=True) if filters else {}
+    return json.dumps([values, *extra], sort_keys=True, default=str)
+
+# Only fetch the fields a product card renders
+CARD_PROJECTION = {field: 1 for field in ProductCard.model_fields}
+CARD_PROJECTION["_id"] = 0
+
+def _count_contribution(product: Optional[dict]) -> Dict[str, int]:
+    """How much one product adds to its collection's denormalized counts"""
+    if not product:
+        return {field: 0 for field in COUNT_FIELDS}
+    is_active = product.get("status") == "active"
+    return {
+        "product_count": 1,
+        "active_product_count": int(is_active),
+        "on_sale_product_count": int(is_active and bool(product.get("is_on_sale")))
+    }
+
 class ProductService:
     def __init__(self, db: AsyncIOMotorDatabase):
         self.db = db
+        self.read_scope = read_scope(db)
         self.collection = db.products
 
+    async def _update_collection_counts(self, before: Optional[dict], after: Optional[dict]) -> None:
+        deltas: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        if before:
+            for field, value in _count_contribution(before).items():
+                deltas[before["collection"]][field] -= value
+        if after:
+            for field, value in _count_contribution(after).items():
+                deltas[after["collection"]][field] += value
+        await CollectionService(self.db).apply_product_count_deltas(deltas)
+
     async def create_product(self, product_data: ProductCreate) -> Product:
         # Check if SKU already exists
         existing = await self.collection.find_one({"sku": product_data.sku})
@@ -18,22 +73,51 @@ class ProductService:
         # Set sale status based on original_price
         product_dict = product_data.dict()
         product_dict["is_on_sale"] = product_data.original_price is not None
+        product_dict["main_image_meta"] = await self._image_meta(product_data.main_image)
         
         product = Product(**product_dict)
         await self.collection.insert_one(product.dict())
+        await self._update_collection_counts(None, product.dict())
+        catalog_events.publish("product", "created", [product.id])
         return product
 
+    async def _image_meta(self, image_url: str) -> Optional[dict]:
+        """Dimensions and placeholder of an uploaded image, denormalized onto the product"""
+        return await self.db.image_assets.find_one(
+            {"url": image_url}, {"_id": 0, "width": 1, "height": 1, "placeholder": 1}
+        )
+
     async def get_product(self, product_id: str) -> Optional[Product]:
-        product_data = await self.collection.find_one({"id": product_id})
+        return await _product_reads.get(
+            ("get_product", *self.read_scope, product_id),
+            lambda: self._find_product(product_id)
+        )
+
+    async def _find_product(self, product_id: str) -> Optional[Product]:
+        product_data = await self.collection.find_one({"id": product_id}, max_time_ms=READ_MAX_TIME_MS)
         return Product(**product_data) if product_data else None
 
-    async def get_products(self, 
-                          filters: Optional[ProductFilter] = None,
-                          skip: int = 0,
-                          limit: int = 50,
-                          sort_by: str = "created_at",
-                          sort_order: int = -1) -> List[Product]:
-        
+    async def get_products_by_ids(self,
+                                  product_ids: List[str],
+                                  card: bool = False) -> Tuple[List[Union[Product, ProductCard]], List[str]]:
+        """Fetch many products in one query, in input order, plus the ids that were not found"""
+        unique_ids = list(dict.fromkeys(product_ids))
+        found = await _product_reads.get(
+            ("get_products_by_ids", *self.read_scope, tuple(unique_ids), card),
+            lambda: self._find_products_by_ids(unique_ids, card)
+        )
+
+        model = ProductCard if card else Product
+        products = [model(**found[product_id]) for product_id in unique_ids if product_id in found]
+        missing = [product_id for product_id in unique_ids if product_id not in found]
+        return products, missing
+
+    async def _find_products_by_ids(self, product_ids: List[str], card: bool) -> Dict[str, dict]:
+        projection = CARD_PROJECTION if card else None
+        cursor = self.collection.find({"id": {"$in": product_ids}}, projection).max_time_ms(READ_MAX_TIME_MS)
+        return {product["id"]: product for product in await cursor.to_list(length=None)}
+
+    def build_query(self, filters: Optional[ProductFilter] = None) -> dict:
         query = {}
         
         if filters:
@@ -57,16 +141,65 @@ class ProductService:
                     price_query["$lte"] = filters.price_max
                 query["price"] = price_query
             if filters.search:
-                search_pattern = re.compile(filters.search, re.IGNORECASE)
+                # Match the term literally; user-supplied patterns can be
+                # arbitrarily expensive for Mongo to evaluate
+                search_pattern = re.compile(re.escape(filters.search), re.IGNORECASE)
                 query["$or"] = [
                     {"name": search_pattern},
                     {"short_description": search_pattern},
                     {"tags": {"$in": [search_pattern]}}
                 ]
         
-        cursor = self.collection.find(query).sort(sort_by, sort_order).skip(skip).limit(limit)
+        return query
+
+    async def get_products(self, 
+                          filters: Optional[ProductFilter] = None,
+                          skip: int = 0,
+                          limit: int = 50,
+                          sort_by: str = "created_at",
+                          sort_order: int = -1,
+                          card: bool = False) -> List[Union[Product, ProductCard]]:
+        key = ("get_products", *self.read_scope, filter_cache_key(filters, skip, limit, sort_by, sort_order, card))
+        return await _product_reads.get(
+            key,
+            lambda: self._find_products(filters, skip, limit, sort_by, sort_order, card)
+        )
+
+    async def _find_products(self,
+                             filters: Optional[ProductFilter],
+                             skip: int,
+                             limit: int,
+                             sort_by: str,
+                             sort_order: int,
+                             card: bool) -> List[Union[Product, ProductCard]]:
+        model = ProductCard if card else Product
+        if catalog_engine.ready and catalog_engine.supports(filters, sort_by):
+            # Filter and sort in memory, then fetch just the page by id
+            product_ids, _ = catalog_engine.query(filters, skip, limit, sort_by, sort_order)
+            found = await self._find_products_by_ids(product_ids, card)
+            return [model(**found[product_id]) for product_id in product_ids if product_id in found]
+        
+        query = self.build_query(filters)
+        
+        projection = CARD_PROJECTION if card else None
+        cursor = self.collection.find(query, projection).sort(sort_by, sort_order).skip(skip).limit(limit)
+        cursor = cursor.max_time_ms(READ_MAX_TIME_MS)
         products = await cursor.to_list(length=None)
-        return [Product(**product) for product in products]
+        return [model(**product) for product in products]
+
+    async def count_products(self, filters: Optional[ProductFilter] = None) -> int:
+        """Total matching products, cached per filter set until the next catalog write"""
+        key = ("count_products", *self.read_scope, filter_cache_key(filters))
+        return await _product_reads.get(key, lambda: self._count_products(filters))
+
+    async def _count_products(self, filters: Optional[ProductFilter]) -> int:
+        if catalog_engine.ready and catalog_engine.supports(filters, "created_at"):
+            return catalog_engine.count(filters)
+        query = self.build_query(filters)
+        if not query:
+            # Collection metadata only; no scan
+            return await self.collection.estimated_document_count()
+        return await self.collection.count_documents(query, maxTimeMS=READ_MAX_TIME_MS)
 
     async def update_product(self, product_id: str, update_data: ProductUpdate) -> Optional[Product]:
         update_dict = {k: v for k, v in update_data.dict(exclude_unset=True).items() if v is not None}
@@ -81,36 +214,81 @@ class ProductService:
         if "original_price" in update_dict:
             update_dict["is_on_sale"] = update_dict["original_price"] is not None
         
-        result = await self.collection.update_one(
+        if "main_image" in update_dict:
+            update_dict["main_image_meta"] = await self._image_meta(update_dict["main_image"])
+        
+        # The previous version tells us how the collection counts change
+        before = await self.collection.find_one_and_update(
             {"id": product_id},
-            {"$set": update_dict}
+            {"$set": update_dict},
+            return_document=ReturnDocument.BEFORE
         )
         
-        if result.modified_count:
-            return await self.get_product(product_id)
+        if before:
+            after = {**before, **update_dict}
+            await self._update_collection_counts(before, after)
+            catalog_events.publish("product", "updated", [product_id])
+            return Product(**after)
         return None
 
     async def delete_product(self, product_id: str) -> bool:
-        result = await self.collection.delete_one({"id": product_id})
-        return result.deleted_count > 0
+        deleted = await self.collection.find_one_and_delete({"id": product_id})
+        if deleted:
+            await write_tombstone(self.db, "product", product_id)
+            await self._update_collection_counts(deleted, None)
+            catalog_events.publish("product", "deleted", [product_id])
+        return deleted is not None
 
-    async def get_featured_products(self, limit: int = 8) -> List[Product]:
+    async def get_featured_products(self, limit: int = 8, card: bool = False) -> List[Union[Product, ProductCard]]:
         filters = ProductFilter(is_featured=True, status="active")
-        return await self.get_products(filters=filters, limit=limit)
+        return await self.get_products(filters=filters, limit=limit, card=card)
 
-    async def get_products_by_collection(self, collection_name: str, limit: int = 50) -> List[Product]:
+    async def get_products_by_collection(self, collection_name: str, limit: int = 50,
+                                         card: bool = False, skip: int = 0) -> List[Union[Product, ProductCard]]:
         filters = ProductFilter(collection=collection_name, status="active")
-        return await self.get_products(filters=filters, limit=limit)
+        return await self.get_products(filters=filters, skip=skip, limit=limit, card=card)
 
-    async def search_products(self, search_term: str, limit: int = 50) -> List[Product]:
-        filters = ProductFilter(search=search_term, status="active")
-        return await self.get_products(filters=filters, limit=limit)
+    async def search_products(self, search_term: str, limit: int = 50,
+                              mode: SearchModeEnum = SearchModeEnum.EXACT) -> List[Product]:
+        if mode != SearchModeEnum.FUZZY or not search_service.ready:
+            filters = ProductFilter(search=search_term, status="active")
+            products = await self.get_products(filters=filters, limit=limit)
+            if products or mode == SearchModeEnum.EXACT or not search_service.ready:
+                return products
+        
+        # Typo-tolerant: rank by trigram similarity, then load in ranked order
+        product_ids = search_service.search(search_term, limit) or []
+        products, _ = await self.get_products_by_ids(product_ids)
+        return [product for product in products if product.status == "active"]
 
     async def bulk_update_status(self, product_ids: List[str], status: str) -> int:
+        # Group the products whose status actually changes so collection
+        # counts can be adjusted without loading every document
+        changing = await self.collection.aggregate([
+            {"$match": {"id": {"$in": product_ids}, "status": {"$ne": status}}},
+            {"$group": {
+                "_id": {"collection": "$collection", "was_active": {"$eq": ["$status", "active"]}},
+                "count": {"$sum": 1},
+                "on_sale": {"$sum": {"$cond": ["$is_on_sale", 1, 0]}}
+            }}
+        ]).to_list(length=None)
+        
         result = await self.collection.update_many(
             {"id": {"$in": product_ids}},
             {"$set": {"status": status, "updated_at": datetime.utcnow()}}
         )
+        
+        deltas: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        for group in changing:
+            name = group["_id"]["collection"]
+            # Non-active -> non-active changes do not affect the counts
+            sign = -1 if group["_id"]["was_active"] else (1 if status == "active" else 0)
+            deltas[name]["active_product_count"] += sign * group["count"]
+            deltas[name]["on_sale_product_count"] += sign * group["on_sale"]
+        await CollectionService(self.db).apply_product_count_deltas(deltas)
+        
+        if result.modified_count:
+            catalog_events.publish("product", "updated", product_ids)
         return result.modified_count
 
     async def get_product_stats(self) -> dict:
@@ -132,10 +310,70 @@ class ProductService:
             }
         ]
         
-        result = await self.collection.aggregate(pipeline).to_list(length=1)
+        result = await self.collection.aggregate(pipeline, maxTimeMS=READ_MAX_TIME_MS).to_list(length=1)
         return result[0] if result else {
             "total_products": 0,
             "active_products": 0,
             "featured_products": 0,
             "on_sale_products": 0
-        }
\ No newline at end of file
+        }
+
+    async def get_price_histogram(self,
+                                  filters: Optional[ProductFilter] = None,
+                                  edges: Optional[List[float]] = None) -> PriceHistogram:
+        edges = sorted(set(edges or DEFAULT_PRICE_EDGES))
+        cache_key = (*self.read_scope, filter_cache_key(filters, edges))
+        cached = _histogram_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        histogram = await _product_reads.get(
+            ("get_price_histogram", *cache_key),
+            lambda: self._aggregate_price_histogram(filters, edges)
+        )
+        _histogram_cache.set(cache_key, histogram)
+        return histogram
+
+    async def _aggregate_price_histogram(self, filters: Optional[ProductFilter], edges: List[float]) -> PriceHistogram:
+        # The last bucket is open-ended; anything below the first edge is
+        # collected separately by the $bucket default
+        boundaries = edges + [float("inf")]
+        pipeline = [
+            {"$match": self.build_query(filters)},
+            {"$facet": {
+                "buckets": [
+                    {"$bucket": {
+                        "groupBy": "$price",
+                        "boundaries": boundaries,
+                        "default": "below_range",
+                        "output": {"count": {"$sum": 1}}
+                    }}
+                ],
+                "stats": [
+                    {"$group": {
+                        "_id": None,
+                        "total": {"$sum": 1},
+                        "price_min": {"$min": "$price"},
+                        "price_max": {"$max": "$price"}
+                    }}
+                ]
+            }}
+        ]
+        result = (await self.collection.aggregate(pipeline, maxTimeMS=READ_MAX_TIME_MS).to_list(length=1))[0]
+        
+        counts = {bucket["_id"]: bucket["count"] for bucket in result["buckets"]}
+        stats = result["stats"][0] if result["stats"] else {}
+        return PriceHistogram(
+            buckets=[
+                PriceBucket(
+                    min=lower,
+                    max=boundaries[index + 1] if index + 1 < len(edges) else None,
+                    count=counts.get(lower, 0)
+                )
+                for index, lower in enumerate(edges)
+            ],
+            below_range=counts.get("below_range", 0),
+            total=stats.get("total", 0),
+            price_min=stats.get("price_min"),
+            price_max=stats.get("price_max")
+        )
@@ -0,0 +1,305 @@
+from typing import Dict, List, Optional, Tuple
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from models.product import ProductCard
+from services.product_service import CARD_PROJECTION
+from services import catalog_events
+import numpy as np
+import asyncio
+import logging
+import math
+import os
+
+logger = logging.getLogger(__name__)
+
+NEIGHBORS_PER_PRODUCT = int(os.getenv("RECOMMENDATIONS_NEIGHBORS", "24"))
+# All-pairs similarity is O(n^2); beyond this many products only the most
+# recently updated ones are indexed
+MAX_INDEXED_PRODUCTS = int(os.getenv("RECOMMENDATIONS_MAX_PRODUCTS", "50000"))
+BLOCK_ROWS = 256
+# A failed startup build is retried with exponential backoff up to the max
+REBUILD_RETRY_SECONDS = 5
+REBUILD_RETRY_MAX_SECONDS = 300
+
+# Relative importance of each attribute in the similarity score
+FEATURE_WEIGHTS = {
+    "collection": 1.0,
+    "type": 1.0,
+    "gender": 0.8,
+    "frame_color": 0.8,
+    "lens_color": 0.5,
+    "materials": 0.6,
+    "tags": 0.5,
+    "price_band": 0.7,
+}
+
+# Fields needed to encode features, in addition to the card fields we serve
+FEATURE_PROJECTION = {**CARD_PROJECTION, "lens_color": 1, "materials": 1, "tags": 1}
+
+def _price_band(price: float) -> int:
+    # Bands ~25% wide, so "similar price" is scale independent
+    return int(math.log(max(price, 1.0)) / math.log(1.25))
+
+def _encode(product: dict) -> List[Tuple[str, float]]:
+    """Sparse (feature key, weight) pairs describing a product"""
+    features = []
+    for field in ("collection", "type", "gender", "frame_color", "lens_color"):
+        value = product.get(field)
+        if value:
+            features.append((f"{field}:{str(value).lower()}", FEATURE_WEIGHTS[field]))
+
+    materials = [m.strip().lower() for m in (product.get("materials") or "").split(",") if m.strip()]
+    for material in materials:
+        features.append((f"materials:{material}", FEATURE_WEIGHTS["materials"] / math.sqrt(len(materials))))
+
+    tags = sorted({tag.lower() for tag in product.get("tags") or []})
+    for tag in tags:
+        features.append((f"tags:{tag}", FEATURE_WEIGHTS["tags"] / math.sqrt(len(tags))))
+
+    band = _price_band(product.get("price") or 0)
+    features.append((f"price_band:{band}", FEATURE_WEIGHTS["price_band"]))
+    # Neighbouring bands share a little weight so nearby prices still match
+    features.append((f"price_band:{band - 1}", FEATURE_WEIGHTS["price_band"] / 2))
+    features.append((f"price_band:{band + 1}", FEATURE_WEIGHTS["price_band"] / 2))
+    return features
+
+class RecommendationIndex:
+    """Dense, L2-normalised feature matrix with precomputed top-k cosine neighbours.
+
+    Not thread-safe; callers serialise mutations and must not mutate an
+    index that readers can see (see `copy`).
+    """
+
+    def __init__(self, k: int = NEIGHBORS_PER_PRODUCT):
+        self.k = k
+        self.vocab: Dict[str, int] = {}
+        self.row_of: Dict[str, int] = {}
+        self.cards: List[Optional[dict]] = []
+        self.features = np.zeros((0, 0), dtype=np.float32)
+        self.candidate = np.zeros(0, dtype=bool)  # alive and active
+        self.neighbors = np.zeros((0, k), dtype=np.int32)
+        self.scores = np.zeros((0, k), dtype=np.float32)
+        self.size = 0
+
+    def copy(self) -> "RecommendationIndex":
+        """Independent copy that can be updated while readers use this one"""
+        index = RecommendationIndex(self.k)
+        index.vocab = dict(self.vocab)
+        index.row_of = dict(self.row_of)
+        index.cards = list(self.cards)
+        index.features = self.features.copy()
+        index.candidate = self.candidate.copy()
+        index.neighbors = self.neighbors.copy()
+        index.scores = self.scores.copy()
+        index.size = self.size
+        return index
+
+    def _ensure_capacity(self, rows: int, columns: int) -> None:
+        cap_rows, cap_cols = self.features.shape
+        if rows <= cap_rows and columns <= cap_cols:
+            return
+        new_rows = max(rows, int(cap_rows * 1.5) + 16)
+        new_cols = max(columns, int(cap_cols * 1.5) + 16)
+        features = np.zeros((new_rows, new_cols), dtype=np.float32)
+        features[:cap_rows, :cap_cols] = self.features
+        self.features = features
+        if new_rows > cap_rows:
+            extra = new_rows - cap_rows
+            self.candidate = np.concatenate([self.candidate, np.zeros(extra, dtype=bool)])
+            self.neighbors = np.concatenate([self.neighbors, np.full((extra, self.k), -1, dtype=np.int32)])
+            self.scores = np.concatenate([self.scores, np.full((extra, self.k), -np.inf, dtype=np.float32)])
+
+    def _vector(self, product: dict) -> Tuple[np.ndarray, np.ndarray]:
+        pairs = _encode(product)
+        for key, _ in pairs:
+            if key not in self.vocab:
+                self.vocab[key] = len(self.vocab)
+        columns = np.array([self.vocab[key] for key, _ in pairs], dtype=np.int64)
+        weights = np.array([weight for _, weight in pairs], dtype=np.float32)
+        weights /= np.linalg.norm(weights) or 1.0
+        return columns, weights
+
+    def _set_row(self, row: int, product: dict) -> None:
+        columns, weights = self._vector(product)
+        self._ensure_capacity(self.size, len(self.vocab))
+        self.features[row] = 0
+        self.features[row, columns] = weights
+        self.cards[row] = ProductCard(**product).dict()
+        self.candidate[row] = product.get("status") == "active"
+
+    def _top_k(self, similarities: np.ndarray, exclude_rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k columns per row of a (rows x size) similarity block"""
+        similarities = np.where(self.candidate[:self.size], similarities, -np.inf)
+        similarities[np.arange(len(exclude_rows)), exclude_rows] = -np.inf
+        k = min(self.k, self.size)
+        neighbors = np.full((len(similarities), self.k), -1, dtype=np.int32)
+        scores = np.full((len(similarities), self.k), -np.inf, dtype=np.float32)
+        if k == 0:
+            return neighbors, scores
+        top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(similarities, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        neighbors[:, :k] = np.take_along_axis(top, order, axis=1)
+        scores[:, :k] = np.take_along_axis(top_scores, order, axis=1)
+        neighbors[~np.isfinite(scores)] = -1
+        return neighbors, scores
+
+    def _recompute_rows(self, rows: np.ndarray) -> None:
+        matrix = self.features[:self.size]
+        for start in range(0, len(rows), BLOCK_ROWS):
+            block = rows[start:start + BLOCK_ROWS]
+            similarities = self.features[block] @ matrix.T
+            self.neighbors[block], self.scores[block] = self._top_k(similarities, block)
+
+    def build(self, products: List[dict]) -> None:
+        self.size = len(products)
+        self.cards = [None] * self.size
+        self.row_of = {}
+        self._ensure_capacity(self.size, 0)
+        for row, product in enumerate(products):
+            self.row_of[product["id"]] = row
+            self._set_row(row, product)
+        self._recompute_rows(np.arange(self.size))
+
+    def upsert(self, product: dict) -> None:
+        row = self.row_of.get(product["id"])
+        if row is None:
+            row = self.size
+            self.size += 1
+            self._ensure_capacity(self.size, len(self.vocab))
+            self.cards.append(None)
+            self.row_of[product["id"]] = row
+        else:
+            self._drop_as_neighbor(row)
+        self._set_row(row, product)
+
+        similarities = self.features[:self.size] @ self.features[row]
+        self.neighbors[row], self.scores[row] = self._top_k(similarities[None, :].copy(), np.array([row]))
+        if not self.candidate[row]:
+            return
+
+        # Insert the product into every list whose weakest neighbour it beats
+        improved = np.flatnonzero(similarities > self.scores[:self.size, -1])
+        for other in improved[improved != row]:
+            if self.cards[other] is None:
+                continue
+            position = int(np.searchsorted(-self.scores[other], -similarities[other], side="right"))
+            self.neighbors[other, position + 1:] = self.neighbors[other, position:-1].copy()
+            self.scores[other, position + 1:] = self.scores[other, position:-1].copy()
+            self.neighbors[other, position] = row
+            self.scores[other, position] = similarities[other]
+
+    def remove(self, product_id: str) -> None:
+        row = self.row_of.pop(product_id, None)
+        if row is None:
+            return
+        self.cards[row] = None
+        self.features[row] = 0
+        self._drop_as_neighbor(row)
+        self.neighbors[row] = -1
+        self.scores[row] = -np.inf
+
+    def _drop_as_neighbor(self, row: int) -> None:
+        self.candidate[row] = False
+        affected = np.flatnonzero((self.neighbors[:self.size] == row).any(axis=1))
+        if len(affected):
+            self._recompute_rows(affected)
+
+    def related(self, product_id: str, limit: int) -> Optional[List[dict]]:
+        row = self.row_of.get(product_id)
+        if row is None:
+            return None
+        results = []
+        for neighbor in self.neighbors[row]:
+            if neighbor < 0 or len(results) >= limit:
+                break
+            card = self.cards[neighbor]
+            if card is not None and self.candidate[neighbor]:
+                results.append(card)
+        return results
+
+class RecommendationService:
+    """Process-wide recommendation index kept current from catalog write events"""
+
+    def __init__(self):
+        self.index: Optional[RecommendationIndex] = None
+        self.db: Optional[AsyncIOMotorDatabase] = None
+        self._lock = asyncio.Lock()
+        self._pending_ids: set = set()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.index is not None
+
+    async def rebuild(self, db: AsyncIOMotorDatabase) -> None:
+        self.db = db
+        cursor = db.products.find({}, FEATURE_PROJECTION).sort("updated_at", -1).limit(MAX_INDEXED_PRODUCTS)
+        products = await cursor.to_list(length=None)
+        index = RecommendationIndex()
+        # The matrix products release the GIL, so keep them off the event loop
+        await asyncio.to_thread(index.build, products)
+        async with self._lock:
+            self.index = index
+        logger.info("Recommendation index built for %s products", len(products))
+        # Apply writes that happened while the index was being built
+        self._schedule_refresh()
+
+    async def build_in_background(self, db: AsyncIOMotorDatabase) -> None:
+        """Build the index, retrying with backoff until it succeeds (e.g. Mongo still starting)"""
+        delay = REBUILD_RETRY_SECONDS
+        while True:
+            try:
+                await self.rebuild(db)
+                return
+            except Exception as e:
+                logger.error("Error building recommendation index, retrying in %ss: %s", delay, e)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, REBUILD_RETRY_MAX_SECONDS)
+
+    def related(self, product_id: str, limit: int) -> Optional[List[dict]]:
+        if self.index is None:
+            return None
+        return self.index.related(product_id, limit)
+
+    def on_catalog_change(self, entity: str, action: str, ids: List[str]) -> None:
+        if entity != "product" or self.db is None:
+            return
+        self._pending_ids.update(ids)
+        self._schedule_refresh()
+
+    def _schedule_refresh(self) -> None:
+        if self.index is None or not self._pending_ids:
+            return
+        if self._refresh_task is None or self._refresh_task.done():
+            try:
+                self._refresh_task = asyncio.get_running_loop().create_task(self._apply_pending())
+            except RuntimeError:
+                pass
+
+    def _apply(self, products: List[dict], ids: List[str]) -> RecommendationIndex:
+        # related() reads the live index on the event loop, so updates go to
+        # a copy that replaces it in a single assignment
+        index = self.index.copy()
+        found = {product["id"] for product in products}
+        for product in products:
+            index.upsert(product)
+        for product_id in ids:
+            if product_id not in found:
+                index.remove(product_id)
+        return index
+
+    async def _apply_pending(self) -> None:
+        while self._pending_ids:
+            ids = list(self._pending_ids)
+            self._pending_ids.clear()
+            try:
+                products = await self.db.products.find({"id": {"$in": ids}}, FEATURE_PROJECTION).to_list(length=None)
+                async with self._lock:
+                    # Each update scores against the whole catalog; like the
+                    # initial build, keep the matrix work off the event loop
+                    self.index = await asyncio.to_thread(self._apply, products, ids)
+            except Exception as e:
+                logger.error("Error refreshing recommendations: %s", e)
+
+recommendation_service = RecommendationService()
+catalog_events.subscribe(recommendation_service.on_catalog_change)
@@ -0,0 +1,249 @@
+from typing import Awaitable, Callable, Deque, Hashable, Optional, Set, Tuple, TypeVar
+from collections import OrderedDict, deque
+from fastapi import HTTPException
+from pymongo.errors import ConnectionFailure, ExecutionTimeout
+from services.metrics_service import registry
+from services.single_flight import SingleFlight
+import asyncio
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Server-side budget for catalog read queries (maxTimeMS)
+READ_MAX_TIME_MS = int(os.getenv("MONGO_READ_MAX_TIME_MS", "2000"))
+
+# Serve-stale mode: answer from the last good result and refresh in the background
+SERVE_STALE = os.getenv("CATALOG_SERVE_STALE", "true").lower() in ("1", "true", "yes")
+# Results younger than this are served without a refresh
+FRESH_SECONDS = float(os.getenv("CATALOG_FRESH_SECONDS", "10"))
+# Results up to this old are served immediately while a refresh runs
+STALE_SECONDS = float(os.getenv("CATALOG_STALE_SECONDS", "300"))
+# Last-known-good results up to this old are served when Mongo is failing
+FALLBACK_SECONDS = float(os.getenv("CATALOG_FALLBACK_SECONDS", "3600"))
+MAX_CACHED_RESULTS = int(os.getenv("CATALOG_CACHE_MAX_ENTRIES", "5000"))
+# A list result holds up to a page of full products, so memory is bounded by
+# the number of rows cached rather than by the number of results
+MAX_CACHED_ROWS = int(os.getenv("CATALOG_CACHE_MAX_ROWS", "20000"))
+
+# Circuit breaker thresholds
+BREAKER_SLOW_CALL_SECONDS = float(os.getenv("MONGO_BREAKER_SLOW_CALL_SECONDS", "1.0"))
+BREAKER_WINDOW = int(os.getenv("MONGO_BREAKER_WINDOW", "20"))
+BREAKER_MIN_CALLS = int(os.getenv("MONGO_BREAKER_MIN_CALLS", "10"))
+BREAKER_FAILURE_RATIO = float(os.getenv("MONGO_BREAKER_FAILURE_RATIO", "0.5"))
+BREAKER_COOLDOWN_SECONDS = float(os.getenv("MONGO_BREAKER_COOLDOWN_SECONDS", "10"))
+
+catalog_cache_requests_total = registry.counter(
+    "catalog_cache_requests_total",
+    "Catalog reads by cache and outcome (fresh, stale, miss, fallback, unavailable).",
+    ("cache", "outcome")
+)
+circuit_breaker_transitions_total = registry.counter(
+    "circuit_breaker_transitions_total",
+    "Circuit breaker state transitions by breaker and new state.",
+    ("breaker", "state")
+)
+
+# Errors that mean Mongo is unreachable or over budget, as opposed to a bad query
+MONGO_UNAVAILABLE_ERRORS = (ConnectionFailure, ExecutionTimeout)
+
+class CatalogUnavailableError(HTTPException):
+    def __init__(self, retry_after: int = int(BREAKER_COOLDOWN_SECONDS)):
+        super().__init__(
+            status_code=503,
+            detail="Catalog temporarily unavailable",
+            headers={"Retry-After": str(max(1, retry_after))}
+        )
+
+class CircuitOpenError(Exception):
+    pass
+
+class CircuitBreaker:
+    """Trips when too many recent calls failed or exceeded the slow-call threshold.
+
+    closed -> open after the failure ratio is crossed over the rolling window;
+    open -> half_open after the cooldown, letting one probe call through;
+    half_open -> closed on a good probe, back to open on a bad one.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self._outcomes: Deque[bool] = deque(maxlen=BREAKER_WINDOW)
+        self._probe_in_flight = False
+
+    def _transition(self, state: str) -> None:
+        if state != self.state:
+            logger.warning("Circuit breaker %s: %s -> %s", self.name, self.state, state)
+            self.state = state
+            circuit_breaker_transitions_total.inc((self.name, state))
+        if state == self.OPEN:
+            self.opened_at = time.monotonic()
+        if state == self.CLOSED:
+            self._outcomes.clear()
+
+    def retry_after(self) -> int:
+        remaining = BREAKER_COOLDOWN_SECONDS - (time.monotonic() - self.opened_at)
+        return max(1, int(remaining + 0.999))
+
+    def _allow(self) -> bool:
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= BREAKER_COOLDOWN_SECONDS:
+            self._transition(self.HALF_OPEN)
+        if self.state == self.HALF_OPEN:
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+        return self.state == self.CLOSED
+
+    def _record(self, ok: bool) -> None:
+        if self.state == self.HALF_OPEN:
+            self._probe_in_flight = False
+            self._transition(self.CLOSED if ok else self.OPEN)
+            return
+        self._outcomes.append(ok)
+        failures = self._outcomes.count(False)
+        if len(self._outcomes) >= BREAKER_MIN_CALLS and failures / len(self._outcomes) >= BREAKER_FAILURE_RATIO:
+            self._transition(self.OPEN)
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        if not self._allow():
+            raise CircuitOpenError(f"Circuit breaker {self.name} is open")
+        start = time.monotonic()
+        try:
+            result = await fn()
+        except MONGO_UNAVAILABLE_ERRORS:
+            self._record(False)
+            raise
+        except BaseException:
+            # Cancellations and query errors say nothing about Mongo's health
+            self._probe_in_flight = False
+            raise
+        self._record(time.monotonic() - start <= BREAKER_SLOW_CALL_SECONDS)
+        return result
+
+mongo_breaker = CircuitBreaker("mongo")
+
+def read_scope(db) -> Tuple[str, str]:
+    """Cache key prefix for reads through `db`.
+
+    The catalog and admin handles share a database name but not a read
+    preference, and a primary read must never be answered from a result a
+    lagging secondary returned.
+    """
+    return db.name, repr(db.read_preference)
+
+def _row_count(value) -> int:
+    return len(value) if isinstance(value, (list, tuple)) else 1
+
+class _Entry:
+    __slots__ = ("value", "rows", "fetched_at", "invalidated")
+
+    def __init__(self, value, invalidated: bool = False):
+        self.value = value
+        self.rows = _row_count(value)
+        self.fetched_at = time.monotonic()
+        self.invalidated = invalidated
+
+class CatalogReadCache:
+    """Read path for catalog queries: single-flight + circuit breaker + serve-stale.
+
+    Writes only mark entries invalidated, so the next read reloads
+    synchronously but the old value remains available as last-known-good if
+    Mongo is failing.
+    """
+
+    def __init__(self, name: str, breaker: CircuitBreaker = mongo_breaker):
+        self.name = name
+        self.breaker = breaker
+        self.flight = SingleFlight(name)
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._rows = 0
+        self._refreshes: Set[asyncio.Future] = set()
+        # Bumped on every write so loads that started earlier neither get
+        # joined by later readers nor cached as fresh
+        self._generation = 0
+
+    def invalidate(self, *args) -> None:
+        """Mark every entry as needing a reload; accepts catalog event arguments"""
+        self._generation += 1
+        for entry in self._entries.values():
+            entry.invalidated = True
+
+    def _store(self, key: Hashable, value, generation: int) -> None:
+        entry = _Entry(value, invalidated=generation != self._generation)
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._rows -= previous.rows
+        if entry.rows > MAX_CACHED_ROWS:
+            return
+        self._entries[key] = entry
+        self._rows += entry.rows
+        while len(self._entries) > MAX_CACHED_RESULTS or self._rows > MAX_CACHED_ROWS:
+            _, evicted = self._entries.popitem(last=False)
+            self._rows -= evicted.rows
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[T]]) -> T:
+        generation = self._generation
+
+        async def load_and_store():
+            value = await self.breaker.call(loader)
+            if SERVE_STALE:
+                self._store(key, value, generation)
+            return value
+        return await self.flight.do((generation, key), load_and_store)
+
+    def _refresh_in_background(self, key: Hashable, loader: Callable[[], Awaitable[T]]) -> None:
+        async def refresh():
+            try:
+                await self._load(key, loader)
+            except Exception as e:
+                logger.warning("Background refresh of %s failed: %s", self.name, e)
+        # The loop only holds weak references to tasks; keep one until it is done
+        task = asyncio.ensure_future(refresh())
+        self._refreshes.add(task)
+        task.add_done_callback(self._refreshes.discard)
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[T]]) -> T:
+        if not SERVE_STALE:
+            return await self._load_or_unavailable(key, loader, None)
+
+        entry = self._entries.get(key)
+        if entry is not None and not entry.invalidated:
+            age = time.monotonic() - entry.fetched_at
+            if age <= FRESH_SECONDS:
+                catalog_cache_requests_total.inc((self.name, "fresh"))
+                return entry.value
+            if age <= STALE_SECONDS:
+                catalog_cache_requests_total.inc((self.name, "stale"))
+                self._refresh_in_background(key, loader)
+                return entry.value
+
+        return await self._load_or_unavailable(key, loader, entry)
+
+    async def _load_or_unavailable(self, key: Hashable, loader: Callable[[], Awaitable[T]],
+                                   entry: Optional[_Entry]) -> T:
+        try:
+            value = await self._load(key, loader)
+            catalog_cache_requests_total.inc((self.name, "miss"))
+            return value
+        except Exception as e:
+            if entry is not None and time.monotonic() - entry.fetched_at <= FALLBACK_SECONDS:
+                catalog_cache_requests_total.inc((self.name, "fallback"))
+                logger.warning("Serving last-known-good %s result: %s", self.name, e)
+                return entry.value
+            if isinstance(e, CircuitOpenError):
+                catalog_cache_requests_total.inc((self.name, "unavailable"))
+                raise CatalogUnavailableError(self.breaker.retry_after())
+            if isinstance(e, MONGO_UNAVAILABLE_ERRORS):
+                catalog_cache_requests_total.inc((self.name, "unavailable"))
+                raise CatalogUnavailableError()
+            raise
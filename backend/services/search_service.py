@@ -0,0 +1,228 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from array import array
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from services import catalog_events
+import numpy as np
+import asyncio
+import logging
+import os
+import re
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+# Fraction of the query's (weighted) trigrams a product must contain
+MIN_SCORE = float(os.getenv("SEARCH_FUZZY_MIN_SCORE", "0.35"))
+# Compact the index once this share of rows belongs to replaced or deleted products
+COMPACT_DEAD_RATIO = 0.25
+
+# Trigrams from the name count fully; other fields help but rank lower
+FIELD_WEIGHTS = {
+    "name": 1.0,
+    "collection": 0.7,
+    "frame_color": 0.6,
+    "lens_color": 0.5,
+    "tags": 0.5,
+}
+SEARCH_PROJECTION = {"_id": 0, "id": 1, "status": 1, **{field: 1 for field in FIELD_WEIGHTS}}
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+def _words(text: str) -> List[str]:
+    # Fold accents so "Capri" matches "Caprì"
+    folded = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return _WORD_RE.findall(folded.lower())
+
+def trigrams(text: str) -> set:
+    """pg_trgm style trigrams: each word padded with two leading and one trailing space"""
+    grams = set()
+    for word in _words(text):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+def _weighted_trigrams(product: dict) -> Dict[str, float]:
+    weights: Dict[str, float] = {}
+    for field, field_weight in FIELD_WEIGHTS.items():
+        value = product.get(field)
+        if not value:
+            continue
+        text = " ".join(value) if isinstance(value, list) else str(value)
+        for gram in trigrams(text):
+            if weights.get(gram, 0.0) < field_weight:
+                weights[gram] = field_weight
+    return weights
+
+class TrigramIndex:
+    """Inverted index from trigram to (row, weight) postings.
+
+    Postings are append-only typed arrays; a changed product gets a new row
+    and its old row is marked dead, so queries never need locks around list
+    surgery. Scoring is one weighted np.bincount over the query's postings.
+    Not thread-safe; callers serialise mutations.
+    """
+
+    def __init__(self):
+        self.grams: Dict[str, int] = {}
+        self.rows: Dict[int, "array"] = {}
+        self.weights: Dict[int, "array"] = {}
+        self.row_of: Dict[str, int] = {}
+        self.ids: List[Optional[str]] = []
+        self.signatures: List[Optional[Tuple]] = []
+        self.searchable = np.zeros(0, dtype=bool)
+        self.name_lengths = np.zeros(0, dtype=np.int32)
+        self.dead = 0
+
+    @property
+    def size(self) -> int:
+        return len(self.ids)
+
+    def _grow(self) -> None:
+        if self.size > len(self.searchable):
+            capacity = max(self.size, int(len(self.searchable) * 1.5) + 64)
+            self.searchable = np.concatenate([self.searchable, np.zeros(capacity - len(self.searchable), dtype=bool)])
+            self.name_lengths = np.concatenate([
+                self.name_lengths, np.zeros(capacity - len(self.name_lengths), dtype=np.int32)
+            ])
+
+    @staticmethod
+    def _signature(product: dict) -> Tuple:
+        return tuple(
+            tuple(value) if isinstance(value, list) else value
+            for value in (product.get(field) for field in FIELD_WEIGHTS)
+        )
+
+    def _append_row(self, product: dict) -> None:
+        row = self.size
+        self.ids.append(product["id"])
+        self.signatures.append(self._signature(product))
+        self.row_of[product["id"]] = row
+        self._grow()
+        self.searchable[row] = product.get("status") == "active"
+        self.name_lengths[row] = len(product.get("name") or "")
+        for gram, weight in _weighted_trigrams(product).items():
+            gram_id = self.grams.get(gram)
+            if gram_id is None:
+                gram_id = self.grams[gram] = len(self.grams)
+                self.rows[gram_id] = array("i")
+                self.weights[gram_id] = array("f")
+            self.rows[gram_id].append(row)
+            self.weights[gram_id].append(weight)
+
+    def _kill_row(self, row: int) -> None:
+        self.ids[row] = None
+        self.signatures[row] = None
+        self.searchable[row] = False
+        self.dead += 1
+
+    def build(self, products: Iterable[dict]) -> None:
+        self.__init__()
+        for product in products:
+            self._append_row(product)
+
+    def upsert(self, product: dict) -> None:
+        row = self.row_of.get(product["id"])
+        if row is not None and self.signatures[row] == self._signature(product):
+            # Text unchanged (e.g. a status change): only flip visibility
+            self.searchable[row] = product.get("status") == "active"
+            return
+        if row is not None:
+            self._kill_row(row)
+        self._append_row(product)
+
+    def remove(self, product_id: str) -> None:
+        row = self.row_of.pop(product_id, None)
+        if row is not None:
+            self._kill_row(row)
+
+    @property
+    def needs_compaction(self) -> bool:
+        return self.size > 0 and self.dead / self.size > COMPACT_DEAD_RATIO
+
+    def search(self, query: str, limit: int, min_score: float = MIN_SCORE) -> List[Tuple[str, float]]:
+        all_grams = trigrams(query)
+        query_grams = [self.grams[gram] for gram in all_grams if gram in self.grams]
+        if not query_grams:
+            return []
+        total = len(all_grams)
+        rows = np.concatenate([np.frombuffer(self.rows[g], dtype=np.int32) for g in query_grams])
+        weights = np.concatenate([np.frombuffer(self.weights[g], dtype=np.float32) for g in query_grams])
+        scores = np.bincount(rows, weights=weights, minlength=self.size) / total
+        scores[~self.searchable[:self.size]] = 0.0
+        candidates = np.flatnonzero(scores >= min_score)
+        if not len(candidates):
+            return []
+        # Best score first; shorter names win ties (closer to what was typed).
+        # Score steps are >= 1e-3, so the length term only breaks ties.
+        keys = self.name_lengths[candidates] * 1e-6 - scores[candidates]
+        if len(candidates) > limit:
+            top = np.argpartition(keys, limit - 1)[:limit]
+            candidates, keys = candidates[top], keys[top]
+        ranked = candidates[np.argsort(keys, kind="stable")]
+        return [(self.ids[row], float(scores[row])) for row in ranked]
+
+class SearchService:
+    """Process-wide fuzzy search index kept current from catalog write events"""
+
+    def __init__(self):
+        self.index: Optional[TrigramIndex] = None
+        self.db: Optional[AsyncIOMotorDatabase] = None
+        self._lock = asyncio.Lock()
+        self._pending_ids: set = set()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.index is not None
+
+    async def rebuild(self, db: AsyncIOMotorDatabase) -> None:
+        self.db = db
+        products = await db.products.find({}, SEARCH_PROJECTION).to_list(length=None)
+        index = TrigramIndex()
+        await asyncio.to_thread(index.build, products)
+        async with self._lock:
+            self.index = index
+        logger.info("Search index built for %s products (%s trigrams)", len(products), len(index.grams))
+        self._schedule_refresh()
+
+    def search(self, query: str, limit: int) -> Optional[List[str]]:
+        """Ids of the best fuzzy matches, or None while the index is not built"""
+        if self.index is None:
+            return None
+        return [product_id for product_id, _ in self.index.search(query, limit)]
+
+    def on_catalog_change(self, entity: str, action: str, ids: List[str]) -> None:
+        if entity != "product" or self.db is None:
+            return
+        self._pending_ids.update(ids)
+        self._schedule_refresh()
+
+    def _schedule_refresh(self) -> None:
+        if self.index is None or not self._pending_ids:
+            return
+        if self._refresh_task is None or self._refresh_task.done():
+            try:
+                self._refresh_task = asyncio.get_running_loop().create_task(self._apply_pending())
+            except RuntimeError:
+                pass
+
+    async def _apply_pending(self) -> None:
+        while self._pending_ids:
+            ids = list(self._pending_ids)
+            self._pending_ids.clear()
+            try:
+                products = await self.db.products.find({"id": {"$in": ids}}, SEARCH_PROJECTION).to_list(length=None)
+                async with self._lock:
+                    found = {product["id"] for product in products}
+                    for product in products:
+                        self.index.upsert(product)
+                    for product_id in ids:
+                        if product_id not in found:
+                            self.index.remove(product_id)
+                if self.index.needs_compaction:
+                    await self.rebuild(self.db)
+            except Exception as e:
+                logger.error("Error refreshing search index: %s", e)
+
+search_service = SearchService()
+catalog_events.subscribe(search_service.on_catalog_change)
@@ -0,0 +1,49 @@
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+from services.metrics_service import registry
+import asyncio
+
+T = TypeVar("T")
+
+singleflight_requests_total = registry.counter(
+    "singleflight_requests_total",
+    "Reads routed through single-flight groups, by whether they ran or joined an in-flight call.",
+    ("group", "outcome")
+)
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one execution.
+
+    The first caller starts the work as an independent task; callers that
+    arrive while it is in flight await the same task and share its result
+    (or exception). A caller being cancelled does not cancel the shared work.
+    """
+
+    def __init__(self, group: str):
+        self.group = group
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is None:
+            self.executed += 1
+            singleflight_requests_total.inc((self.group, "executed"))
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+            singleflight_requests_total.inc((self.group, "coalesced"))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved even if every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._inflight)
@@ -0,0 +1,283 @@
+from typing import BinaryIO, Optional
+from abc import ABC, abstractmethod
+from pathlib import Path
+from datetime import datetime
+import asyncio
+import os
+import shutil
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local").lower()
+UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", "/app/backend/uploads"))
+UPLOAD_URL_PREFIX = "/uploads/"
+
+# S3-compatible settings (AWS, MinIO, ...); credentials come from the usual
+# AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY environment variables
+S3_BUCKET = os.getenv("S3_BUCKET", "")
+S3_PREFIX = os.getenv("S3_PREFIX", "uploads/")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") or None
+S3_REGION = os.getenv("S3_REGION") or None
+# Public base URL for stored objects (CDN or bucket website); defaults to the bucket URL
+S3_PUBLIC_URL = os.getenv("S3_PUBLIC_URL", "")
+# Files above the threshold are uploaded as multipart, parts sent in parallel
+S3_MULTIPART_THRESHOLD = int(os.getenv("S3_MULTIPART_THRESHOLD_MB", "8")) * 1024 * 1024
+S3_MULTIPART_CHUNKSIZE = int(os.getenv("S3_MULTIPART_CHUNKSIZE_MB", "8")) * 1024 * 1024
+S3_MAX_CONCURRENCY = int(os.getenv("S3_UPLOAD_CONCURRENCY", "8"))
+
+# Private files (admin exports) live apart from the public uploads: a
+# directory without a static mount, or a bucket/prefix outside S3_PREFIX that
+# the bucket policy does not expose. Admins fetch them through the API.
+EXPORT_DIR = Path(os.getenv("EXPORT_DIR", "/app/backend/exports"))
+S3_EXPORT_BUCKET = os.getenv("S3_EXPORT_BUCKET", "") or S3_BUCKET
+S3_EXPORT_PREFIX = os.getenv("S3_EXPORT_PREFIX", "exports/")
+
+# Object names are unique, so they can be cached forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+PRIVATE_CACHE_CONTROL = "private, no-store"
+
+class StorageBackend(ABC):
+    """Where uploaded images live. Keys look like "products/<uuid>.jpg"."""
+
+    @abstractmethod
+    async def save(self, key: str, fileobj: BinaryIO, content_type: Optional[str] = None) -> str:
+        """Store the file and return its public URL"""
+
+    @abstractmethod
+    async def delete(self, key: str) -> bool:
+        """Delete the object; False if it did not exist"""
+
+    @abstractmethod
+    async def info(self, key: str) -> Optional[dict]:
+        """size (bytes) and created_at (epoch seconds), or None if missing"""
+
+    @abstractmethod
+    async def read_head(self, key: str, length: int) -> Optional[bytes]:
+        """The first `length` bytes of the object, or None if missing"""
+
+    async def presign_upload(self, key: str, content_type: str, max_size: int, expires_in: int) -> Optional[dict]:
+        """A direct-to-storage upload target: {"method", "url", "fields", "headers"}.
+
+        None when the backend cannot accept uploads without going through
+        the API (local disk).
+        """
+        return None
+
+    async def presign_download(self, key: str, expires_in: int, filename: Optional[str] = None) -> Optional[str]:
+        """A short-lived GET URL for a private object.
+
+        None when the backend cannot hand out such URLs (local disk); the API
+        then serves the file itself.
+        """
+        return None
+
+    @abstractmethod
+    def url_for(self, key: str) -> str:
+        """Public URL of the object"""
+
+    @abstractmethod
+    def key_for(self, url: str) -> Optional[str]:
+        """Inverse of url_for; None for URLs this backend does not own"""
+
+class LocalStorage(StorageBackend):
+    """Files under UPLOAD_DIR, served by the app's /uploads static mount"""
+
+    def __init__(self, root: Path = UPLOAD_DIR):
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if self.root.resolve() not in path.parents:
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def path_for(self, key: str) -> Path:
+        """Where the object is (or would be) on disk"""
+        return self._path(key)
+
+    async def save(self, key: str, fileobj: BinaryIO, content_type: Optional[str] = None) -> str:
+        path = self._path(key)
+
+        def write():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                with open(path, "wb") as buffer:
+                    shutil.copyfileobj(fileobj, buffer)
+            except Exception:
+                path.unlink(missing_ok=True)
+                raise
+
+        await asyncio.to_thread(write)
+        return self.url_for(key)
+
+    async def delete(self, key: str) -> bool:
+        path = self._path(key)
+        if not path.exists():
+            return False
+        await asyncio.to_thread(path.unlink)
+        return True
+
+    async def info(self, key: str) -> Optional[dict]:
+        path = self._path(key)
+        if not path.exists():
+            return None
+        stat = path.stat()
+        return {"size": stat.st_size, "created_at": stat.st_ctime}
+
+    async def read_head(self, key: str, length: int) -> Optional[bytes]:
+        path = self._path(key)
+        if not path.exists():
+            return None
+
+        def read():
+            with open(path, "rb") as f:
+                return f.read(length)
+
+        return await asyncio.to_thread(read)
+
+    def url_for(self, key: str) -> str:
+        return f"{UPLOAD_URL_PREFIX}{key}"
+
+    def key_for(self, url: str) -> Optional[str]:
+        return url[len(UPLOAD_URL_PREFIX):] if url.startswith(UPLOAD_URL_PREFIX) else None
+
+class S3Storage(StorageBackend):
+    """S3-compatible object storage, shared by every API node.
+
+    boto3 is synchronous, so calls run in worker threads; large files go
+    through boto3's managed transfer, which uploads multipart chunks in
+    parallel.
+    """
+
+    def __init__(self, bucket: str = S3_BUCKET, prefix: str = S3_PREFIX,
+                 cache_control: str = IMMUTABLE_CACHE_CONTROL):
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+
+        if not bucket:
+            raise ValueError("S3_BUCKET must be set when STORAGE_BACKEND=s3")
+        self.bucket = bucket
+        self.prefix = prefix
+        self.cache_control = cache_control
+        self.client = boto3.client("s3", endpoint_url=S3_ENDPOINT_URL, region_name=S3_REGION)
+        self.transfer_config = TransferConfig(
+            multipart_threshold=S3_MULTIPART_THRESHOLD,
+            multipart_chunksize=S3_MULTIPART_CHUNKSIZE,
+            max_concurrency=S3_MAX_CONCURRENCY,
+            use_threads=True
+        )
+        if S3_PUBLIC_URL:
+            self.public_url = S3_PUBLIC_URL.rstrip("/")
+        elif S3_ENDPOINT_URL:
+            self.public_url = f"{S3_ENDPOINT_URL.rstrip('/')}/{bucket}"
+        else:
+            self.public_url = f"https://{bucket}.s3.amazonaws.com"
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    async def save(self, key: str, fileobj: BinaryIO, content_type: Optional[str] = None) -> str:
+        extra_args = {"ContentType": content_type} if content_type else {}
+        extra_args["CacheControl"] = self.cache_control
+        await asyncio.to_thread(
+            self.client.upload_fileobj,
+            fileobj, self.bucket, self._object_key(key),
+            ExtraArgs=extra_args, Config=self.transfer_config
+        )
+        return self.url_for(key)
+
+    async def delete(self, key: str) -> bool:
+        if await self.info(key) is None:
+            return False
+        await asyncio.to_thread(self.client.delete_object, Bucket=self.bucket, Key=self._object_key(key))
+        return True
+
+    async def info(self, key: str) -> Optional[dict]:
+        from botocore.exceptions import ClientError
+
+        try:
+            head = await asyncio.to_thread(self.client.head_object, Bucket=self.bucket, Key=self._object_key(key))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        last_modified: datetime = head["LastModified"]
+        return {"size": head["ContentLength"], "created_at": last_modified.timestamp()}
+
+    async def read_head(self, key: str, length: int) -> Optional[bytes]:
+        from botocore.exceptions import ClientError
+
+        def read():
+            response = self.client.get_object(
+                Bucket=self.bucket, Key=self._object_key(key), Range=f"bytes=0-{length - 1}"
+            )
+            return response["Body"].read()
+
+        try:
+            return await asyncio.to_thread(read)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    async def presign_upload(self, key: str, content_type: str, max_size: int, expires_in: int) -> Optional[dict]:
+        # A presigned POST (unlike a presigned PUT) lets S3 itself enforce
+        # the size limit and content type
+        fields = {"Content-Type": content_type, "Cache-Control": self.cache_control}
+        conditions = [
+            ["content-length-range", 1, max_size],
+            {"Content-Type": content_type},
+            {"Cache-Control": self.cache_control},
+        ]
+        post = await asyncio.to_thread(
+            self.client.generate_presigned_post,
+            self.bucket, self._object_key(key),
+            Fields=fields, Conditions=conditions, ExpiresIn=expires_in
+        )
+        return {"method": "POST", "url": post["url"], "fields": post["fields"], "headers": {}}
+
+    async def presign_download(self, key: str, expires_in: int, filename: Optional[str] = None) -> Optional[str]:
+        params = {"Bucket": self.bucket, "Key": self._object_key(key)}
+        if filename:
+            params["ResponseContentDisposition"] = f'attachment; filename="{filename}"'
+        return await asyncio.to_thread(
+            self.client.generate_presigned_url, "get_object", Params=params, ExpiresIn=expires_in
+        )
+
+    def url_for(self, key: str) -> str:
+        return f"{self.public_url}/{self._object_key(key)}"
+
+    def key_for(self, url: str) -> Optional[str]:
+        base = f"{self.public_url}/{self.prefix}"
+        return url[len(base):] if url.startswith(base) else None
+
+_storage: Optional[StorageBackend] = None
+
+def get_storage() -> StorageBackend:
+    """The configured backend (STORAGE_BACKEND=local|s3), created on first use"""
+    global _storage
+    if _storage is None:
+        if STORAGE_BACKEND == "s3":
+            _storage = S3Storage()
+        elif STORAGE_BACKEND == "local":
+            _storage = LocalStorage()
+        else:
+            raise ValueError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
+    return _storage
+
+_export_storage: Optional[StorageBackend] = None
+
+def get_export_storage() -> StorageBackend:
+    """Private storage for admin exports, on the configured backend, created on first use"""
+    global _export_storage
+    if _export_storage is None:
+        if STORAGE_BACKEND == "s3":
+            if S3_EXPORT_BUCKET == S3_BUCKET and S3_EXPORT_PREFIX.startswith(S3_PREFIX):
+                raise ValueError("S3_EXPORT_PREFIX must be outside the public S3_PREFIX (or set S3_EXPORT_BUCKET)")
+            _export_storage = S3Storage(
+                bucket=S3_EXPORT_BUCKET, prefix=S3_EXPORT_PREFIX, cache_control=PRIVATE_CACHE_CONTROL
+            )
+        elif STORAGE_BACKEND == "local":
+            _export_storage = LocalStorage(root=EXPORT_DIR)
+        else:
+            raise ValueError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
+    return _export_storage
@@ -0,0 +1,125 @@
+from typing import List, Optional, Tuple
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from models.collection import Collection
+from models.product import Product, StatusEnum
+from models.sync import SyncChanges, SyncEntityEnum, Tombstone
+from services.resilience import READ_MAX_TIME_MS
+from datetime import datetime, timedelta, timezone
+import asyncio
+import os
+
+# Tombstones expire after this long (TTL index); older watermarks need a full resync
+TOMBSTONE_TTL_SECONDS = int(os.getenv("SYNC_TOMBSTONE_TTL_DAYS", "30")) * 86400
+# Changes newer than this are held back, so a write that commits slightly
+# after a later timestamp was handed out is never skipped
+SETTLE_SECONDS = float(os.getenv("SYNC_SETTLE_SECONDS", "5"))
+
+SyncKey = Tuple[datetime, str]
+
+def _parse_timestamp(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def encode_watermark(key: SyncKey, issued_at: datetime) -> str:
+    return f"{key[0].isoformat()},{key[1]},{issued_at.isoformat()}"
+
+def decode_watermark(value: str) -> Tuple[SyncKey, datetime]:
+    """Parse "<timestamp>,<id>,<issued at>" (or a bare ISO timestamp).
+
+    The issue time, not the change timestamp, decides whether tombstones the
+    client still needs may have expired. Raises ValueError on malformed input.
+    """
+    parts = value.split(",")
+    if len(parts) not in (1, 3):
+        raise ValueError("Malformed watermark")
+    timestamp = _parse_timestamp(parts[0])
+    if len(parts) == 1:
+        return (timestamp, ""), timestamp
+    return (timestamp, parts[1]), _parse_timestamp(parts[2])
+
+async def write_tombstone(db: AsyncIOMotorDatabase, entity: str, entity_id: str) -> None:
+    await db.tombstones.insert_one({"entity": entity, "id": entity_id, "deleted_at": datetime.utcnow()})
+
+class SyncService:
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+
+    async def _changed_after(self, collection, field: str, since: Optional[SyncKey],
+                             until: datetime, limit: int) -> List[dict]:
+        query = {field: {"$lte": until}}
+        if since is not None:
+            query["$or"] = [
+                {field: {"$gt": since[0]}},
+                {field: since[0], "id": {"$gt": since[1]}}
+            ]
+        cursor = collection.find(query, {"_id": 0}).sort([(field, 1), ("id", 1)]).limit(limit + 1)
+        return await cursor.max_time_ms(READ_MAX_TIME_MS).to_list(length=limit + 1)
+
+    async def get_changes(self, since: Optional[str] = None, limit: int = 500) -> SyncChanges:
+        """Products, collections and tombstones changed after the `since` watermark.
+
+        Each source is read in (timestamp, id) order. When any source has more
+        than `limit` changes, every source is cut at the smallest of their
+        last keys, so `next_since` never skips a change.
+        """
+        since_key, issued_at = decode_watermark(since) if since else (None, None)
+        now = datetime.utcnow()
+        if issued_at is not None and issued_at < now - timedelta(seconds=TOMBSTONE_TTL_SECONDS):
+            return SyncChanges(since=since, next_since=None, full_resync_required=True)
+
+        until = now - timedelta(seconds=SETTLE_SECONDS)
+        sources = (
+            (self.db.products, "updated_at"),
+            (self.db.collections, "updated_at"),
+            (self.db.tombstones, "deleted_at"),
+        )
+        results = await asyncio.gather(*[
+            self._changed_after(collection, field, since_key, until, limit) for collection, field in sources
+        ])
+
+        keyed = [[((doc[field], doc["id"]), doc) for doc in docs] for (_, field), docs in zip(sources, results)]
+        cutoff: Optional[SyncKey] = None
+        for docs in keyed:
+            if len(docs) > limit:
+                last = docs[limit - 1][0]
+                cutoff = last if cutoff is None else min(cutoff, last)
+        if cutoff is not None:
+            keyed = [[(key, doc) for key, doc in docs if key <= cutoff] for docs in keyed]
+
+        # A caught-up client has seen every tombstone up to `until`, so its
+        # watermark is re-issued (idle clients never age into a full resync);
+        # mid-pagination the original issue time is kept
+        returned_keys = [key for docs in keyed for key, _ in docs]
+        next_key = max(returned_keys) if returned_keys else since_key
+        next_issued_at = until if cutoff is None or issued_at is None else issued_at
+        products, collections, tombstones = ([doc for _, doc in docs] for docs in keyed)
+        return SyncChanges(
+            products=[Product(**doc) for doc in products],
+            collections=[Collection(**doc) for doc in collections],
+            deleted=[Tombstone(**doc) for doc in tombstones],
+            since=since,
+            next_since=encode_watermark(next_key, next_issued_at) if next_key else None,
+            has_more=cutoff is not None
+        )
+
+    async def get_public_changes(self, since: Optional[str] = None, limit: int = 500) -> SyncChanges:
+        """get_changes as anonymous clients may see it.
+
+        Products that are not active and inactive collections are sent as
+        tombstones: the client drops them as if deleted, and the fields of
+        embargoed (scheduled) products stay private. Watermarks are the same.
+        """
+        changes = await self.get_changes(since=since, limit=limit)
+        hidden = [
+            Tombstone(entity=SyncEntityEnum.PRODUCT, id=product.id, deleted_at=product.updated_at)
+            for product in changes.products if product.status != StatusEnum.ACTIVE
+        ] + [
+            Tombstone(entity=SyncEntityEnum.COLLECTION, id=collection.id, deleted_at=collection.updated_at)
+            for collection in changes.collections if not collection.is_active
+        ]
+        changes.products = [product for product in changes.products if product.status == StatusEnum.ACTIVE]
+        changes.collections = [collection for collection in changes.collections if collection.is_active]
+        changes.deleted = sorted(changes.deleted + hidden, key=lambda tombstone: (tombstone.deleted_at, tombstone.id))
+        return changes
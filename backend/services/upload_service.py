@@ -1,18 +1,33 @@
-import os
 import uuid
-import shutil
 from fastapi import UploadFile, HTTPException
-from typing import List
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import AsyncIterator, List, Optional
 from pathlib import Path
+from datetime import datetime, timedelta
+from tempfile import SpooledTemporaryFile
+from models.admin import Admin
+from models.upload import UploadRequest, UploadSession, UploadSessionStatusEnum, PresignedUpload, ImageAsset
+from services.storage import StorageBackend, get_storage
+from services.image_probe import PROBE_BYTES, EXTENSION_FORMATS, FORMAT_CONTENT_TYPES, probe_image
+from services.jobs import job_queue, IMAGE_PLACEHOLDER_JOB
+from services.image_service import image_service
+import os
+
+# How long a presigned upload target stays valid
+PRESIGNED_UPLOAD_EXPIRES_SECONDS = int(os.getenv("PRESIGNED_UPLOAD_EXPIRES_SECONDS", "900"))
+# Sessions (and so completion of abandoned uploads) are forgotten after this
+UPLOAD_SESSION_TTL_SECONDS = int(os.getenv("UPLOAD_SESSION_TTL_SECONDS", str(24 * 3600)))
+MAX_IMAGE_DIMENSION = int(os.getenv("MAX_IMAGE_DIMENSION", "10000"))
+# Where the API accepts bytes itself when the backend cannot presign (local disk)
+DIRECT_UPLOAD_PATH = "/api/admin/upload/direct/{upload_id}"
 
 class UploadService:
-    def __init__(self):
-        self.upload_dir = Path("/app/backend/uploads")
-        self.upload_dir.mkdir(exist_ok=True)
+    def __init__(self, db: Optional[AsyncIOMotorDatabase] = None, storage: Optional[StorageBackend] = None):
+        self.db = db
+        self.storage = storage or get_storage()
         
-        # Create subdirectories
-        (self.upload_dir / "products").mkdir(exist_ok=True)
-        (self.upload_dir / "collections").mkdir(exist_ok=True)
+        # Allowed upload categories (also the first segment of the storage key)
+        self.categories = {"products", "collections"}
         
         # Allowed file types
         self.allowed_extensions = {".jpg", ".jpeg", ".png", ".webp"}
@@ -28,7 +43,7 @@ class UploadService:
             )
         
         # Check file size (this is approximate, actual size checked during upload)
-        if hasattr(file, 'size') and file.size > self.max_file_size:
+        if hasattr(file, 'size') and file.size is not None and file.size > self.max_file_size:
             raise HTTPException(
                 status_code=400,
                 detail=f"File too large. Maximum size: {self.max_file_size / 1024 / 1024}MB"
@@ -36,36 +51,55 @@ class UploadService:
         
         return True
 
-    async def upload_image(self, file: UploadFile, category: str = "products") -> str:
+    async def upload_image(self, file: UploadFile, category: str = "products", created_by: Optional[str] = None) -> str:
         self.validate_image(file)
+        if category not in self.categories:
+            raise HTTPException(status_code=400, detail=f"Unknown category: {category}")
         
         # Generate unique filename
         file_extension = Path(file.filename).suffix.lower()
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
+        key = f"{category}/{uuid.uuid4()}{file_extension}"
         
-        # Full file path
-        file_path = self.upload_dir / category / unique_filename
+        head = await file.read(PROBE_BYTES)
+        await file.seek(0)
+        probed = probe_image(head)
+        if probed is None or probed[0] != EXTENSION_FORMATS[file_extension]:
+            raise HTTPException(status_code=400, detail="File is not a valid image of the declared type")
         
         try:
-            # Save file
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-            
-            # Return relative URL
-            return f"/uploads/{category}/{unique_filename}"
+            # The backend cleans up partial writes itself
+            url = await self.storage.save(key, file.file, file.content_type)
         
         except Exception as e:
-            # Clean up if upload failed
-            if file_path.exists():
-                file_path.unlink()
             raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+        
+        _, width, height = probed
+        await self._register_asset(ImageAsset(
+            url=url,
+            key=key,
+            category=category,
+            content_type=FORMAT_CONTENT_TYPES[probed[0]],
+            size=(await self.storage.info(key))["size"],
+            width=width,
+            height=height,
+            created_by=created_by
+        ))
+        return url
+
+    async def _register_asset(self, asset: ImageAsset) -> ImageAsset:
+        """Record an uploaded image and queue its placeholder"""
+        result = await self.db.image_assets.update_one({"key": asset.key}, {"$setOnInsert": asset.dict()}, upsert=True)
+        if result.upserted_id is not None:
+            await job_queue.enqueue(self.db, IMAGE_PLACEHOLDER_JOB, {"key": asset.key}, asset.created_by)
+        return ImageAsset(**await self.db.image_assets.find_one({"key": asset.key}))
 
-    async def upload_multiple_images(self, files: List[UploadFile], category: str = "products") -> List[str]:
+    async def upload_multiple_images(self, files: List[UploadFile], category: str = "products",
+                                     created_by: Optional[str] = None) -> List[str]:
         uploaded_urls = []
         
         try:
             for file in files:
-                url = await self.upload_image(file, category)
+                url = await self.upload_image(file, category, created_by)
                 uploaded_urls.append(url)
             
             return uploaded_urls
@@ -73,41 +107,162 @@ class UploadService:
         except Exception as e:
             # Clean up any uploaded files if batch upload fails
             for url in uploaded_urls:
-                self.delete_image(url)
+                await self.delete_image(url)
             raise e
 
-    def delete_image(self, image_url: str) -> bool:
+    async def delete_image(self, image_url: str) -> bool:
         try:
-            # Extract filename from URL
-            if image_url.startswith("/uploads/"):
-                relative_path = image_url[1:]  # Remove leading slash
-                file_path = Path("/app/backend") / relative_path
-                
-                if file_path.exists():
-                    file_path.unlink()
-                    return True
+            key = self.storage.key_for(image_url)
+            if key is None:
+                return False
             
-            return False
+            await self.db.image_assets.delete_one({"key": key})
+            deleted = await self.storage.delete(key)
+            # Resized variants would otherwise keep being served from the cache
+            await image_service.purge(key)
+            return deleted
         
         except Exception:
             return False
 
-    def get_image_info(self, image_url: str) -> dict:
+    async def get_image_info(self, image_url: str) -> Optional[dict]:
         try:
-            if image_url.startswith("/uploads/"):
-                relative_path = image_url[1:]
-                file_path = Path("/app/backend") / relative_path
-                
-                if file_path.exists():
-                    stat = file_path.stat()
-                    return {
-                        "url": image_url,
-                        "filename": file_path.name,
-                        "size": stat.st_size,
-                        "created_at": stat.st_ctime
-                    }
+            key = self.storage.key_for(image_url)
+            if key is None:
+                return None
             
-            return None
+            info = await self.storage.info(key)
+            if info is None:
+                return None
+            
+            return {
+                "url": image_url,
+                "filename": Path(key).name,
+                "size": info["size"],
+                "created_at": info["created_at"]
+            }
         
         except Exception:
-            return None
\ No newline at end of file
+            return None
+
+    async def create_upload(self, request: UploadRequest, admin: Admin) -> PresignedUpload:
+        """Register an upload and hand out a target the client sends the file to directly"""
+        extension = Path(request.filename).suffix.lower()
+        if extension not in self.allowed_extensions:
+            raise HTTPException(
+                status_code=400,
+                detail=f"File type not allowed. Allowed types: {', '.join(self.allowed_extensions)}"
+            )
+        if request.content_type != FORMAT_CONTENT_TYPES[EXTENSION_FORMATS[extension]]:
+            raise HTTPException(status_code=400, detail="Content type does not match file extension")
+        if request.size is not None and request.size > self.max_file_size:
+            raise HTTPException(
+                status_code=400,
+                detail=f"File too large. Maximum size: {self.max_file_size / 1024 / 1024}MB"
+            )
+        if request.category not in self.categories:
+            raise HTTPException(status_code=400, detail=f"Unknown category: {request.category}")
+        
+        session = UploadSession(
+            key=f"{request.category}/{uuid.uuid4()}{extension}",
+            content_type=request.content_type,
+            category=request.category,
+            max_size=self.max_file_size,
+            created_by=admin.id,
+            expires_at=datetime.utcnow() + timedelta(seconds=PRESIGNED_UPLOAD_EXPIRES_SECONDS)
+        )
+        target = await self.storage.presign_upload(
+            session.key, session.content_type, session.max_size, PRESIGNED_UPLOAD_EXPIRES_SECONDS
+        )
+        if target is None:
+            target = {
+                "method": "PUT",
+                "url": DIRECT_UPLOAD_PATH.format(upload_id=session.id),
+                "fields": {},
+                "headers": {"Content-Type": session.content_type}
+            }
+        await self.db.upload_sessions.insert_one(session.dict())
+        
+        return PresignedUpload(
+            upload_id=session.id,
+            max_size=session.max_size,
+            expires_at=session.expires_at,
+            **target
+        )
+
+    async def _get_session(self, upload_id: str) -> UploadSession:
+        session = await self.db.upload_sessions.find_one({"id": upload_id})
+        if not session:
+            raise HTTPException(status_code=404, detail="Upload not found")
+        return UploadSession(**session)
+
+    async def receive_direct_upload(self, upload_id: str, content_type: Optional[str], body: AsyncIterator[bytes]) -> None:
+        """Accept the bytes of a presigned upload for backends without presigning"""
+        session = await self._get_session(upload_id)
+        if session.status != UploadSessionStatusEnum.PENDING or session.expires_at < datetime.utcnow():
+            raise HTTPException(status_code=403, detail="Upload target expired")
+        if content_type != session.content_type:
+            raise HTTPException(status_code=400, detail="Content type does not match upload")
+        
+        with SpooledTemporaryFile(max_size=1024 * 1024) as buffer:
+            size = 0
+            async for chunk in body:
+                size += len(chunk)
+                if size > session.max_size:
+                    raise HTTPException(status_code=413, detail="File too large")
+                buffer.write(chunk)
+            if size == 0:
+                raise HTTPException(status_code=400, detail="Empty upload")
+            buffer.seek(0)
+            await self.storage.save(session.key, buffer, session.content_type)
+
+    async def _reject_upload(self, session: UploadSession, detail: str) -> HTTPException:
+        await self.storage.delete(session.key)
+        await self.db.upload_sessions.delete_one({"id": session.id})
+        return HTTPException(status_code=400, detail=detail)
+
+    async def complete_upload(self, upload_id: str) -> ImageAsset:
+        """Validate an uploaded object (size, type, dimensions) and register it.
+
+        Invalid objects are deleted from storage. Completing twice returns
+        the same asset.
+        """
+        session = await self._get_session(upload_id)
+        if session.status == UploadSessionStatusEnum.COMPLETED:
+            asset = await self.db.image_assets.find_one({"key": session.key})
+            if asset:
+                return ImageAsset(**asset)
+        
+        info = await self.storage.info(session.key)
+        if info is None:
+            raise HTTPException(status_code=400, detail="File has not been uploaded yet")
+        if info["size"] > session.max_size:
+            raise await self._reject_upload(session, "File too large")
+        
+        # Only the headers are read; the image itself never passes through the API
+        head = await self.storage.read_head(session.key, PROBE_BYTES)
+        probed = probe_image(head or b"")
+        expected_format = EXTENSION_FORMATS[Path(session.key).suffix]
+        if probed is None or probed[0] != expected_format:
+            raise await self._reject_upload(session, "File is not a valid image of the declared type")
+        _, width, height = probed
+        if width > MAX_IMAGE_DIMENSION or height > MAX_IMAGE_DIMENSION:
+            raise await self._reject_upload(
+                session, f"Image too large. Maximum dimensions: {MAX_IMAGE_DIMENSION}x{MAX_IMAGE_DIMENSION}"
+            )
+        
+        asset = ImageAsset(
+            url=self.storage.url_for(session.key),
+            key=session.key,
+            category=session.category,
+            content_type=session.content_type,
+            size=info["size"],
+            width=width,
+            height=height,
+            created_by=session.created_by
+        )
+        asset = await self._register_asset(asset)
+        await self.db.upload_sessions.update_one(
+            {"id": session.id}, {"$set": {"status": UploadSessionStatusEnum.COMPLETED}}
+        )
+        return asset
@@ -0,0 +1,11 @@
+import os
+import sys
+from pathlib import Path
+
+# The backend is not a package; its modules import each other as top-level
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+# Importing the backend creates a Motor client; it connects lazily, so unit
+# tests never need a server
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
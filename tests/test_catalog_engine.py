@@ -0,0 +1,122 @@
+import asyncio
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from models.product import GenderEnum, ProductFilter, ProductTypeEnum, StatusEnum
+from services.catalog_engine import ENGINE_PROJECTION, SORT_FIELDS, Bitset, CatalogIndex, _words_for
+from services.product_service import ProductService
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+BASE = datetime(2026, 1, 1)
+
+def test_bitset_set_clear_and_grow():
+    bitset = Bitset.from_rows(np.array([0, 63, 64, 129]), _words_for(130))
+    assert np.flatnonzero(bitset.to_bools(130)).tolist() == [0, 63, 64, 129]
+
+    bitset.clear(63)
+    bitset.set(5)
+    bitset.grow(_words_for(300))
+    bitset.set(299)
+    assert np.flatnonzero(bitset.to_bools(300)).tolist() == [0, 5, 64, 129, 299]
+    # Clearing an unset bit leaves the others alone
+    bitset.clear(6)
+    assert int(bitset.to_bools(300).sum()) == 5
+
+class Catalog:
+    """The same products in Mongo (mongomock) and in a CatalogIndex"""
+
+    def __init__(self, seed: int):
+        self.random = random.Random(seed)
+        self.db = mongomock_motor.AsyncMongoMockClient()["catalog_engine_tests"]
+        self.index = CatalogIndex()
+        self.serial = 0
+
+    def product(self, product_id: str) -> dict:
+        # Sort keys are unique, so Mongo's order is fully determined
+        self.serial += 1
+        pick = self.random.choice
+        return {
+            "id": product_id,
+            "name": f"{pick(['Aviator', 'Round', 'Wayfarer'])} {self.serial:05d}",
+            "collection": pick(["Classics", "Sport", "Heritage"]),
+            "gender": pick(list(GenderEnum)).value,
+            "type": pick(list(ProductTypeEnum)).value,
+            "status": pick(list(StatusEnum)).value,
+            "is_featured": self.random.random() < 0.3,
+            "is_on_sale": self.random.random() < 0.5,
+            "price": float(self.random.randint(50, 500)) + self.serial / 100000,
+            "created_at": BASE + timedelta(minutes=self.serial),
+            "updated_at": BASE + timedelta(minutes=self.serial),
+        }
+
+    async def load(self, count: int) -> None:
+        products = [self.product(f"p{i}") for i in range(count)]
+        await self.db.products.insert_many([dict(product) for product in products])
+        self.index.build(await self.db.products.find({}, ENGINE_PROJECTION).to_list(length=None))
+
+    async def write(self) -> None:
+        """Create, update or delete a random product in both"""
+        product_id = f"p{self.random.randint(0, self.serial + 5)}"
+        if self.random.random() < 0.2:
+            await self.db.products.delete_one({"id": product_id})
+            self.index.remove(product_id)
+            return
+        product = self.product(product_id)
+        await self.db.products.replace_one({"id": product_id}, dict(product), upsert=True)
+        self.index.upsert(product)
+
+    async def mongo(self, filters, skip, limit, sort_by, sort_order):
+        query = ProductService(self.db).build_query(filters)
+        cursor = self.db.products.find(query, {"id": 1}).sort(sort_by, sort_order).skip(skip).limit(limit)
+        page = [product["id"] for product in await cursor.to_list(length=None)]
+        return page, await self.db.products.count_documents(query)
+
+FILTERS = [
+    None,
+    ProductFilter(),
+    ProductFilter(status=StatusEnum.ACTIVE),
+    ProductFilter(collection="Sport", gender=GenderEnum.WOMEN),
+    ProductFilter(type=ProductTypeEnum.SUNGLASSES, is_on_sale=True),
+    ProductFilter(is_featured=False, status=StatusEnum.ACTIVE),
+    ProductFilter(price_min=100, price_max=250.5),
+    ProductFilter(price_min=400, collection="Classics"),
+    ProductFilter(price_max=60),
+    ProductFilter(collection="No such collection"),
+]
+
+def assert_matches_mongo(catalog: Catalog) -> None:
+    async def scenario():
+        for filters in FILTERS:
+            for sort_by in SORT_FIELDS:
+                for sort_order in (1, -1):
+                    for skip, limit in ((0, 20), (35, 10)):
+                        expected = await catalog.mongo(filters, skip, limit, sort_by, sort_order)
+                        assert catalog.index.query(filters, skip, limit, sort_by, sort_order) == expected, \
+                            (filters, sort_by, sort_order, skip)
+            assert catalog.index.count(filters) == (await catalog.mongo(filters, 0, 1, "id", 1))[1]
+
+    asyncio.run(scenario())
+
+def test_filters_and_sorts_match_mongo():
+    catalog = Catalog(seed=7)
+    asyncio.run(catalog.load(400))
+    assert_matches_mongo(catalog)
+
+def test_results_still_match_mongo_after_writes():
+    catalog = Catalog(seed=11)
+
+    async def writes(count: int):
+        for _ in range(count):
+            await catalog.write()
+
+    asyncio.run(catalog.load(300))
+    # Warm the sort orders, then write so they are repaired rather than rebuilt
+    assert_matches_mongo(catalog)
+    asyncio.run(writes(150))
+    assert_matches_mongo(catalog)
+    asyncio.run(writes(5))
+    assert_matches_mongo(catalog)
@@ -0,0 +1,58 @@
+import asyncio
+from types import SimpleNamespace
+
+from services import health_service
+from services.health_service import PoolMonitor, _check_readiness
+
+PRIMARY = ("db-0", 27017)
+SECONDARY = ("db-1", 27017)
+
+def event(address):
+    return SimpleNamespace(address=address)
+
+def check_out(monitor: PoolMonitor, address, count: int) -> None:
+    for _ in range(count):
+        monitor.connection_check_out_started(event(address))
+        monitor.connection_checked_out(event(address))
+
+class FakeDatabase:
+    async def command(self, name):
+        return {"ok": 1}
+
+def readiness(monkeypatch, monitor: PoolMonitor, max_pool_size: int = 10) -> dict:
+    client = SimpleNamespace(options=SimpleNamespace(pool_options=SimpleNamespace(max_pool_size=max_pool_size)))
+    monkeypatch.setattr(health_service, "pool_monitor", monitor)
+    return asyncio.run(_check_readiness(client, FakeDatabase()))
+
+def test_counts_are_kept_per_server():
+    monitor = PoolMonitor()
+    check_out(monitor, PRIMARY, 3)
+    check_out(monitor, SECONDARY, 2)
+    monitor.connection_checked_in(event(PRIMARY))
+    monitor.connection_check_out_started(event(SECONDARY))
+    assert monitor.snapshot() == {PRIMARY: (2, 0), SECONDARY: (2, 1)}
+
+def test_saturation_is_judged_per_server(monkeypatch):
+    # 12 connections in use in total, but no single pool of 10 is saturated
+    monitor = PoolMonitor()
+    check_out(monitor, PRIMARY, 6)
+    check_out(monitor, SECONDARY, 6)
+    pool = readiness(monkeypatch, monitor)["checks"]["connection_pool"]
+    assert pool["ok"] is True
+    assert pool["checked_out"] == 6
+    assert pool["saturation"] == 0.6
+
+def test_the_worst_pool_is_reported(monkeypatch):
+    monitor = PoolMonitor()
+    check_out(monitor, PRIMARY, 2)
+    check_out(monitor, SECONDARY, 9)
+    result = readiness(monkeypatch, monitor)
+    pool = result["checks"]["connection_pool"]
+    assert result["status"] == "not_ready"
+    assert pool["ok"] is False
+    assert pool["server"] == "db-1:27017"
+    assert pool["saturation"] == 0.9
+
+def test_no_pools_yet_is_ready(monkeypatch):
+    pool = readiness(monkeypatch, PoolMonitor())["checks"]["connection_pool"]
+    assert pool["ok"] is True and pool["server"] is None
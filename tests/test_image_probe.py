@@ -0,0 +1,36 @@
+import io
+
+import pytest
+
+from services.image_probe import PROBE_BYTES, probe_image
+
+Image = pytest.importorskip("PIL.Image")
+
+def encode(image_format: str, size=(400, 300), orientation=None) -> bytes:
+    buffer = io.BytesIO()
+    options = {}
+    if orientation is not None:
+        exif = Image.Exif()
+        exif[0x0112] = orientation
+        options["exif"] = exif.tobytes()
+    Image.new("RGB", size).save(buffer, image_format, **options)
+    return buffer.getvalue()[:PROBE_BYTES]
+
+@pytest.mark.parametrize("image_format, expected", [("JPEG", "jpeg"), ("PNG", "png"), ("WEBP", "webp")])
+def test_probe_reads_format_and_size(image_format, expected):
+    assert probe_image(encode(image_format)) == (expected, 400, 300)
+
+@pytest.mark.parametrize("orientation, size", [
+    (1, (400, 300)), (3, (400, 300)), (5, (300, 400)), (6, (300, 400)), (8, (300, 400)),
+])
+def test_probe_reports_jpeg_size_as_displayed(orientation, size):
+    assert probe_image(encode("JPEG", orientation=orientation)) == ("jpeg", *size)
+
+def test_probe_ignores_malformed_exif():
+    buffer = io.BytesIO()
+    Image.new("RGB", (400, 300)).save(buffer, "JPEG", exif=b"Exif\x00\x00II*\x00\xff\xff\x00\x00")
+    assert probe_image(buffer.getvalue()) == ("jpeg", 400, 300)
+
+def test_probe_rejects_non_images():
+    assert probe_image(b"GIF89a" + b"\x00" * 64) is None
+    assert probe_image(b"\xff\xd8\xff\xda") is None
@@ -0,0 +1,51 @@
+import io
+
+import pytest
+
+from services.image_service import VariantCache, resize_image
+
+def test_purge_removes_every_variant_of_one_image(tmp_path):
+    cache = VariantCache(root=tmp_path, max_bytes=1024 * 1024)
+    for width in (160, 800, None):
+        for image_format in ("jpeg", "webp"):
+            cache.put(cache.name_for("products/a.jpg", width, image_format), b"a" * 100)
+    kept = cache.put(cache.name_for("products/b.jpg", 160, "jpeg"), b"b" * 100)
+
+    assert cache.purge("products/a.jpg") == 6
+    assert cache.total_bytes == 100
+    assert cache.get(cache.name_for("products/a.jpg", 160, "jpeg")) is None
+    assert cache.get(cache.name_for("products/b.jpg", 160, "jpeg")) == kept
+    assert not (tmp_path / cache.directory_for("products/a.jpg")).exists()
+
+def test_purged_variants_are_missed_by_other_workers(tmp_path):
+    name = VariantCache.name_for("products/a.jpg", 320, "jpeg")
+    this_worker = VariantCache(root=tmp_path, max_bytes=1024 * 1024)
+    other_worker = VariantCache(root=tmp_path, max_bytes=1024 * 1024)
+    this_worker.put(name, b"a" * 100)
+    assert other_worker.get(name) is not None
+
+    this_worker.purge("products/a.jpg")
+    assert other_worker.get(name) is None
+    assert other_worker.total_bytes == 0
+
+def jpeg(size, orientation: int) -> bytes:
+    Image = pytest.importorskip("PIL.Image")
+    exif = Image.Exif()
+    exif[0x0112] = orientation
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "red").save(buffer, "JPEG", exif=exif.tobytes())
+    return buffer.getvalue()
+
+@pytest.mark.parametrize("size, orientation, width, expected", [
+    ((4000, 3000), 1, 800, (800, 600)),
+    ((4000, 3000), 6, 800, (800, 1067)),
+    ((4000, 3000), 6, 1600, (1600, 2133)),
+    ((800, 300), 8, 160, (160, 427)),
+    # Never upscaled
+    ((800, 300), 6, 480, (300, 800)),
+])
+def test_resize_honours_exif_orientation(size, orientation, width, expected):
+    from PIL import Image
+
+    variant = resize_image(jpeg(size, orientation), width, "jpeg")
+    assert Image.open(io.BytesIO(variant)).size == expected
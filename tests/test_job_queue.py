@@ -0,0 +1,212 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from models.job import JobStatusEnum
+from services import job_queue as job_queue_module
+from services.job_queue import JobQueue
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+@pytest.fixture
+def db():
+    return mongomock_motor.AsyncMongoMockClient()["job_queue_tests"]
+
+def make_queue(db, handler, max_attempts: int = 3) -> JobQueue:
+    queue = JobQueue()
+    queue.job("tests.job", max_attempts=max_attempts)(handler)
+    queue.db = db
+    return queue
+
+async def succeed(ctx):
+    return {"echo": ctx.params.get("value")}
+
+async def fail(ctx):
+    raise RuntimeError("boom")
+
+async def block(ctx):
+    await asyncio.Event().wait()
+
+async def expire_lease(db, job_id: str) -> None:
+    await db.jobs.update_one({"id": job_id}, {"$set": {"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)}})
+
+def test_claim_and_finish(db):
+    async def scenario():
+        queue = make_queue(db, succeed)
+        job = await queue.enqueue(db, "tests.job", {"value": 7}, created_by="admin")
+
+        claimed = await queue._claim()
+        assert claimed.id == job.id
+        assert claimed.status == JobStatusEnum.RUNNING
+        assert claimed.attempts == 1
+        assert claimed.worker_id == queue.worker_id
+        assert claimed.lease_expires_at > datetime.utcnow()
+        # A running job under a live lease is not claimed again
+        assert await queue._claim() is None
+
+        await queue._execute(claimed)
+        finished = await queue.get(db, job.id)
+        assert finished.status == JobStatusEnum.SUCCEEDED
+        assert finished.result == {"echo": 7}
+        assert finished.progress == 1.0
+        assert finished.worker_id is None and finished.lease_expires_at is None
+        assert finished.finished_at is not None
+
+    asyncio.run(scenario())
+
+def test_unknown_job_types_are_rejected(db):
+    queue = make_queue(db, succeed)
+    with pytest.raises(ValueError):
+        asyncio.run(queue.enqueue(db, "tests.unknown"))
+
+def test_expired_lease_is_taken_over_by_another_worker(db):
+    async def scenario():
+        crashed = make_queue(db, succeed)
+        survivor = make_queue(db, succeed)
+        job = await crashed.enqueue(db, "tests.job")
+        stale = await crashed._claim()
+
+        await expire_lease(db, job.id)
+        taken = await survivor._claim()
+        assert taken.id == job.id
+        assert taken.worker_id == survivor.worker_id
+        assert taken.attempts == 2
+
+        # The first worker no longer owns the job, so its outcome is dropped
+        await crashed._finish(stale, {"status": JobStatusEnum.FAILED})
+        assert (await survivor.get(db, job.id)).status == JobStatusEnum.RUNNING
+
+    asyncio.run(scenario())
+
+def test_lease_expiring_on_every_attempt_fails_the_job(db):
+    async def scenario():
+        queue = make_queue(db, succeed, max_attempts=1)
+        job = await queue.enqueue(db, "tests.job")
+        await queue._claim()
+        await expire_lease(db, job.id)
+
+        retaken = await queue._claim()
+        assert retaken.attempts == 2
+        await queue._execute(retaken)
+        failed = await queue.get(db, job.id)
+        assert failed.status == JobStatusEnum.FAILED
+        assert failed.error == "Lease expired"
+
+    asyncio.run(scenario())
+
+def test_failed_attempts_are_retried_with_exponential_backoff(db):
+    async def scenario():
+        queue = make_queue(db, fail, max_attempts=3)
+        job = await queue.enqueue(db, "tests.job")
+
+        for attempt in (1, 2):
+            claimed = await queue._claim()
+            assert claimed.attempts == attempt
+            before = datetime.utcnow()
+            await queue._execute(claimed)
+
+            retry = await queue.get(db, job.id)
+            assert retry.status == JobStatusEnum.QUEUED
+            assert retry.error == "boom"
+            backoff = timedelta(seconds=job_queue_module.RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+            assert before + backoff - timedelta(seconds=1) <= retry.run_after <= datetime.utcnow() + backoff
+            # Not due yet
+            assert await queue._claim() is None
+            await db.jobs.update_one({"id": job.id}, {"$set": {"run_after": datetime.utcnow()}})
+
+        await queue._execute(await queue._claim())
+        failed = await queue.get(db, job.id)
+        assert failed.status == JobStatusEnum.FAILED
+        assert failed.attempts == 3
+        assert failed.finished_at is not None
+
+    asyncio.run(scenario())
+
+def test_cancel_a_queued_job(db):
+    async def scenario():
+        queue = make_queue(db, succeed)
+        job = await queue.enqueue(db, "tests.job")
+
+        cancelled = await queue.cancel(db, job.id)
+        assert cancelled.status == JobStatusEnum.CANCELLED
+        assert cancelled.finished_at is not None
+        assert await queue._claim() is None
+        assert await queue.cancel(db, "missing") is None
+
+    asyncio.run(scenario())
+
+def test_cancel_a_running_job(db):
+    async def scenario():
+        queue = make_queue(db, block)
+        job = await queue.enqueue(db, "tests.job")
+        running = asyncio.ensure_future(queue._execute(await queue._claim()))
+        await asyncio.sleep(0)
+
+        requested = await queue.cancel(db, job.id)
+        assert requested.status == JobStatusEnum.RUNNING
+        assert requested.cancel_requested is True
+        await asyncio.wait_for(running, 1)
+        assert (await queue.get(db, job.id)).status == JobStatusEnum.CANCELLED
+
+    asyncio.run(scenario())
+
+def test_cancel_requested_before_a_takeover_is_honoured(db):
+    async def scenario():
+        queue = make_queue(db, succeed)
+        job = await queue.enqueue(db, "tests.job")
+        await queue._claim()
+        await db.jobs.update_one({"id": job.id}, {"$set": {"cancel_requested": True}})
+        await expire_lease(db, job.id)
+
+        await queue._execute(await queue._claim())
+        assert (await queue.get(db, job.id)).status == JobStatusEnum.CANCELLED
+
+    asyncio.run(scenario())
+
+def test_stop_hands_running_jobs_back_without_using_an_attempt(db):
+    async def scenario():
+        queue = make_queue(db, block)
+        job = await queue.enqueue(db, "tests.job")
+        queue.start(db)
+        for _ in range(100):
+            if job.id in queue._running:
+                break
+            await asyncio.sleep(0.01)
+        assert job.id in queue._running
+
+        await queue.stop()
+        handed_back = await queue.get(db, job.id)
+        assert handed_back.status == JobStatusEnum.QUEUED
+        assert handed_back.attempts == 0
+        assert handed_back.worker_id is None and handed_back.lease_expires_at is None
+        assert handed_back.finished_at is None
+
+    asyncio.run(scenario())
+
+def test_fixed_job_id_is_queued_at_most_once(db):
+    async def scenario():
+        await db.jobs.create_index("id", unique=True)
+        queue = make_queue(db, succeed)
+
+        first = await queue.enqueue(db, "tests.job", {"value": 1}, job_id="startup:tests.job")
+        again = await queue.enqueue(db, "tests.job", {"value": 2}, job_id="startup:tests.job")
+        assert again.id == first.id == "startup:tests.job"
+        assert again.params == {"value": 1}
+        assert await db.jobs.count_documents({}) == 1
+
+        # Still deduplicated while it runs
+        claimed = await queue._claim()
+        await queue.enqueue(db, "tests.job", {"value": 3}, job_id="startup:tests.job")
+        assert (await queue.get(db, first.id)).params == {"value": 1}
+
+        # A finished job is replaced by a fresh one
+        await queue._execute(claimed)
+        replaced = await queue.enqueue(db, "tests.job", {"value": 4}, job_id="startup:tests.job")
+        stored = await queue.get(db, first.id)
+        assert replaced.params == stored.params == {"value": 4}
+        assert stored.status == JobStatusEnum.QUEUED
+        assert stored.attempts == 0 and stored.result is None
+        assert await db.jobs.count_documents({}) == 1
+
+    asyncio.run(scenario())
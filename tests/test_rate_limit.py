@@ -0,0 +1,99 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from middleware import rate_limit
+from middleware.rate_limit import AdmissionControlMiddleware, TokenBucketLimiter
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit, "time", SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+def test_bucket_allows_a_burst_then_refills_at_the_rate(clock):
+    limiter = TokenBucketLimiter()
+    key = ("search", "203.0.113.7")
+    for _ in range(10):
+        assert limiter.acquire(key, rate=5, burst=10) == 0
+    assert limiter.acquire(key, rate=5, burst=10) == pytest.approx(0.2)
+
+    clock.now += 0.2
+    assert limiter.acquire(key, rate=5, burst=10) == 0
+    assert limiter.acquire(key, rate=5, burst=10) > 0
+
+    # Refill is capped at the burst size
+    clock.now += 3600
+    for _ in range(10):
+        assert limiter.acquire(key, rate=5, burst=10) == 0
+    assert limiter.acquire(key, rate=5, burst=10) > 0
+
+def test_buckets_are_per_client_and_bounded(clock):
+    limiter = TokenBucketLimiter(max_clients=2)
+    assert limiter.acquire(("search", "a"), rate=1, burst=1) == 0
+    assert limiter.acquire(("search", "a"), rate=1, burst=1) > 0
+    assert limiter.acquire(("search", "b"), rate=1, burst=1) == 0
+    # Tracking a third client evicts the least recently seen one
+    assert limiter.acquire(("search", "c"), rate=1, burst=1) == 0
+    assert limiter.acquire(("search", "a"), rate=1, burst=1) == 0
+
+def scope(forwarded=(), client="10.0.0.9") -> dict:
+    headers = [(b"x-forwarded-for", value.encode("latin-1")) for value in forwarded]
+    return {"type": "http", "headers": headers, "client": (client, 52100)}
+
+@pytest.mark.parametrize("hops, forwarded, expected", [
+    # Reached directly: the header is client supplied and ignored
+    (0, ["198.51.100.1"], "10.0.0.9"),
+    (1, [], "10.0.0.9"),
+    (1, ["198.51.100.1"], "198.51.100.1"),
+    # A spoofed entry to the left of the ingress's one is ignored
+    (1, ["6.6.6.6, 198.51.100.1"], "198.51.100.1"),
+    (2, ["6.6.6.6, 198.51.100.1, 10.1.0.4"], "198.51.100.1"),
+    # Repeated headers are read as one list, in order
+    (2, ["6.6.6.6, 198.51.100.1", "10.1.0.4"], "198.51.100.1"),
+    # Fewer entries than hops: the leftmost is the best there is
+    (3, ["198.51.100.1, 10.1.0.4"], "198.51.100.1"),
+    (1, [" , "], "10.0.0.9"),
+])
+def test_client_ip_is_taken_the_trusted_number_of_hops_from_the_right(monkeypatch, hops, forwarded, expected):
+    monkeypatch.setattr(rate_limit, "TRUSTED_PROXY_HOPS", hops)
+    assert AdmissionControlMiddleware._client_ip(scope(forwarded)) == expected
+
+def test_rate_limited_requests_get_429_with_retry_after(monkeypatch, clock):
+    monkeypatch.setenv("RATE_LIMIT_SEARCH", "1:2")
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append(scope["path"])
+
+    middleware = AdmissionControlMiddleware(app)
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def request(path: str):
+        sent.clear()
+        await middleware({**scope(), "method": "GET", "path": path}, None, send)
+        return sent[0] if sent else None
+
+    async def scenario():
+        assert await request("/api/products/search") is None
+        assert await request("/api/products/search") is None
+        rejected = await request("/api/products/search")
+        assert rejected["status"] == 429
+        assert (b"retry-after", b"1") in rejected["headers"]
+        # Other groups and exempt paths have their own budgets
+        assert await request("/api/products/") is None
+        assert await request("/api/health") is None
+
+    asyncio.run(scenario())
+    assert len(calls) == 4
@@ -0,0 +1,84 @@
+import asyncio
+import os
+import uuid
+
+import pytest
+from pymongo.read_preferences import Primary, SecondaryPreferred
+from starlette.requests import Request
+
+import dependencies
+from dependencies import get_admin_database, get_catalog_database
+from models.product import GenderEnum, ProductCreate, ProductTypeEnum
+from services.collection_service import CollectionService
+from services.product_service import ProductService
+
+def make_request(headers=None) -> Request:
+    raw = [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()]
+    return Request({"type": "http", "method": "GET", "path": "/api/products/", "headers": raw})
+
+def test_anonymous_catalog_reads_go_to_secondaries():
+    db = get_catalog_database(make_request(), dependencies.db)
+    assert isinstance(db.read_preference, SecondaryPreferred)
+    assert db.read_preference.max_staleness == 90
+
+def test_authenticated_and_admin_reads_go_to_the_primary():
+    storefront = get_catalog_database(make_request({"Authorization": "Bearer token"}), dependencies.db)
+    admin = get_admin_database(dependencies.db)
+    assert isinstance(storefront.read_preference, Primary)
+    assert isinstance(admin.read_preference, Primary)
+    # The routed handles are reused rather than rebuilt per request
+    assert storefront is admin
+
+def test_read_caches_are_keyed_by_read_preference():
+    catalog = get_catalog_database(make_request(), dependencies.db)
+    admin = get_admin_database(dependencies.db)
+    assert catalog.name == admin.name
+    assert ProductService(catalog).read_scope != ProductService(admin).read_scope
+    assert CollectionService(catalog).read_scope != CollectionService(admin).read_scope
+
+# Replica-set tests need a real deployment, e.g.
+# MONGO_REPLICA_SET_URL=mongodb://localhost:27017/?replicaSet=rs0
+REPLICA_SET_URL = os.environ.get("MONGO_REPLICA_SET_URL")
+
+@pytest.fixture
+def replica_set_url():
+    if not REPLICA_SET_URL:
+        pytest.skip("MONGO_REPLICA_SET_URL is not set")
+    from pymongo import MongoClient
+
+    client = MongoClient(REPLICA_SET_URL, serverSelectionTimeoutMS=2000)
+    try:
+        hello = client.admin.command("hello")
+    except Exception as e:
+        pytest.skip(f"no mongod reachable: {e}")
+    finally:
+        client.close()
+    if "setName" not in hello:
+        pytest.skip("mongod is not a replica set member")
+    return REPLICA_SET_URL
+
+def test_admin_reads_see_their_writes_after_a_catalog_read(replica_set_url):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    async def scenario():
+        client = AsyncIOMotorClient(replica_set_url)
+        db = client[f"read_routing_{uuid.uuid4().hex[:8]}"]
+        catalog = dependencies._with_read_preference(db, dependencies.CATALOG_READ_PREFERENCE)
+        admin = dependencies._with_read_preference(db, dependencies.ADMIN_READ_PREFERENCE)
+        try:
+            product = await ProductService(admin).create_product(ProductCreate(
+                name="Read routing", collection="Tests", price=100.0, sku=f"RR-{uuid.uuid4().hex[:8]}",
+                gender=GenderEnum.UNISEX, type=ProductTypeEnum.SUNGLASSES, frame_color="Black",
+                lens_color="Grey", materials="Acetate", main_image="/uploads/products/test.jpg",
+                short_description="Read routing test"
+            ))
+            # A secondary may not have the product yet; whatever it answers is cached
+            await ProductService(catalog).get_product(product.id)
+            # ...but only for catalog reads: the primary-routed read must find it
+            found = await ProductService(admin).get_product(product.id)
+            assert found is not None and found.id == product.id
+        finally:
+            await client.drop_database(db.name)
+            client.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,210 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from pymongo.errors import ConnectionFailure, OperationFailure
+
+from services import resilience
+from services.resilience import CatalogReadCache, CatalogUnavailableError, CircuitBreaker, CircuitOpenError
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(resilience, "time", SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+async def ok():
+    return "ok"
+
+async def down():
+    raise ConnectionFailure("no primary")
+
+async def call(breaker: CircuitBreaker, fn):
+    try:
+        return await breaker.call(fn)
+    except (ConnectionFailure, OperationFailure):
+        return None
+
+def trip(breaker: CircuitBreaker) -> None:
+    async def scenario():
+        for _ in range(resilience.BREAKER_MIN_CALLS):
+            await call(breaker, down)
+    asyncio.run(scenario())
+
+def test_breaker_opens_once_enough_recent_calls_failed(clock):
+    breaker = CircuitBreaker("tests")
+
+    async def scenario():
+        for _ in range(resilience.BREAKER_MIN_CALLS - 1):
+            await call(breaker, down)
+        # Too few calls to judge yet
+        assert breaker.state == CircuitBreaker.CLOSED
+        await call(breaker, down)
+        assert breaker.state == CircuitBreaker.OPEN
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(ok)
+        assert breaker.retry_after() == int(resilience.BREAKER_COOLDOWN_SECONDS)
+
+    asyncio.run(scenario())
+
+def test_query_errors_do_not_trip_the_breaker_but_slow_calls_do(clock):
+    breaker = CircuitBreaker("tests")
+
+    async def bad_query():
+        raise OperationFailure("bad $regex")
+
+    async def slow():
+        clock.now += resilience.BREAKER_SLOW_CALL_SECONDS + 1
+        return "late"
+
+    async def scenario():
+        for _ in range(resilience.BREAKER_MIN_CALLS * 2):
+            await call(breaker, bad_query)
+        assert breaker.state == CircuitBreaker.CLOSED
+
+        for _ in range(resilience.BREAKER_MIN_CALLS):
+            assert await breaker.call(slow) == "late"
+        assert breaker.state == CircuitBreaker.OPEN
+
+    asyncio.run(scenario())
+
+def test_half_open_probe_closes_or_reopens_the_breaker(clock):
+    breaker = CircuitBreaker("tests")
+    trip(breaker)
+
+    async def scenario():
+        clock.now += resilience.BREAKER_COOLDOWN_SECONDS
+        release = asyncio.Event()
+
+        async def probe():
+            await release.wait()
+            raise ConnectionFailure("still down")
+
+        first = asyncio.ensure_future(call(breaker, probe))
+        await asyncio.sleep(0)
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        # Only one probe at a time
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(ok)
+        release.set()
+        await first
+        assert breaker.state == CircuitBreaker.OPEN
+
+        clock.now += resilience.BREAKER_COOLDOWN_SECONDS
+        assert await breaker.call(ok) == "ok"
+        assert breaker.state == CircuitBreaker.CLOSED
+        # The window starts over after closing
+        await call(breaker, down)
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    asyncio.run(scenario())
+
+class Loader:
+    def __init__(self, *values):
+        self.values = list(values)
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        value = self.values.pop(0)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+def test_fresh_results_are_served_until_a_write_invalidates_them(clock):
+    cache = CatalogReadCache("tests", CircuitBreaker("tests"))
+    loader = Loader(["v1"], ["v2"])
+
+    async def scenario():
+        assert await cache.get("page-1", loader) == ["v1"]
+        clock.now += resilience.FRESH_SECONDS
+        assert await cache.get("page-1", loader) == ["v1"]
+        assert loader.calls == 1
+
+        cache.invalidate("product", "update", ["p1"])
+        assert await cache.get("page-1", loader) == ["v2"]
+        assert loader.calls == 2
+
+    asyncio.run(scenario())
+
+def test_a_load_that_started_before_a_write_is_not_cached_as_fresh(clock):
+    cache = CatalogReadCache("tests", CircuitBreaker("tests"))
+    release = asyncio.Event()
+
+    async def slow_load():
+        await release.wait()
+        return ["before write"]
+
+    async def scenario():
+        pending = asyncio.ensure_future(cache.get("page-1", slow_load))
+        await asyncio.sleep(0)
+        cache.invalidate()
+        # A reader arriving after the write does not join the older load
+        after = Loader(["after write"])
+        assert await cache.get("page-1", after) == ["after write"]
+        release.set()
+        assert await pending == ["before write"]
+
+        reread = Loader(["reloaded"])
+        assert await cache.get("page-1", reread) == ["reloaded"]
+        assert reread.calls == 1
+
+    asyncio.run(scenario())
+
+def test_stale_results_are_served_while_refreshing_in_the_background(clock):
+    cache = CatalogReadCache("tests", CircuitBreaker("tests"))
+    loader = Loader(["v1"], ["v2"])
+
+    async def scenario():
+        await cache.get("page-1", loader)
+        clock.now += resilience.FRESH_SECONDS + 1
+        assert await cache.get("page-1", loader) == ["v1"]
+        await asyncio.gather(*cache._refreshes)
+        assert loader.calls == 2
+        assert await cache.get("page-1", loader) == ["v2"]
+
+    asyncio.run(scenario())
+
+def test_last_known_good_result_is_served_while_mongo_is_down(clock):
+    cache = CatalogReadCache("tests", CircuitBreaker("tests"))
+
+    async def scenario():
+        await cache.get("page-1", Loader(["v1"]))
+        cache.invalidate()
+        assert await cache.get("page-1", Loader(ConnectionFailure("down"))) == ["v1"]
+
+        # ...but not beyond the fallback window
+        clock.now += resilience.FALLBACK_SECONDS + 1
+        with pytest.raises(CatalogUnavailableError) as raised:
+            await cache.get("page-1", Loader(ConnectionFailure("down")))
+        assert raised.value.status_code == 503
+        assert raised.value.headers["Retry-After"] == str(int(resilience.BREAKER_COOLDOWN_SECONDS))
+
+    asyncio.run(scenario())
+
+def test_open_breaker_without_a_cached_result_is_a_503(clock):
+    breaker = CircuitBreaker("tests")
+    cache = CatalogReadCache("tests", breaker)
+    trip(breaker)
+    clock.now += 3
+
+    async def scenario():
+        loader = Loader(["never loaded"])
+        with pytest.raises(CatalogUnavailableError) as raised:
+            await cache.get("page-1", loader)
+        assert raised.value.headers["Retry-After"] == str(breaker.retry_after())
+        assert loader.calls == 0
+
+    asyncio.run(scenario())
+
+def test_query_errors_are_not_turned_into_503s(clock):
+    cache = CatalogReadCache("tests", CircuitBreaker("tests"))
+    with pytest.raises(OperationFailure):
+        asyncio.run(cache.get("page-1", Loader(OperationFailure("bad $regex"))))
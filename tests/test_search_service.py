@@ -0,0 +1,69 @@
+import pytest
+
+from services.search_service import TrigramIndex, trigrams
+
+def product(product_id: str, name: str, status: str = "active", **fields) -> dict:
+    return {"id": product_id, "name": name, "status": status, "collection": "Classics",
+            "frame_color": "Black", "lens_color": "Grey", "tags": [], **fields}
+
+@pytest.fixture
+def index() -> TrigramIndex:
+    index = TrigramIndex()
+    index.build([
+        product("aviator", "Aviator"),
+        product("aviator-xl", "Aviator Extra Large"),
+        product("wayfarer", "Wayfarer"),
+        product("round", "Round Metal", collection="Aviation Heritage"),
+        product("capri", "Caprì"),
+        product("hidden", "Aviator Prototype", status="scheduled"),
+    ])
+    return index
+
+def ids(results):
+    return [product_id for product_id, _ in results]
+
+def test_trigrams_are_padded_per_word_and_accent_folded():
+    assert trigrams("Ab") == {"  a", " ab", "ab "}
+    assert trigrams("Caprì") == trigrams("capri")
+    assert trigrams("Red-Blue") == trigrams("red blue")
+
+def test_exact_name_ranks_first_and_shorter_names_win_ties(index):
+    results = index.search("aviator", 10)
+    assert ids(results)[:2] == ["aviator", "aviator-xl"]
+    assert results[0][1] == pytest.approx(1.0)
+    assert results[1][1] == pytest.approx(1.0)
+
+def test_typos_still_match(index):
+    assert ids(index.search("aviatr", 10))[:2] == ["aviator", "aviator-xl"]
+    assert ids(index.search("wayfrer", 10)) == ["wayfarer"]
+    assert ids(index.search("capri", 10)) == ["capri"]
+
+def test_name_matches_outrank_other_fields(index):
+    results = index.search("aviat", 10)
+    assert ids(results)[-1] == "round"
+    assert results[-1][1] < results[0][1]
+
+def test_scores_below_the_threshold_are_dropped(index):
+    assert index.search("zzz", 10) == []
+    assert index.search("aviator", 10, min_score=1.01) == []
+
+def test_only_active_products_are_returned(index):
+    assert "hidden" not in ids(index.search("aviator prototype", 10))
+    index.upsert(product("hidden", "Aviator Prototype"))
+    assert ids(index.search("aviator prototype", 10))[0] == "hidden"
+    # A status-only change flips visibility without adding a row
+    assert index.dead == 0
+
+def test_limit_keeps_the_best_matches_in_order(index):
+    assert ids(index.search("aviator", 1)) == ["aviator"]
+    assert ids(index.search("aviator", 2)) == ["aviator", "aviator-xl"]
+
+def test_renamed_and_removed_products(index):
+    index.upsert(product("wayfarer", "Clubmaster"))
+    assert index.search("wayfarer", 10) == []
+    assert ids(index.search("clubmaster", 10)) == ["wayfarer"]
+    assert index.dead == 1
+
+    index.remove("wayfarer")
+    assert index.search("clubmaster", 10) == []
+    assert "wayfarer" not in index.row_of
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from services.single_flight import SingleFlight
+
+def test_concurrent_calls_with_one_key_share_one_execution():
+    async def scenario():
+        flight = SingleFlight("tests")
+        release = asyncio.Event()
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await release.wait()
+            return {"rows": 3}
+
+        waiters = [asyncio.ensure_future(flight.do("products", load)) for _ in range(5)]
+        other = asyncio.ensure_future(flight.do("collections", load))
+        await asyncio.sleep(0)
+        assert flight.in_flight == 2
+        release.set()
+
+        results = await asyncio.gather(*waiters)
+        assert all(result is results[0] for result in results)
+        assert await other == {"rows": 3}
+        assert len(calls) == 2
+        assert (flight.executed, flight.coalesced) == (2, 4)
+        assert flight.in_flight == 0
+
+        # Finished calls are not cached: the next call runs again
+        await flight.do("products", load)
+        assert len(calls) == 3
+
+    asyncio.run(scenario())
+
+def test_errors_reach_every_waiter_and_are_not_remembered():
+    async def scenario():
+        flight = SingleFlight("tests")
+        release = asyncio.Event()
+
+        async def fail():
+            await release.wait()
+            raise ValueError("mongo said no")
+
+        waiters = [asyncio.ensure_future(flight.do("key", fail)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        for outcome in await asyncio.gather(*waiters, return_exceptions=True):
+            assert isinstance(outcome, ValueError)
+        assert flight.in_flight == 0
+
+        async def succeed():
+            return "ok"
+        assert await flight.do("key", succeed) == "ok"
+
+    asyncio.run(scenario())
+
+def test_a_cancelled_caller_does_not_cancel_the_shared_call():
+    async def scenario():
+        flight = SingleFlight("tests")
+        release = asyncio.Event()
+
+        async def load():
+            await release.wait()
+            return "done"
+
+        impatient = asyncio.ensure_future(flight.do("key", load))
+        patient = asyncio.ensure_future(flight.do("key", load))
+        await asyncio.sleep(0)
+        impatient.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await impatient
+
+        release.set()
+        assert await patient == "done"
+
+    asyncio.run(scenario())
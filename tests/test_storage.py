@@ -0,0 +1,103 @@
+import asyncio
+import io
+
+import pytest
+
+from services.storage import LocalStorage, S3Storage, StorageBackend
+
+BUCKET = "gcg-test-uploads"
+
+@pytest.fixture
+def s3_storage(monkeypatch):
+    pytest.importorskip("boto3")
+    moto = pytest.importorskip("moto")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    with moto.mock_aws():
+        storage = S3Storage(bucket=BUCKET, prefix="uploads/")
+        storage.client.create_bucket(Bucket=BUCKET)
+        yield storage
+
+@pytest.fixture
+def local_storage(tmp_path):
+    return LocalStorage(root=tmp_path)
+
+@pytest.fixture(params=["local", "s3"])
+def storage(request) -> StorageBackend:
+    return request.getfixturevalue(f"{request.param}_storage")
+
+def test_backend_must_implement_the_interface():
+    class Partial(StorageBackend):
+        async def save(self, key, fileobj, content_type=None):
+            return key
+
+    with pytest.raises(TypeError):
+        Partial()
+
+def test_save_info_read_head_delete(storage):
+    data = b"\xff\xd8\xff" + bytes(range(256)) * 40
+
+    async def scenario():
+        url = await storage.save("products/a.jpg", io.BytesIO(data), "image/jpeg")
+        assert storage.key_for(url) == "products/a.jpg"
+        assert storage.url_for("products/a.jpg") == url
+
+        info = await storage.info("products/a.jpg")
+        assert info["size"] == len(data)
+        assert info["created_at"] > 0
+        assert await storage.read_head("products/a.jpg", 16) == data[:16]
+        # Asking for more than the object holds returns what there is
+        assert await storage.read_head("products/a.jpg", len(data) * 2) == data
+
+        assert await storage.delete("products/a.jpg") is True
+        assert await storage.info("products/a.jpg") is None
+        assert await storage.read_head("products/a.jpg", 16) is None
+        assert await storage.delete("products/a.jpg") is False
+
+    asyncio.run(scenario())
+
+def test_s3_objects_are_prefixed_and_immutable(s3_storage):
+    async def scenario():
+        await s3_storage.save("products/b.png", io.BytesIO(b"\x89PNG"), "image/png")
+
+    asyncio.run(scenario())
+    head = s3_storage.client.head_object(Bucket=BUCKET, Key="uploads/products/b.png")
+    assert head["ContentType"] == "image/png"
+    assert head["CacheControl"] == "public, max-age=31536000, immutable"
+
+def test_s3_multipart_upload(s3_storage):
+    from boto3.s3.transfer import TransferConfig
+
+    part = 5 * 1024 * 1024
+    s3_storage.transfer_config = TransferConfig(multipart_threshold=part, multipart_chunksize=part)
+    data = bytes(range(256)) * (part * 2 // 256 + 1)
+
+    async def scenario():
+        await s3_storage.save("products/large.jpg", io.BytesIO(data), "image/jpeg")
+        assert (await s3_storage.info("products/large.jpg"))["size"] == len(data)
+
+    asyncio.run(scenario())
+
+def test_s3_key_for_ignores_foreign_urls(s3_storage):
+    assert s3_storage.key_for("https://example.com/uploads/products/a.jpg") is None
+    assert s3_storage.key_for("/uploads/products/a.jpg") is None
+
+def test_local_storage_rejects_keys_outside_its_root(local_storage):
+    with pytest.raises(ValueError):
+        asyncio.run(local_storage.info("../outside.jpg"))
+
+def test_s3_presigned_download_of_a_private_object(s3_storage):
+    from urllib.parse import parse_qs, urlparse
+
+    async def scenario():
+        await s3_storage.save("products-1.csv", io.BytesIO(b"id\n1\n"), "text/csv")
+        return await s3_storage.presign_download("products-1.csv", 300, "products-1.csv")
+
+    url = urlparse(asyncio.run(scenario()))
+    assert url.path.endswith("/uploads/products-1.csv")
+    query = parse_qs(url.query)
+    assert query["response-content-disposition"] == ['attachment; filename="products-1.csv"']
+
+def test_local_storage_cannot_presign_downloads(local_storage):
+    assert asyncio.run(local_storage.presign_download("a.csv", 300)) is None
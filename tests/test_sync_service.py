@@ -0,0 +1,131 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from models.product import StatusEnum
+from services.sync_service import TOMBSTONE_TTL_SECONDS, SyncService, decode_watermark, encode_watermark
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+# Older than the settle window, so every change is visible; whole seconds,
+# as BSON dates only keep milliseconds
+BASE = (datetime.utcnow() - timedelta(minutes=10)).replace(microsecond=0)
+
+def product(product_id: str, minute: int, status: StatusEnum = StatusEnum.ACTIVE) -> dict:
+    return {
+        "id": product_id, "name": f"Frame {product_id}", "collection": "Tests", "price": 100.0,
+        "sku": f"SKU-{product_id}", "gender": "Unisex", "type": "Sunglasses", "frame_color": "Black",
+        "lens_color": "Grey", "materials": "Acetate", "main_image": "/uploads/products/a.jpg",
+        "short_description": "Test frame", "status": status.value,
+        "created_at": BASE, "updated_at": BASE + timedelta(minutes=minute),
+    }
+
+def collection(collection_id: str, minute: int, is_active: bool = True) -> dict:
+    return {
+        "id": collection_id, "name": f"Collection {collection_id}", "slug": collection_id,
+        "is_active": is_active, "created_at": BASE, "updated_at": BASE + timedelta(minutes=minute),
+    }
+
+@pytest.fixture
+def db():
+    return mongomock_motor.AsyncMongoMockClient()["sync_tests"]
+
+def test_public_changes_send_hidden_entities_as_tombstones(db):
+    async def scenario():
+        await db.products.insert_many([
+            product("p1", 1),
+            product("p2", 2, StatusEnum.SCHEDULED),
+            product("p3", 3, StatusEnum.INACTIVE),
+        ])
+        await db.collections.insert_many([collection("c1", 1), collection("c2", 4, is_active=False)])
+        await db.tombstones.insert_one({"entity": "product", "id": "p0", "deleted_at": BASE})
+        return await SyncService(db).get_changes(), await SyncService(db).get_public_changes()
+
+    full, public = asyncio.run(scenario())
+    assert [p.id for p in full.products] == ["p1", "p2", "p3"]
+    assert [p.id for p in public.products] == ["p1"]
+    assert [c.id for c in public.collections] == ["c1"]
+    assert [(t.entity.value, t.id) for t in public.deleted] == [
+        ("product", "p0"), ("product", "p2"), ("product", "p3"), ("collection", "c2"),
+    ]
+    # Same position in the change stream (the issue time is "now")
+    assert public.next_since.split(",")[:2] == full.next_since.split(",")[:2]
+
+def tombstone(entity_id: str, minute: int) -> dict:
+    return {"entity": "product", "id": entity_id, "deleted_at": BASE + timedelta(minutes=minute)}
+
+def test_watermark_round_trip_and_bare_timestamps():
+    issued_at = datetime(2026, 1, 2, 3, 4, 5)
+    key = (datetime(2026, 1, 1, 12, 0, 0, 123000), "p-1")
+    assert decode_watermark(encode_watermark(key, issued_at)) == (key, issued_at)
+    # A bare timestamp (older clients) is its own issue time
+    assert decode_watermark("2026-01-01T12:00:00+02:00") == ((datetime(2026, 1, 1, 10), ""), datetime(2026, 1, 1, 10))
+    for malformed in ("2026-01-01T12:00:00,p-1", "not a date", "2026-01-01,p-1,later"):
+        with pytest.raises(ValueError):
+            decode_watermark(malformed)
+
+def test_pages_are_cut_at_the_smallest_last_key_so_nothing_is_skipped(db):
+    async def scenario():
+        # Several sources, and ties on the timestamp broken by id
+        await db.products.insert_many([product(f"p{i}", minute) for i, minute in enumerate([1, 2, 2, 2, 5, 6])])
+        await db.collections.insert_many([collection("c1", 2), collection("c2", 3), collection("c3", 7)])
+        await db.tombstones.insert_many([tombstone("p9", 2), tombstone("p8", 4)])
+
+        service = SyncService(db)
+        seen, pages, since = [], [], None
+        while True:
+            changes = await service.get_changes(since=since, limit=2)
+            page = [p.id for p in changes.products] + [c.id for c in changes.collections] + [t.id for t in changes.deleted]
+            assert len(page) <= 2 * 3
+            seen += page
+            pages.append(changes)
+            since = changes.next_since
+            if not changes.has_more:
+                return seen, pages
+
+    seen, pages = asyncio.run(scenario())
+    assert sorted(seen) == sorted(["p0", "p1", "p2", "p3", "p4", "p5", "c1", "c2", "c3", "p9", "p8"])
+    assert len(seen) == len(set(seen))
+    assert len(pages) > 2
+    # The first page stops at p1 (the second product): the tie on minute 2
+    # is split by id, and the other sources stop at the same key, so c1
+    # (minute 2) is in but the p9 tombstone (minute 2, sorting after p1) is not
+    first = pages[0]
+    assert [p.id for p in first.products] == ["p0", "p1"]
+    assert [c.id for c in first.collections] == ["c1"]
+    assert [t.id for t in first.deleted] == []
+    assert first.next_since.split(",")[:2] == [(BASE + timedelta(minutes=2)).isoformat(), "p1"]
+    # The issue time is kept while paging
+    issued = {page.next_since.split(",")[2] for page in pages[:-1]}
+    assert len(issued) == 1
+
+def test_caught_up_clients_get_a_fresh_issue_time(db):
+    async def scenario():
+        await db.products.insert_one(product("p1", 1))
+        service = SyncService(db)
+        old_issue = datetime.utcnow() - timedelta(days=20)
+        since = encode_watermark((BASE + timedelta(minutes=1), "p1"), old_issue)
+        return await service.get_changes(since=since)
+
+    changes = asyncio.run(scenario())
+    assert changes.products == [] and not changes.has_more
+    key, issued_at = decode_watermark(changes.next_since)
+    assert key == (BASE + timedelta(minutes=1), "p1")
+    assert issued_at > datetime.utcnow() - timedelta(minutes=1)
+
+def test_watermarks_issued_before_tombstones_expired_need_a_full_resync(db):
+    expired = datetime.utcnow() - timedelta(seconds=TOMBSTONE_TTL_SECONDS + 60)
+    changes = asyncio.run(SyncService(db).get_changes(since=encode_watermark((BASE, "p1"), expired)))
+    assert changes.full_resync_required
+    assert changes.next_since is None
+
+def test_changes_inside_the_settle_window_are_held_back(db):
+    async def scenario():
+        recent = product("p2", 0)
+        recent["updated_at"] = datetime.utcnow()
+        await db.products.insert_many([product("p1", 1), recent])
+        return await SyncService(db).get_changes()
+
+    changes = asyncio.run(scenario())
+    assert [p.id for p in changes.products] == ["p1"]